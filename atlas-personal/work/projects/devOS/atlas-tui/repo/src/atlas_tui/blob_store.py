@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+import gzip
+import hashlib
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Set, Tuple
+
+try:  # optional: faster and smaller than gzip
+    import zstandard  # type: ignore[import-not-found]
+except ImportError:  # pragma: no cover - depends on environment
+    zstandard = None
+
+NONE = "none"
+GZIP = "gzip"
+ZSTD = "zstd"
+
+EXT = {ZSTD: ".zst", GZIP: ".gz", NONE: ""}
+
+# Key that marks a blob reference inside a log payload.
+BLOB_KEY = "$blob"
+
+def default_codec() -> str:
+    return ZSTD if zstandard is not None else GZIP
+
+def compress(data: bytes, codec: str) -> bytes:
+    if codec == ZSTD and zstandard is not None:
+        return zstandard.ZstdCompressor(level=3).compress(data)
+    if codec == GZIP:
+        # mtime=0 keeps the bytes a pure function of the content.
+        return gzip.compress(data, compresslevel=6, mtime=0)
+    return data
+
+def decompress(data: bytes, codec: str) -> bytes:
+    if codec == ZSTD:
+        if zstandard is None:
+            raise RuntimeError("zstandard is required to read .zst blobs")
+        return zstandard.ZstdDecompressor().decompress(data)
+    if codec == GZIP:
+        return gzip.decompress(data)
+    return data
+
+def is_ref(obj: Any) -> bool:
+    return isinstance(obj, dict) and isinstance(obj.get(BLOB_KEY), str)
+
+class BlobStore:
+    """
+    Content-addressed store for large log strings (blobs/<aa>/<rest-of-sha256><ext>).
+
+    - put_text() returns a small reference dict and writes the blob only if
+      no blob with that digest exists yet, under any codec
+    - get_text() finds the blob whatever codec it was written with
+    - writes are atomic (temp file + rename), so concurrent writers are safe
+    - delete_unused() removes blobs for garbage collection, skipping any put
+      recently (in this process, or by mtime for other processes)
+    """
+
+    def __init__(self, root: Path, codec: Optional[str] = None) -> None:
+        self.root = Path(root)
+        self.codec = codec or default_codec()
+        if self.codec not in EXT or (self.codec == ZSTD and zstandard is None):
+            raise ValueError(f"unsupported blob codec: {self.codec}")
+        self._known: Set[str] = set()
+        self._last_put: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self.writes = 0
+
+    def _path(self, digest: str, codec: str) -> Path:
+        return self.root / digest[:2] / (digest[2:] + EXT[codec])
+
+    def _find(self, digest: str) -> Optional[tuple[Path, str]]:
+        for codec in (self.codec, ZSTD, GZIP, NONE):
+            p = self._path(digest, codec)
+            if p.exists():
+                return p, codec
+        return None
+
+    def put_text(self, text: str) -> Dict[str, Any]:
+        data = text.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        ref = {BLOB_KEY: digest, "chars": len(text)}
+        with self._lock:
+            self._last_put[digest] = time.time()
+            if digest in self._known:
+                return ref
+        found = self._find(digest)
+        if found is not None:
+            # Reuse counts as use: keeps the blob out of another process's GC.
+            try:
+                os.utime(found[0])
+            except OSError:
+                pass
+        else:
+            path = self._path(digest, self.codec)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+            tmp.write_bytes(compress(data, self.codec))
+            os.replace(tmp, path)
+            self.writes += 1
+        with self._lock:
+            self._known.add(digest)
+        return ref
+
+    def get_text(self, digest: str) -> str:
+        found = self._find(digest)
+        if found is None:
+            raise FileNotFoundError(f"blob {digest} not found under {self.root}")
+        path, codec = found
+        return decompress(path.read_bytes(), codec).decode("utf-8")
+
+    def digests(self) -> Iterator[Tuple[str, Path]]:
+        """(digest, path) of every blob on disk."""
+        if not self.root.is_dir():
+            return
+        for sub in self.root.iterdir():
+            if not sub.is_dir() or len(sub.name) != 2:
+                continue
+            for p in sub.iterdir():
+                if p.name.endswith(".tmp"):
+                    continue
+                yield sub.name + p.name.split(".", 1)[0], p
+
+    def delete_unused(self, digest: str, path: Path, grace_s: float) -> bool:
+        """Delete one blob unless it was put or touched within grace_s."""
+        cutoff = time.time() - grace_s
+        with self._lock:
+            if self._last_put.get(digest, 0.0) >= cutoff:
+                return False
+            try:
+                if path.stat().st_mtime >= cutoff:
+                    return False
+                path.unlink()
+            except OSError:
+                return False
+            self._known.discard(digest)
+            self._last_put.pop(digest, None)
+        return True
+
+    def resolve(self, obj: Any) -> Any:
+        """Copy of obj with every blob reference replaced by its text."""
+        if is_ref(obj):
+            return self.get_text(obj[BLOB_KEY])
+        if isinstance(obj, dict):
+            return {k: self.resolve(v) for k, v in obj.items()}
+        if isinstance(obj, list):
+            return [self.resolve(v) for v in obj]
+        return obj
+
+_stores: Dict[str, BlobStore] = {}
+_stores_lock = threading.Lock()
+
+def blob_store(root: Path) -> BlobStore:
+    """Process-wide BlobStore per directory, so known digests skip the filesystem."""
+    key = str(Path(root).resolve())
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = _stores[key] = BlobStore(Path(key))
+        return store
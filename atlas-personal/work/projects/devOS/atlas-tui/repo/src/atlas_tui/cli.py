@@ -7,8 +7,10 @@ import shlex
 import sys
 from pathlib import Path
 
+from .log_retention import RetentionPolicy
+from .result_cache import ResultCache
 from .workspace import discover_workspace
-from .ui.app import AtlasTUIApp
+from .ui.app import DEFAULT_MAX_INFLIGHT, AtlasTUIApp
 
 DEFAULT_ENGINE_CMD = [sys.executable, "-m", "atlas_tui.dummy_engine"]
 
@@ -22,8 +24,17 @@ def main() -> None:
         description="Atlas TUI v2 (Textual) - thin cockpit + context inspection logs.",
     )
     parser.add_argument("--engine-cmd", type=str, default=None, help="Engine command (string). Overrides ATLAS_ENGINE_CMD.")
+    parser.add_argument("--engine-workers", type=int, default=None, help="Engine processes to run behind a load-balancing pool. Overrides ATLAS_ENGINE_WORKERS (default: 1).")
     parser.add_argument("--preview-chars", type=int, default=800, help="Preview length for system strings in UI/logs.")
     parser.add_argument("--timeout", type=float, default=60.0, help="Engine request timeout (seconds).")
+    parser.add_argument("--result-cache-entries", type=int, default=32, help="Engine results kept for identical resubmits; 0 disables (default: 32).")
+    parser.add_argument("--result-cache-mb", type=float, default=64.0, help="Memory bound for cached engine results in MB (default: 64).")
+    parser.add_argument("--max-inflight", type=int, default=DEFAULT_MAX_INFLIGHT, help=f"Submissions allowed in flight at once (default: {DEFAULT_MAX_INFLIGHT}).")
+    parser.add_argument("--log-retention-days", type=float, default=30.0, help="Delete archived logs older than this; 0 keeps them forever (default: 30).")
+    parser.add_argument("--log-max-loose", type=int, default=200, help="Per-request logs kept as loose JSON before compaction into daily archives (default: 200).")
+    parser.add_argument("--log-max-mb", type=float, default=0.0, help="Cap on archived + chat log size in MB; 0 disables (default: 0).")
+    parser.add_argument("--no-log-retention", action="store_true", help="Never compact or delete logs in the background.")
+    parser.add_argument("--log-segments", action="store_true", help="Append inspection logs to daily compressed segments instead of one JSON file per request.")
     parser.add_argument("--glass", action="store_true", help="Start local web 'glass' inspector (read-only).")
     parser.add_argument("--glass-host", type=str, default="127.0.0.1", help="Glass host bind (default: 127.0.0.1).")
     parser.add_argument("--glass-port", type=int, default=8765, help="Glass port (default: 8765).")
@@ -47,6 +58,29 @@ def main() -> None:
         engine_cmd = list(DEFAULT_ENGINE_CMD)
         engine_cmd_str = " ".join(engine_cmd)
 
+    engine_workers = args.engine_workers
+    if engine_workers is None:
+        try:
+            engine_workers = int(os.environ.get("ATLAS_ENGINE_WORKERS", "1"))
+        except ValueError:
+            print("atlas-tui: ATLAS_ENGINE_WORKERS must be an integer.", file=sys.stderr)
+            raise SystemExit(2)
+
+    result_cache = None
+    if args.result_cache_entries > 0:
+        result_cache = ResultCache(
+            max_entries=args.result_cache_entries,
+            max_bytes=int(args.result_cache_mb * 1024 * 1024),
+        )
+
+    retention = None
+    if not args.no_log_retention:
+        retention = RetentionPolicy(
+            max_age_days=args.log_retention_days or None,
+            max_loose_files=max(0, args.log_max_loose),
+            max_total_bytes=int(args.log_max_mb * 1024 * 1024) or None,
+        )
+
     glass_url = None
     if args.glass:
         from .web.server import start_glass_server
@@ -61,6 +95,11 @@ def main() -> None:
         preview_chars=args.preview_chars,
         engine_timeout_s=args.timeout,
         glass_url=glass_url,
+        max_inflight=args.max_inflight,
+        engine_workers=engine_workers,
+        result_cache=result_cache,
+        retention=retention,
+        log_segments=args.log_segments,
     )
     app.run()
 
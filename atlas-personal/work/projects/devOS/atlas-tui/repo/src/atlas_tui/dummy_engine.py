@@ -1,15 +1,22 @@
 from __future__ import annotations
 
-import json
+import argparse
+import hashlib
+import os
 import sys
+import threading
 import time
-from typing import Any, Dict, List
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
+from atlas_tui import framing
 from atlas_tui.assets import atlas_docs_root
+from atlas_tui.engine import context as repo_context
 
 """Long-lived engine (v2) for Atlas TUI.
 
-Reads JSONL from stdin and writes JSONL to stdout.
+Reads JSONL from stdin and writes JSONL to stdout, or length-prefixed frames
+once a client has selected one of the framings offered in the startup event.
 
 This engine does not call model provider APIs. It assembles the concrete provider
 request payload (system + user + model/provider metadata) so that the TUI can
@@ -18,95 +25,378 @@ log and inspect context packs deterministically.
 Protocol:
 - submit: {"type":"submit","id":"...","payload": EngineInput}
 - result: {"type":"result","id":"...","ok":true,"payload": EngineOutput}
+- hello:  {"type":"hello","framing":"lp-json"} switches both directions
+- event:  {"type":"event","id":"...","kind":"progress"|"timing"|"partial",...}
+          emitted per request only when the submit carries "stream": true;
+          "partial_chars": N limits partial chunks to the first N characters
+- cancel: {"type":"cancel","id":"..."} stops a queued or running submit
+- event:  {"type":"event","kind":"context_changed","context_version":"..."}
+          when the bundled documents or repo files used for context change
+          under a running engine (both are polled; see --watch-interval-s)
+
+A submit may carry "deadline" (epoch seconds). Cancelled or expired submits are
+answered with ok=false and error code "cancelled" or "deadline_exceeded".
+
+Submits are handled by a small worker pool, so results may be emitted out of
+order; clients must match them by id.
 """
 
+DEFAULT_CONCURRENCY = 4
+# Polling is cheap (recently included files only) but not free per engine worker.
+DEFAULT_WATCH_INTERVAL_S = 10.0
+
+# Size of each partial `system` chunk streamed ahead of the result.
+STREAM_CHUNK_CHARS = 16_384
+
+# Simulated work per assembly stage (--stage-delay-ms), for load testing.
+_stage_delay_s = 0.0
+
+class _Abort(Exception):
+    def __init__(self, code: str) -> None:
+        super().__init__(code)
+        self.code = code
+
+class _Job:
+    def __init__(self, deadline: Optional[float]) -> None:
+        self.deadline = deadline
+        self.cancelled = threading.Event()
+
+    def check(self) -> None:
+        if self.cancelled.is_set():
+            raise _Abort("cancelled")
+        if self.deadline is not None and time.time() >= self.deadline:
+            raise _Abort("deadline_exceeded")
+
+    def work(self, seconds: float) -> None:
+        # Interruptible stand-in for CPU-bound assembly work.
+        if seconds > 0:
+            if self.deadline is not None:
+                seconds = min(seconds, max(0.0, self.deadline - time.time()))
+            self.cancelled.wait(seconds)
+        self.check()
+
+_jobs: Dict[str, _Job] = {}
+_jobs_lock = threading.Lock()
+
+_emit_lock = threading.Lock()
+_out_framing = framing.JSONL
+
 def _emit(obj: Dict[str, Any]) -> None:
-    sys.stdout.write(json.dumps(obj, ensure_ascii=False) + "\n")
-    sys.stdout.flush()
+    # One writer at a time so concurrent results never interleave on stdout.
+    with _emit_lock:
+        sys.stdout.buffer.write(framing.encode(obj, _out_framing))
+        sys.stdout.buffer.flush()
 
-def _read_text(rel_parts: List[str]) -> str:
-    root = atlas_docs_root()
-    p = root
+def _switch_output(selected: str) -> None:
+    global _out_framing
+    # The ack is the last JSONL line; everything after it uses the new framing.
+    with _emit_lock:
+        sys.stdout.buffer.write(framing.encode(
+            {"type": "event", "level": "info", "message": "framing selected", "framing_selected": selected, "ts": time.time()},
+            framing.JSONL,
+        ))
+        sys.stdout.buffer.flush()
+        _out_framing = selected
+
+def _resource(rel_parts: List[str]):
+    p = atlas_docs_root()
     for part in rel_parts:
         p = p.joinpath(part)
-    return p.read_text(encoding="utf-8")
+    return p
+
+def _read_text(rel_parts: List[str]) -> str:
+    return _resource(rel_parts).read_text(encoding="utf-8")
+
+
+_MODES = ("interpret", "plan", "execute")
+
+# Content hashes for resources that cannot be stat'ed (e.g. a zipped package).
+_content_tokens: Dict[str, str] = {}
+
+def _file_token(rel_parts: List[str]) -> str:
+    """Cheap change token for one bundled document: mtime+size, else content hash."""
+    p = _resource(rel_parts)
+    try:
+        st = os.stat(p)  # type: ignore[arg-type]
+        return f"{st.st_mtime_ns}:{st.st_size}"
+    except (TypeError, OSError):
+        rel = "/".join(rel_parts)
+        tok = _content_tokens.get(rel)
+        if tok is None:
+            tok = _content_tokens[rel] = hashlib.sha256(p.read_bytes()).hexdigest()[:16]
+        return tok
+
+def _mode_signature(mode: str) -> Tuple[str, ...]:
+    return tuple(_file_token(rel_parts) for _, rel_parts in _system_parts(mode))
+
+_version_lock = threading.Lock()
+_context_version: Optional[str] = None
+
+def _asset_signature() -> str:
+    """Token that changes whenever a bundled document the engine reads changes."""
+    h = hashlib.sha256()
+    seen = set()
+    for mode in _MODES:
+        for _, rel_parts in _system_parts(mode):
+            rel = "/".join(rel_parts)
+            if rel in seen:
+                continue
+            seen.add(rel)
+            h.update(f"{rel}:{_file_token(rel_parts)}\n".encode("utf-8"))
+    for idx in repo_context.indexes():
+        h.update(f"repo:{idx.repo_root}:{idx.generation}\n".encode("utf-8"))
+    return h.hexdigest()[:16]
+
+def _check_context_version() -> str:
+    global _context_version
+    current = _asset_signature()
+    with _version_lock:
+        if current != _context_version:
+            if _context_version is not None:
+                _emit({"type": "event", "level": "info", "kind": "context_changed", "context_version": current, "ts": time.time()})
+            _context_version = current
+    return current
 
+class _AssemblyCache:
+    """Assembled system prompt per mode, valid while the mode's signature holds."""
 
-def _assemble_system(mode: str) -> str:
-    kernel = _read_text(["core", "kernel.md"])
+    def __init__(self) -> None:
+        self._entries: Dict[str, Tuple[Tuple[str, ...], str]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
 
+    def get(self, mode: str, signature: Tuple[str, ...]) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(mode)
+            if entry is not None and entry[0] == signature:
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            return None
+
+    def put(self, mode: str, signature: Tuple[str, ...], system: str) -> None:
+        with self._lock:
+            self._entries[mode] = (signature, system)
+
+    def counters(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses}
+
+_assembly_cache = _AssemblyCache()
+
+def _system_parts(mode: str) -> List[Tuple[str, List[str]]]:
     if mode == "interpret":
-        protocol = _read_text(["protocols", "interpreter-opencode.md"])
-        projection = _read_text(["projections", "interpret-opencode.md"])
+        protocol, projection = "interpreter-opencode.md", "interpret-opencode.md"
     elif mode == "execute":
-        protocol = _read_text(["protocols", "executor-opencode.md"])
-        projection = _read_text(["projections", "execute-opencode.md"])
+        protocol, projection = "executor-opencode.md", "execute-opencode.md"
     else:
-        protocol = _read_text(["protocols", "plan-opencode.md"])
-        projection = _read_text(["projections", "plan-opencode.md"])
-
-    return "\n\n".join([kernel, protocol, projection])
-
-def main() -> int:
-    # Optional startup event
-    _emit({"type": "event", "level": "info", "message": "dummy engine started", "ts": time.time()})
-
-    for raw in sys.stdin:
-        line = raw.strip()
-        if not line:
-            continue
-        try:
-            msg = json.loads(line)
-        except json.JSONDecodeError:
-            _emit({"type":"event","level":"error","message":"received non-JSON input", "ts": time.time(), "data":{"line": line[:200]}})
-            continue
-
-        if msg.get("type") != "submit":
-            continue
-
-        req_id = msg.get("id")
-        payload = msg.get("payload") or {}
-        if not req_id:
-            continue
-
-        try:
-            user_message = payload.get("user_message", "")
-            mode = str(payload.get("mode", "interpret"))
-            provider = payload.get("provider", "openai")
-            model = payload.get("model", "unknown")
-
-            system = _assemble_system(mode)
-            provider_request = {
-                "provider": provider,
-                "model": model,
-                "system": system,
-                "user": user_message,
-                "messages": [
-                    {"role": "system", "content": system},
-                    {"role": "user", "content": user_message},
-                ],
-            }
-
-            out = {
-                "assembled_context": {"mode": mode, "system": system},
-                "provider_request": provider_request,
-                "diagnostics": {
-                    "sizes": {
-                        "system_chars": len(system),
-                        "user_chars": len(user_message),
-                    },
-                    "selected_artifacts": [
-                        "atlas_tui.assets:atlas/core/kernel.md",
-                        f"atlas_tui.assets:atlas/protocols/{'executor-opencode.md' if mode == 'execute' else ('interpreter-opencode.md' if mode == 'interpret' else 'plan-opencode.md')}",
-                        f"atlas_tui.assets:atlas/projections/{'execute-opencode.md' if mode == 'execute' else ('interpret-opencode.md' if mode == 'interpret' else 'plan-opencode.md')}",
-                    ],
-                    "timings_ms": {"assemble": 1},
+        protocol, projection = "plan-opencode.md", "plan-opencode.md"
+    return [
+        ("kernel", ["core", "kernel.md"]),
+        ("protocol", ["protocols", protocol]),
+        ("projection", ["projections", projection]),
+    ]
+
+def _assemble_system(mode: str, on_stage: Optional[Callable[[str, int, int, float], None]] = None) -> str:
+    parts = _system_parts(mode)
+    texts = []
+    for n, (stage, rel_parts) in enumerate(parts, 1):
+        t0 = time.perf_counter()
+        texts.append(_read_text(rel_parts))
+        if on_stage:
+            on_stage(stage, n, len(parts), (time.perf_counter() - t0) * 1000.0)
+    return "\n\n".join(texts)
+
+def _handle_submit(req_id: str, payload: Dict[str, Any], stream: bool = False, partial_chars: Optional[int] = None) -> None:
+    with _jobs_lock:
+        job = _jobs.get(req_id) or _Job(None)
+    try:
+        # Queued submits that were cancelled or expired never start.
+        job.check()
+        user_message = payload.get("user_message", "")
+        mode = str(payload.get("mode", "interpret"))
+        provider = payload.get("provider", "openai")
+        model = payload.get("model", "unknown")
+
+        t0 = time.perf_counter()
+        context_version = _check_context_version()
+        signature = _mode_signature(mode)
+        t_signature = time.perf_counter()
+
+        def on_stage(stage: str, done: int, total: int, ms: float) -> None:
+            job.work(_stage_delay_s)
+            if stream:
+                _emit({"type": "event", "id": req_id, "kind": "progress", "stage": stage, "done": done, "total": total})
+                _emit({"type": "event", "id": req_id, "kind": "timing", "stage": stage, "ms": round(ms, 3)})
+
+        system = _assembly_cache.get(mode, signature)
+        cache_hit = system is not None
+        if system is None:
+            system = _assemble_system(mode, on_stage)
+            _assembly_cache.put(mode, signature, system)
+        else:
+            on_stage("cache", 1, 1, (time.perf_counter() - t_signature) * 1000.0)
+        t_templates = time.perf_counter()
+
+        workspace = payload.get("workspace") or {}
+        repo_root = workspace.get("repo_root")
+        repo = None
+        if repo_root and os.path.isdir(repo_root):
+            repo = repo_context.assemble_repo_context(
+                repo_context.repo_index(repo_root, workspace.get("project_root")),
+                payload.get("ui_state"),
+                project_root=workspace.get("project_root"),
+            )
+            on_stage("repo", 1, 1, (time.perf_counter() - t_templates) * 1000.0)
+            if repo.text:
+                system = system + "\n\n" + repo.text
+            # Assembly may have noticed edited files; report the version the
+            # result was actually built against.
+            context_version = _check_context_version()
+        t_assembled = time.perf_counter()
+        if stream:
+            # The whole string is in the result anyway; stream only the prefix
+            # the client asked to preview, and tell it the full length.
+            end = len(system) if partial_chars is None else min(len(system), partial_chars)
+            for off in range(0, end, STREAM_CHUNK_CHARS):
+                job.check()
+                chunk = system[off:min(end, off + STREAM_CHUNK_CHARS)]
+                _emit({"type": "event", "id": req_id, "kind": "partial", "field": "system", "offset": off, "data": chunk, "total": len(system)})
+        provider_request = {
+            "provider": provider,
+            "model": model,
+            "system": system,
+            "user": user_message,
+            "messages": [
+                {"role": "system", "content": system},
+                {"role": "user", "content": user_message},
+            ],
+        }
+
+        out = {
+            "assembled_context": {"mode": mode, "system": system},
+            "provider_request": provider_request,
+            "diagnostics": {
+                "sizes": {
+                    "system_chars": len(system),
+                    "user_chars": len(user_message),
+                    "repo_context_chars": len(repo.text) if repo else 0,
+                },
+                "selected_artifacts": [
+                    "atlas_tui.assets:atlas/core/kernel.md",
+                    f"atlas_tui.assets:atlas/protocols/{'executor-opencode.md' if mode == 'execute' else ('interpreter-opencode.md' if mode == 'interpret' else 'plan-opencode.md')}",
+                    f"atlas_tui.assets:atlas/projections/{'execute-opencode.md' if mode == 'execute' else ('interpret-opencode.md' if mode == 'interpret' else 'plan-opencode.md')}",
+                ] + [f"repo:{f['path']}" for f in (repo.files if repo else [])],
+                "timings_ms": {
+                    "signature": round((t_signature - t0) * 1000.0, 3),
+                    "assemble": round((t_templates - t_signature) * 1000.0, 3),
+                    "repo": round((t_assembled - t_templates) * 1000.0, 3),
+                    "total": round((time.perf_counter() - t0) * 1000.0, 3),
                 },
-            }
+                "assembly_cache": {"hit": cache_hit, **_assembly_cache.counters()},
+                "context_version": context_version,
+                "repo_context": repo.diagnostics() if repo else None,
+            },
+        }
+
+        _emit({"type": "result", "id": req_id, "ok": True, "payload": out})
+    except _Abort as e:
+        _emit({"type": "result", "id": req_id, "ok": False, "error": {"code": e.code, "message": f"request {e.code}", "details": {}}})
+    except Exception as e:
+        _emit({"type": "result", "id": req_id, "ok": False, "error": {"code": "exception", "message": str(e), "details": {}}})
+    finally:
+        with _jobs_lock:
+            _jobs.pop(req_id, None)
+
+def _watch_context(interval_s: float) -> None:
+    # Cached results are keyed by context_version and never reach the engine,
+    # so edits to the bundled documents and to repo files the engine has put
+    # into contexts must bump it even when no submit comes in to notice. The
+    # documents are a handful of stats; of the repo only those files are
+    # polled (plus the TUI's saved RepoIndex for added/removed files), never a
+    # full repo scan.
+    while True:
+        time.sleep(interval_s)
+        for idx in repo_context.indexes():
+            idx.refresh_recent()
+        _check_context_version()
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="atlas_tui.dummy_engine")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="Submits handled in parallel (default: 4).")
+    parser.add_argument("--stage-delay-ms", type=float, default=0.0, help="Simulated work per assembly stage (default: 0).")
+    parser.add_argument("--watch-interval-s", type=float, default=DEFAULT_WATCH_INTERVAL_S, help=f"Poll the bundled documents and repo files included in recent contexts this often; 0 disables (default: {DEFAULT_WATCH_INTERVAL_S:g}).")
+    args = parser.parse_args(argv)
+
+    global _stage_delay_s
+    _stage_delay_s = max(0.0, args.stage_delay_ms) / 1000.0
+
+    offered = framing.supported_framings()
+    # Startup event doubles as the framing offer.
+    _emit({
+        "type": "event",
+        "level": "info",
+        "message": "dummy engine started",
+        "ts": time.time(),
+        "framing": offered,
+        "context_version": _check_context_version(),
+    })
+
+    if args.watch_interval_s > 0:
+        threading.Thread(target=_watch_context, args=(args.watch_interval_s,), name="context-watch", daemon=True).start()
+
+    stdin = sys.stdin.buffer
+    in_framing = framing.JSONL
+    with ThreadPoolExecutor(max_workers=max(1, args.concurrency), thread_name_prefix="assemble") as pool:
+        while True:
+            if in_framing == framing.JSONL:
+                raw = stdin.readline()
+                if not raw:
+                    break
+                raw = raw.strip()
+                if not raw:
+                    continue
+            else:
+                raw = framing.read_frame(stdin)
+                if raw is None:
+                    break
+            try:
+                msg = framing.decode(raw, in_framing)
+            except Exception:
+                _emit({"type":"event","level":"error","message":"received undecodable input", "ts": time.time(), "data":{"line": raw[:200].decode("utf-8", errors="replace")}})
+                continue
+
+            mtype = msg.get("type")
+            if mtype == "hello":
+                selected = msg.get("framing")
+                if selected in offered and selected != framing.JSONL:
+                    _switch_output(selected)
+                    in_framing = selected
+                continue
+
+            if mtype == "cancel":
+                with _jobs_lock:
+                    job = _jobs.get(str(msg.get("id")))
+                if job is not None:
+                    job.cancelled.set()
+                continue
+
+            if mtype != "submit":
+                continue
+
+            req_id = msg.get("id")
+            payload = msg.get("payload") or {}
+            if not req_id:
+                continue
 
-            _emit({"type": "result", "id": req_id, "ok": True, "payload": out})
-        except Exception as e:
-            _emit({"type": "result", "id": req_id, "ok": False, "error": {"code": "exception", "message": str(e), "details": {}}})
+            deadline = msg.get("deadline")
+            with _jobs_lock:
+                _jobs[req_id] = _Job(float(deadline) if isinstance(deadline, (int, float)) else None)
+            partial_chars = msg.get("partial_chars")
+            if not isinstance(partial_chars, int) or partial_chars < 0:
+                partial_chars = None
+            pool.submit(_handle_submit, req_id, payload, bool(msg.get("stream")), partial_chars)
 
     return 0
 
@@ -0,0 +1,482 @@
+"""Budget-aware repository context assembly.
+
+Turns the UI's context prefs (profile, budget_chars, pinned/excluded paths,
+selected path) into a deterministic "Repository context" section:
+
+1. pinned files, in the order given (directories expand to their files)
+2. profile-ranked repo files, filling whatever budget remains
+
+Everything is repo-relative and excluded paths always win. The section never
+exceeds budget_chars; the file that crosses the limit is cut at a fixed point
+and nothing after it is included.
+
+FileIndex keeps per-file size/mtime/digest and a bounded cache of decoded
+text, so repeated assemblies over an unchanged repo only stat what they use.
+"""
+
+from __future__ import annotations
+
+import fnmatch
+import hashlib
+import itertools
+import mmap
+import os
+import stat
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path, PurePosixPath
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from ..repo_index import RepoIndex
+
+PROFILES = ("minimal", "repo", "project", "debug")
+
+# Directories never worth sending as context.
+SKIP_DIRS = {
+    ".git", ".hg", ".svn", ".atlas-tui", ".atlas", "__pycache__", "node_modules",
+    ".venv", "venv", ".tox", ".nox", ".mypy_cache", ".pytest_cache", ".ruff_cache",
+    "dist", "build", ".idea", ".vscode",
+}
+
+TEXT_EXTS = {
+    ".md", ".txt", ".rst", ".py", ".pyi", ".toml", ".cfg", ".ini", ".json", ".yaml", ".yml",
+    ".js", ".jsx", ".ts", ".tsx", ".css", ".html", ".sh", ".go", ".rs", ".java", ".kt",
+    ".c", ".h", ".cc", ".cpp", ".hpp", ".cs", ".rb", ".php", ".swift", ".sql", ".lua",
+}
+
+KEY_DOC_NAMES = {
+    "readme", "readme.md", "readme.rst", "readme.txt", "architecture.md", "contributing.md",
+    "pyproject.toml", "setup.cfg", "setup.py", "package.json", "cargo.toml", "go.mod", "makefile",
+}
+
+# Files larger than this are never ranked in; pinned ones are read up to the budget.
+MAX_RANKED_FILE_BYTES = 256 * 1024
+# A partial file is only worth including if at least this much of it fits.
+MIN_SECTION_CHARS = 200
+# Files included in recent contexts that refresh_recent() keeps watching.
+MAX_RECENT_FILES = 512
+
+@dataclass
+class FileEntry:
+    path: str  # repo-relative, posix
+    size: int
+    mtime_ns: int
+    digest: Optional[str] = None
+    binary: Optional[bool] = None
+
+@dataclass
+class RepoContext:
+    text: str
+    budget_chars: int
+    files: List[Dict[str, Any]] = field(default_factory=list)
+    truncated: Optional[str] = None
+    missing_pins: List[str] = field(default_factory=list)
+    excluded: List[str] = field(default_factory=list)
+    ranking: Optional[List[Dict[str, Any]]] = None
+
+    def diagnostics(self) -> Dict[str, Any]:
+        d: Dict[str, Any] = {
+            "budget_chars": self.budget_chars,
+            "used_chars": len(self.text),
+            "files": self.files,
+            "truncated": self.truncated,
+            "missing_pins": self.missing_pins,
+            "excluded": self.excluded,
+        }
+        if self.ranking is not None:
+            d["ranking"] = self.ranking
+        return d
+
+def _norm(rel: str) -> Optional[str]:
+    """Normalize a user-supplied repo-relative path; None if it escapes the repo."""
+    rel = rel.strip().replace("\\", "/").strip("/")
+    if not rel:
+        return None
+    parts = []
+    for part in PurePosixPath(rel).parts:
+        if part in ("", "."):
+            continue
+        if part == "..":
+            if not parts:
+                return None
+            parts.pop()
+            continue
+        parts.append(part)
+    return "/".join(parts) or None
+
+def is_excluded(rel: str, excluded: Iterable[str]) -> bool:
+    for ex in excluded:
+        if rel == ex or rel.startswith(ex + "/") or fnmatch.fnmatchcase(rel, ex):
+            return True
+    return False
+
+class FileIndex:
+    """
+    Per-repo cache of file metadata and content.
+
+    - entry() re-stats one file and reuses the cached digest while size and
+      mtime are unchanged
+    - text() reads via mmap, decoding only the prefix that is needed, and keeps
+      decoded text in an LRU bounded by total characters
+    - walk() lists files from the persistent RepoIndex when one is attached
+      (so .gitignore is honoured); otherwise it caches directory listings by
+      directory mtime
+    - generation increases whenever a known file or directory is seen to change
+    - refresh_recent() is the cheap poll: it re-stats only files included in
+      recent contexts and picks up a RepoIndex another process saved
+    """
+
+    def __init__(self, repo_root: str, files: Optional[RepoIndex] = None, max_text_chars: int = 8_000_000) -> None:
+        self.repo_root = str(Path(repo_root).resolve())
+        self.files = files
+        self.max_text_chars = max_text_chars
+        self.generation = 0
+        self._entries: Dict[str, FileEntry] = {}
+        self._dirs: Dict[str, Tuple[int, List[str], List[str]]] = {}
+        self._text: "OrderedDict[Tuple[str, int, int], str]" = OrderedDict()
+        self._text_chars = 0
+        self._recent: "OrderedDict[str, None]" = OrderedDict()
+        self._lock = threading.RLock()
+
+    def _abs(self, rel: str) -> str:
+        return os.path.join(self.repo_root, *rel.split("/"))
+
+    def entry(self, rel: str) -> Optional[FileEntry]:
+        try:
+            st = os.stat(self._abs(rel))
+        except OSError:
+            with self._lock:
+                if self._entries.pop(rel, None) is not None:
+                    self.generation += 1
+            return None
+        if not stat.S_ISREG(st.st_mode):
+            return None
+        with self._lock:
+            cur = self._entries.get(rel)
+            if cur is not None and cur.size == st.st_size and cur.mtime_ns == st.st_mtime_ns:
+                return cur
+            if cur is not None:
+                self.generation += 1
+            cur = FileEntry(path=rel, size=st.st_size, mtime_ns=st.st_mtime_ns)
+            known = self.files.get(rel) if self.files is not None else None
+            if known is not None and known.size == cur.size and known.mtime_ns == cur.mtime_ns:
+                cur.digest, cur.binary = known.sha256, known.binary
+            self._entries[rel] = cur
+            return cur
+
+    def _map(self, e: FileEntry):
+        f = open(self._abs(e.path), "rb")
+        try:
+            if e.size == 0:
+                return f, b""
+            return f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except Exception:
+            f.close()
+            raise
+
+    def digest(self, e: FileEntry) -> str:
+        if e.digest is None:
+            f, mm = self._map(e)
+            try:
+                e.digest = hashlib.sha256(mm).hexdigest()
+                e.binary = b"\x00" in mm[:2048]
+            finally:
+                if isinstance(mm, mmap.mmap):
+                    mm.close()
+                f.close()
+        return e.digest
+
+    def is_binary(self, e: FileEntry) -> bool:
+        if e.binary is None:
+            self.digest(e)
+        return bool(e.binary)
+
+    def text(self, e: FileEntry, max_chars: int) -> str:
+        """Up to max_chars of the file's text (UTF-8, invalid bytes replaced)."""
+        key = (e.path, e.mtime_ns, e.size)
+        with self._lock:
+            cached = self._text.get(key)
+            if cached is not None and (len(cached) >= max_chars or len(cached) == e.size):
+                self._text.move_to_end(key)
+                return cached[:max_chars]
+        f, mm = self._map(e)
+        try:
+            # A UTF-8 character is at most 4 bytes; never decode more than needed.
+            limit = min(e.size, max_chars * 4)
+            s = bytes(mm[:limit]).decode("utf-8", errors="replace")
+        finally:
+            if isinstance(mm, mmap.mmap):
+                mm.close()
+            f.close()
+        with self._lock:
+            old = self._text.pop(key, None)
+            if old is not None:
+                self._text_chars -= len(old)
+            self._text[key] = s
+            self._text_chars += len(s)
+            while self._text_chars > self.max_text_chars and len(self._text) > 1:
+                _, ev = self._text.popitem(last=False)
+                self._text_chars -= len(ev)
+        return s[:max_chars]
+
+    def listing(self, rel_dir: str = "") -> Tuple[List[str], List[str]]:
+        """(subdirs, files) of a repo directory, cached while its mtime holds."""
+        path = self._abs(rel_dir) if rel_dir else self.repo_root
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            return [], []
+        with self._lock:
+            cached = self._dirs.get(rel_dir)
+            if cached is not None and cached[0] == mtime:
+                return cached[1], cached[2]
+            if cached is not None:
+                self.generation += 1
+        dirs: List[str] = []
+        files: List[str] = []
+        try:
+            with os.scandir(path) as it:
+                for de in it:
+                    rel = f"{rel_dir}/{de.name}" if rel_dir else de.name
+                    try:
+                        if de.is_dir(follow_symlinks=False):
+                            if de.name not in SKIP_DIRS:
+                                dirs.append(rel)
+                        elif de.is_file():
+                            files.append(rel)
+                    except OSError:
+                        continue
+        except OSError:
+            return [], []
+        dirs.sort()
+        files.sort()
+        with self._lock:
+            self._dirs[rel_dir] = (mtime, dirs, files)
+        return dirs, files
+
+    def is_dir(self, rel: str) -> bool:
+        if self.files is not None:
+            return self.files.is_dir(rel)
+        return os.path.isdir(self._abs(rel))
+
+    def walk(self, rel_dir: str = "") -> List[str]:
+        if self.files is not None:
+            return self.files.paths(rel_dir)
+        out: List[str] = []
+        stack = [rel_dir]
+        while stack:
+            d = stack.pop()
+            dirs, files = self.listing(d)
+            out.extend(files)
+            stack.extend(reversed(dirs))
+        return out
+
+    def note_included(self, rel: str) -> None:
+        with self._lock:
+            self._recent[rel] = None
+            self._recent.move_to_end(rel)
+            while len(self._recent) > MAX_RECENT_FILES:
+                self._recent.popitem(last=False)
+
+    def refresh_recent(self) -> bool:
+        """Re-stat files included in recent contexts; True if anything changed."""
+        before = self.generation
+        if self.files is not None and self.files.reload_if_changed():
+            with self._lock:
+                self.generation += 1
+        with self._lock:
+            files = list(self._recent)
+        for rel in files:
+            if self.entry(rel) is None:
+                with self._lock:
+                    self._recent.pop(rel, None)
+        return self.generation != before
+
+    def refresh(self) -> bool:
+        """Re-stat every known directory and file; True if anything changed."""
+        before = self.generation
+        if self.files is not None and self.files.refresh().dirty:
+            with self._lock:
+                self.generation += 1
+        with self._lock:
+            dirs = list(self._dirs)
+            files = list(self._entries)
+        for d in dirs:
+            self.listing(d)
+        for rel in files:
+            self.entry(rel)
+        return self.generation != before
+
+def _ext(rel: str) -> str:
+    return os.path.splitext(rel)[1].lower()
+
+def _rank(
+    index: FileIndex,
+    profile: str,
+    selected: Optional[str],
+    excluded: List[str],
+) -> List[Tuple[Tuple, str, str]]:
+    """Ranked (sort_key, path, reason) candidates for a profile."""
+    if profile == "minimal":
+        candidates = [selected] if selected else []
+    else:
+        candidates = index.walk()
+    sel_dir = selected.rsplit("/", 1)[0] if selected and "/" in selected else ""
+    ranked = []
+    for rel in candidates:
+        if rel is None or is_excluded(rel, excluded):
+            continue
+        name = rel.rsplit("/", 1)[-1].lower()
+        depth = rel.count("/")
+        if rel == selected:
+            tier, reason = 0, "selected"
+        elif selected and (rel.rsplit("/", 1)[0] if "/" in rel else "") == sel_dir and _ext(rel) in TEXT_EXTS:
+            tier, reason = 1, "near selected"
+        elif name in KEY_DOC_NAMES or (rel.startswith("docs/") and _ext(rel) == ".md"):
+            tier, reason = 2, "key doc"
+        elif profile == "project":
+            continue
+        elif _ext(rel) in TEXT_EXTS:
+            tier, reason = 3, "source"
+        else:
+            continue
+        ranked.append(((tier, depth, rel), rel, reason))
+    ranked.sort()
+    return ranked
+
+def _section(label: str, body: str) -> str:
+    return f"## {label}\n```\n{body}\n```\n\n"
+
+def _section_overhead(label: str) -> int:
+    return len(_section(label, ""))
+
+_HEADER = "# Repository context\n\n"
+
+def assemble_repo_context(
+    index: FileIndex,
+    ui_state: Optional[Dict[str, Any]],
+    project_root: Optional[str] = None,
+) -> RepoContext:
+    ui = ui_state or {}
+    profile = str(ui.get("context_profile") or "repo")
+    if profile not in PROFILES:
+        profile = "repo"
+    budget = max(0, int(ui.get("budget_chars") or 0))
+    excluded = [p for p in (_norm(x) for x in ui.get("excluded_paths") or []) if p]
+    selected = _norm(str(ui.get("selected_path") or "")) if ui.get("selected_path") else None
+
+    ctx = RepoContext(text="", budget_chars=budget)
+    if budget <= len(_HEADER):
+        return ctx
+
+    # Pins and project files, planned up front as (label, entry, reason, reader);
+    # ranked files follow lazily. Labels are unique.
+    plan: List[Tuple[str, FileEntry, str, FileIndex]] = []
+    seen: set[str] = set()
+
+    def add(label: str, e: Optional[FileEntry], reason: str, idx: FileIndex) -> None:
+        if e is None or label in seen:
+            return
+        seen.add(label)
+        plan.append((label, e, reason, idx))
+
+    for raw in ui.get("pinned_paths") or []:
+        rel = _norm(str(raw))
+        if rel is None:
+            ctx.missing_pins.append(str(raw))
+            continue
+        if is_excluded(rel, excluded):
+            ctx.excluded.append(rel)
+            continue
+        if index.is_dir(rel):
+            for f in index.walk(rel):
+                if not is_excluded(f, excluded):
+                    add(f, index.entry(f), "pinned", index)
+            continue
+        e = index.entry(rel)
+        if e is None:
+            ctx.missing_pins.append(rel)
+            continue
+        add(rel, e, "pinned", index)
+
+    if profile == "project" and project_root:
+        pidx = _project_index(project_root)
+        for rel in ["now.md"] + [f for f in pidx.walk("specs")]:
+            e = pidx.entry(rel)
+            if e is not None:
+                add(f"project:{rel}", e, "project", pidx)
+
+    ranked = _rank(index, profile, selected, excluded)
+    if profile == "debug":
+        ctx.ranking = [{"path": rel, "reason": reason} for _, rel, reason in ranked[:200]]
+
+    def ranked_plan() -> Iterator[Tuple[str, FileEntry, str, FileIndex]]:
+        # Lazy: only files the output loop reaches before the budget runs out are stat'ed.
+        for _, rel, reason in ranked:
+            if rel in seen:
+                continue
+            e = index.entry(rel)
+            if e is None or e.size > MAX_RANKED_FILE_BYTES:
+                continue
+            seen.add(rel)
+            yield rel, e, reason, index
+
+    out = [_HEADER]
+    used = len(_HEADER)
+    for label, e, reason, idx in itertools.chain(plan, ranked_plan()):
+        if idx.is_binary(e):
+            continue
+        remaining = budget - used - _section_overhead(label)
+        if remaining < MIN_SECTION_CHARS and remaining < e.size:
+            ctx.truncated = label
+            break
+        # Read one char past what fits to learn whether the file is cut.
+        body = idx.text(e, max(0, remaining) + 1)
+        cut = len(body) > remaining
+        if cut:
+            marker = "\n... [truncated at {n} chars]"
+            keep = max(0, remaining - len(marker.format(n=remaining)))
+            body = body[:keep] + marker.format(n=keep)
+        section = _section(label, body)
+        out.append(section)
+        used += len(section)
+        ctx.files.append({"path": label, "reason": reason, "chars": len(body), "sha256": idx.digest(e)[:16]})
+        idx.note_included(e.path)
+        if cut:
+            ctx.truncated = label
+            break
+
+    if not ctx.files:
+        return ctx
+    ctx.text = "".join(out)
+    return ctx
+
+_indexes: Dict[str, FileIndex] = {}
+_indexes_lock = threading.Lock()
+
+def repo_index(repo_root: str, project_root: Optional[str] = None, persistent: bool = True) -> FileIndex:
+    """
+    Process-wide FileIndex per repo root, so the cache outlives single requests.
+
+    With persistent=True the file list comes from the RepoIndex stored under
+    state_dir(), brought up to date once here and then by refresh().
+    """
+    key = str(Path(repo_root).resolve())
+    with _indexes_lock:
+        idx = _indexes.get(key)
+        if idx is None:
+            files = None
+            if persistent:
+                files = RepoIndex.load(key, project_root)
+                files.refresh()
+            idx = _indexes[key] = FileIndex(key, files)
+        return idx
+
+def indexes() -> List[FileIndex]:
+    with _indexes_lock:
+        return list(_indexes.values())
+
+def _project_index(project_root: str) -> FileIndex:
+    # The wrapper holds logs and state; only now.md and specs/ are read from it.
+    return repo_index(project_root, persistent=False)
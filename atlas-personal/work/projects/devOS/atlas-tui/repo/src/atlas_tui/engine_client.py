@@ -1,21 +1,70 @@
 from __future__ import annotations
 
 import asyncio
-import json
 import os
+import time
 from dataclasses import dataclass
-from typing import Any, Dict, Optional
+from typing import Any, AsyncIterator, Dict, Optional
 
+from .framing import JSONL, FramingError, choose_framing, decode, encode, read_frame_async, supported_framings
 from .models import EngineInput, EngineOutput, Workspace
+from .result_cache import ResultCache, cache_key
+
+# StreamReader line limit for the JSONL fallback (asyncio's default is 64 KiB,
+# well below the size of a large assembled context).
+_JSONL_LINE_LIMIT = 64 * 1024 * 1024
 
 class EngineProtocolError(RuntimeError):
     pass
 
+class EngineDisconnectedError(RuntimeError):
+    """The engine process went away before answering; the request may be retried."""
+
+class EngineCancelledError(RuntimeError):
+    """The request was cancelled by the client before the engine answered."""
+
 @dataclass
 class EngineStatus:
     connected: bool
     message: str = ""
 
+@dataclass
+class EngineEvent:
+    """One item of submit_stream(): an engine event tied to the request, or the final result."""
+
+    request_id: str
+    kind: str  # "progress" | "timing" | "partial" | ... | "result"
+    data: Dict[str, Any]
+    output: Optional[EngineOutput] = None
+
+class _EngineProc:
+    """One engine child, its negotiated framing and the submits it owns (id -> message)."""
+
+    def __init__(self, proc: asyncio.subprocess.Process) -> None:
+        self.proc = proc
+        self.owned: Dict[str, Dict[str, Any]] = {}
+        self.write_framing = JSONL
+        self.read_framing = JSONL
+        self.negotiated = False
+        self.context_version: Optional[str] = None
+        self.ready = asyncio.Event()
+        self.idle = asyncio.Event()
+        self.idle.set()
+        self.reader_task: Optional[asyncio.Task] = None
+
+    def own(self, request_id: str, msg: Dict[str, Any]) -> None:
+        self.owned[request_id] = msg
+        self.idle.clear()
+
+    def send(self, msg: Dict[str, Any]) -> None:
+        assert self.proc.stdin
+        self.proc.stdin.write(encode(msg, self.write_framing))
+
+    def release(self, request_id: str) -> None:
+        self.owned.pop(request_id, None)
+        if not self.owned:
+            self.idle.set()
+
 class EngineClient:
     """
     Long-lived engine child process speaking JSONL over stdin/stdout.
@@ -23,130 +72,368 @@ class EngineClient:
     - Start once
     - submit() sends {"type":"submit","id":..., "payload": EngineInput}
     - read loop resolves futures for {"type":"result","id":..., "ok":...}
+    - cancel() sends {"type":"cancel","id":...}; every submit also carries an
+      absolute "deadline" (epoch seconds) after which the engine should give up
+    - submit_stream() also yields {"type":"event","id":...} messages for the
+      request (progress, stage timings, partial system chunks) as they arrive
+
+    Submits are pipelined: any number may be in flight at once and results are
+    matched by id, so the engine is free to answer out of order.
+
+    restart() is a hot swap: the replacement is spawned and must announce itself
+    with its startup event before new submits are routed to it. The old process
+    then drains for up to drain_timeout_s; whatever it still owns is resubmitted
+    to the replacement before the old process is terminated.
+
+    Framing is negotiated per process: if the startup event offers a
+    length-prefixed framing that this client prefers, the client answers with a
+    hello and both sides switch; otherwise JSONL stays in use.
+
+    With a ResultCache, submits are answered locally when an identical
+    EngineInput was already assembled under the engine's current
+    context_version (announced in the startup event). Engines report changed
+    inputs with a context_changed event, which empties the cache.
     """
 
-    def __init__(self, cmd: list[str], workspace: Workspace, timeout_s: float = 60.0) -> None:
+    def __init__(
+        self,
+        cmd: list[str],
+        workspace: Workspace,
+        timeout_s: float = 60.0,
+        startup_timeout_s: float = 10.0,
+        drain_timeout_s: float = 5.0,
+        framing: str = "auto",
+        result_cache: Optional[ResultCache] = None,
+    ) -> None:
         self.cmd = cmd
         self.workspace = workspace
         self.timeout_s = timeout_s
+        self.startup_timeout_s = startup_timeout_s
+        self.drain_timeout_s = drain_timeout_s
+        # "auto" takes the best framing both sides support; "jsonl" disables negotiation.
+        self._preferred = supported_framings() if framing == "auto" else [framing]
+        self.result_cache = result_cache
 
-        self._proc: Optional[asyncio.subprocess.Process] = None
-        self._reader_task: Optional[asyncio.Task] = None
+        self._cur: Optional[_EngineProc] = None
+        self._retiring: list[_EngineProc] = []
         self._pending: Dict[str, asyncio.Future] = {}
+        self._streams: Dict[str, asyncio.Queue] = {}
+        self._start_lock = asyncio.Lock()
         self.status = EngineStatus(connected=False, message="not started")
 
+    @property
+    def in_flight(self) -> int:
+        return len(self._pending)
+
+    @property
+    def context_version(self) -> Optional[str]:
+        return self._cur.context_version if self._cur else None
+
+    @property
+    def alive(self) -> bool:
+        return bool(self._cur and self._cur.proc.returncode is None and self.status.connected)
+
     async def start(self) -> None:
-        if self._proc and self._proc.returncode is None:
+        if self._cur and self._cur.proc.returncode is None:
             return
+        # Concurrent submits all call start(); only the first may spawn.
+        async with self._start_lock:
+            if self._cur and self._cur.proc.returncode is None:
+                return
+            self._cur = await self._spawn()
+            self.status = EngineStatus(connected=True, message="connected")
 
+    async def _spawn(self) -> _EngineProc:
         env = os.environ.copy()
         env["ATLAS_REPO_ROOT"] = self.workspace.repo_root
         if self.workspace.project_root:
             env["ATLAS_PROJECT_ROOT"] = self.workspace.project_root
 
-        self._proc = await asyncio.create_subprocess_exec(
+        proc = await asyncio.create_subprocess_exec(
             *self.cmd,
             stdin=asyncio.subprocess.PIPE,
             stdout=asyncio.subprocess.PIPE,
             stderr=asyncio.subprocess.PIPE,
             cwd=self.workspace.repo_root,
             env=env,
+            limit=_JSONL_LINE_LIMIT,
         )
-        self.status = EngineStatus(connected=True, message="connected")
-        self._reader_task = asyncio.create_task(self._read_stdout_loop())
-        asyncio.create_task(self._read_stderr_loop())
+        ep = _EngineProc(proc)
+        ep.reader_task = asyncio.create_task(self._read_stdout_loop(ep))
+        asyncio.create_task(self._read_stderr_loop(proc))
+        return ep
+
+    async def _terminate(self, ep: _EngineProc) -> None:
+        if ep.reader_task:
+            ep.reader_task.cancel()
+            ep.reader_task = None
+        await self._end_process(ep.proc)
+
+    async def _end_process(self, proc: asyncio.subprocess.Process) -> None:
+        if proc.returncode is None:
+            try:
+                proc.terminate()
+            except ProcessLookupError:
+                pass
+            try:
+                await asyncio.wait_for(proc.wait(), timeout=0.75)
+            except asyncio.TimeoutError:
+                try:
+                    proc.kill()
+                except ProcessLookupError:
+                    pass
+                await proc.wait()
 
     async def stop(self) -> None:
-        if not self._proc:
+        procs = ([self._cur] if self._cur else []) + self._retiring
+        if not procs:
             return
-        proc = self._proc
-        self._proc = None
-
-        if self._reader_task:
-            self._reader_task.cancel()
-            self._reader_task = None
+        self._cur = None
+        self._retiring = []
 
         # Fail any pending requests immediately.
         for k, fut in list(self._pending.items()):
             if not fut.done():
-                fut.set_result(RuntimeError("Engine stopped"))
+                fut.set_result(EngineDisconnectedError("Engine stopped"))
             self._pending.pop(k, None)
 
         try:
-            if proc.returncode is None:
-                try:
-                    proc.terminate()
-                except ProcessLookupError:
-                    pass
-                try:
-                    await asyncio.wait_for(proc.wait(), timeout=0.75)
-                except asyncio.TimeoutError:
-                    try:
-                        proc.kill()
-                    except ProcessLookupError:
-                        pass
-                    await proc.wait()
+            for ep in procs:
+                await self._terminate(ep)
         finally:
             self.status = EngineStatus(connected=False, message="stopped")
 
     async def restart(self) -> None:
-        await self.stop()
-        await asyncio.sleep(0.1)
-        await self.start()
+        async with self._start_lock:
+            old = self._cur
+            if old is None or not self.alive:
+                # Nothing to keep serving; plain (re)start.
+                self._cur = await self._spawn()
+                self.status = EngineStatus(connected=True, message="connected")
+                if old is not None:
+                    self._retiring.append(old)
+                    await self._retire(old)
+                return
 
-    async def submit(self, request_id: str, engine_input: EngineInput) -> EngineOutput:
+            self.status = EngineStatus(connected=True, message="restarting")
+            new = await self._spawn()
+            try:
+                await asyncio.wait_for(new.ready.wait(), timeout=self.startup_timeout_s)
+            except asyncio.TimeoutError:
+                if new.proc.returncode is not None:
+                    await self._terminate(new)
+                    self.status = EngineStatus(connected=True, message="restart failed")
+                    raise EngineDisconnectedError("Replacement engine exited during startup")
+                # Silent engine that is still running; accept it.
+            self._cur = new
+            self._retiring.append(old)
+            self.status = EngineStatus(connected=True, message="connected")
+
+        await self._retire(old)
+
+    async def _retire(self, old: _EngineProc) -> None:
+        try:
+            if old.proc.returncode is None:
+                try:
+                    await asyncio.wait_for(old.idle.wait(), timeout=self.drain_timeout_s)
+                except asyncio.TimeoutError:
+                    pass
+            await self._handoff(old)
+            await self._terminate(old)
+        finally:
+            if old in self._retiring:
+                self._retiring.remove(old)
+
+    async def _handoff(self, old: _EngineProc) -> None:
+        """Resubmit whatever old still owns to the current process."""
+        cur = self._cur
+        for req_id, msg in list(old.owned.items()):
+            old.release(req_id)
+            fut = self._pending.get(req_id)
+            if fut is None or fut.done():
+                continue
+            if cur is None or cur is old or not cur.proc.stdin or cur.proc.returncode is not None:
+                self._pending.pop(req_id, None)
+                fut.set_result(EngineDisconnectedError("Engine disconnected"))
+                continue
+            cur.own(req_id, msg)
+            try:
+                cur.send(msg)
+            except (BrokenPipeError, ConnectionResetError):
+                cur.release(req_id)
+                self._pending.pop(req_id, None)
+                fut.set_result(EngineDisconnectedError("Engine disconnected"))
+        if cur is not None and cur.proc.stdin:
+            try:
+                await cur.proc.stdin.drain()
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+
+    async def submit(
+        self,
+        request_id: str,
+        engine_input: EngineInput,
+        stream: bool = False,
+        partial_chars: Optional[int] = None,
+    ) -> EngineOutput:
         await self.start()
-        if not self._proc or not self._proc.stdin or not self._proc.stdout:
-            raise RuntimeError("Engine process not available.")
+        ep = self._cur
+        if not ep or not ep.proc.stdin or not ep.proc.stdout:
+            raise EngineDisconnectedError("Engine process not available.")
+
+        key: Optional[str] = None
+        version = ep.context_version
+        if self.result_cache is not None and version:
+            key = cache_key(engine_input, version)
+            cached = self.result_cache.get(key)
+            if cached is not None:
+                return EngineOutput.from_dict(_with_cache_marker(cached, key, hit=True))
 
         fut: asyncio.Future = asyncio.get_event_loop().create_future()
         self._pending[request_id] = fut
 
-        msg = {"type": "submit", "id": request_id, "payload": engine_input.to_dict()}
-        line = (json.dumps(msg, ensure_ascii=False) + "\n").encode("utf-8")
-        self._proc.stdin.write(line)
-        await self._proc.stdin.drain()
+        msg: Dict[str, Any] = {
+            "type": "submit",
+            "id": request_id,
+            "deadline": time.time() + self.timeout_s,
+            "payload": engine_input.to_dict(),
+        }
+        if stream:
+            msg["stream"] = True
+            if partial_chars is not None:
+                msg["partial_chars"] = partial_chars
+        ep.own(request_id, msg)
+        try:
+            ep.send(msg)
+            await ep.proc.stdin.drain()
+        except (BrokenPipeError, ConnectionResetError) as e:
+            ep.release(request_id)
+            self._pending.pop(request_id, None)
+            raise EngineDisconnectedError(f"Engine stdin closed: {e}") from e
 
         try:
             result = await asyncio.wait_for(fut, timeout=self.timeout_s)
         except asyncio.TimeoutError:
-            self._pending.pop(request_id, None)
+            self._abandon(request_id)
             self.status = EngineStatus(connected=True, message="timeout")
             raise RuntimeError(f"Engine request timed out after {self.timeout_s:.0f}s")
+        except asyncio.CancelledError:
+            self._abandon(request_id)
+            raise
 
         if isinstance(result, Exception):
             raise result
+        if key is not None and self.result_cache is not None:
+            result_version = (result.get("diagnostics") or {}).get("context_version", version)
+            # Only keep results assembled under the version the key was built with.
+            if result_version == version == self.context_version:
+                self.result_cache.put(key, result)
+            return EngineOutput.from_dict(_with_cache_marker(result, key, hit=False))
         return EngineOutput.from_dict(result)
 
-    async def _read_stdout_loop(self) -> None:
-        assert self._proc and self._proc.stdout
-        stdout = self._proc.stdout
+    def cancel(self, request_id: str) -> bool:
+        """Cancel an in-flight request; its submit() raises EngineCancelledError."""
+        fut = self._pending.get(request_id)
+        if fut is None or fut.done():
+            return False
+        self._abandon(request_id)
+        fut.set_result(EngineCancelledError(f"Request {request_id} cancelled"))
+        return True
+
+    def _abandon(self, request_id: str) -> None:
+        # Forget the request locally and tell whichever process owns it to stop,
+        # so it neither burns engine time nor emits an orphaned result.
+        self._pending.pop(request_id, None)
+        for ep in ([self._cur] if self._cur else []) + self._retiring:
+            if request_id not in ep.owned:
+                continue
+            ep.release(request_id)
+            if ep.proc.stdin and ep.proc.returncode is None:
+                try:
+                    ep.send({"type": "cancel", "id": request_id})
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+
+    async def submit_stream(
+        self, request_id: str, engine_input: EngineInput, partial_chars: Optional[int] = None
+    ) -> AsyncIterator[EngineEvent]:
+        """
+        Submit and yield the request's events as they arrive, ending with kind="result".
+
+        partial_chars asks the engine to stream only that prefix of the system
+        prompt; the full string still arrives with the result.
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+        self._streams[request_id] = queue
+        task = asyncio.create_task(self.submit(request_id, engine_input, stream=True, partial_chars=partial_chars))
         try:
             while True:
-                raw = await stdout.readline()
-                if not raw:
-                    break
-                line = raw.decode("utf-8", errors="replace").strip()
-                if not line:
+                getter = asyncio.ensure_future(queue.get())
+                done, _ = await asyncio.wait({getter, task}, return_when=asyncio.FIRST_COMPLETED)
+                if getter in done:
+                    yield _to_event(request_id, getter.result())
                     continue
+                getter.cancel()
+                break
+            # Events precede their result on the wire, so anything left is already queued.
+            while not queue.empty():
+                yield _to_event(request_id, queue.get_nowait())
+            yield EngineEvent(request_id=request_id, kind="result", data={}, output=task.result())
+        finally:
+            self._streams.pop(request_id, None)
+            if not task.done():
+                task.cancel()
+
+    async def _read_stdout_loop(self, ep: _EngineProc) -> None:
+        assert ep.proc.stdout
+        stdout = ep.proc.stdout
+        try:
+            while True:
+                if ep.read_framing == JSONL:
+                    raw = await stdout.readline()
+                    if not raw:
+                        break
+                    raw = raw.strip()
+                    if not raw:
+                        continue
+                else:
+                    try:
+                        raw = await read_frame_async(stdout)
+                    except FramingError as e:
+                        # A bad length header leaves no frame boundary to resync
+                        # on; end the process so the next submit respawns it.
+                        self._fail_owned(ep, EngineProtocolError(f"Engine emitted a bad {ep.read_framing} frame header: {e}"))
+                        await self._end_process(ep.proc)
+                        break
+                    if raw is None:
+                        break
                 try:
-                    obj = json.loads(line)
-                except json.JSONDecodeError:
-                    # Protocol violation; fail all pending.
-                    err = EngineProtocolError(f"Engine emitted non-JSON on stdout: {line[:200]}")
-                    for k, fut in list(self._pending.items()):
-                        if not fut.done():
-                            fut.set_result(err)
-                        self._pending.pop(k, None)
-                    self.status = EngineStatus(connected=False, message="protocol error")
+                    obj = decode(raw, ep.read_framing)
+                except ValueError:
+                    # Protocol violation; fail everything this process owns.
+                    snippet = raw[:200].decode("utf-8", errors="replace")
+                    self._fail_owned(ep, EngineProtocolError(f"Engine emitted undecodable {ep.read_framing} on stdout: {snippet}"))
                     continue
 
                 mtype = obj.get("type")
+                if mtype == "event":
+                    req_id = obj.get("id")
+                    if req_id:
+                        queue = self._streams.get(req_id)
+                        if queue is not None:
+                            queue.put_nowait(obj)
+                    else:
+                        # Startup/framing events are acted on before anyone may
+                        # route to this process.
+                        self._on_engine_event(ep, obj)
+                ep.ready.set()
+
                 if mtype == "result":
                     req_id = obj.get("id")
                     ok = bool(obj.get("ok"))
                     if not req_id:
                         continue
+                    ep.release(req_id)
                     fut = self._pending.pop(req_id, None)
                     if fut is None or fut.done():
                         continue
@@ -155,25 +442,64 @@ class EngineClient:
                     else:
                         e = obj.get("error") or {}
                         fut.set_result(RuntimeError(f"Engine error: {e.get('code','error')} - {e.get('message','')}"))
-                elif mtype == "event":
-                    # v2: ignore events; could be surfaced in a debug pane later.
-                    continue
-                else:
-                    continue
         finally:
             # Process ended
-            self.status = EngineStatus(connected=False, message="disconnected")
-            for k, fut in list(self._pending.items()):
-                if not fut.done():
-                    fut.set_result(RuntimeError("Engine disconnected"))
-                self._pending.pop(k, None)
-
-    async def _read_stderr_loop(self) -> None:
-        if not self._proc or not self._proc.stderr:
+            if ep is self._cur:
+                self.status = EngineStatus(connected=False, message="disconnected")
+                for k in list(ep.owned):
+                    ep.release(k)
+                    fut = self._pending.pop(k, None)
+                    if fut is not None and not fut.done():
+                        fut.set_result(EngineDisconnectedError("Engine disconnected"))
+            elif ep.owned:
+                # A retiring process died mid-drain; its work moves to the replacement.
+                asyncio.create_task(self._handoff(ep))
+
+    def _fail_owned(self, ep: _EngineProc, err: Exception) -> None:
+        for k in list(ep.owned):
+            ep.release(k)
+            fut = self._pending.pop(k, None)
+            if fut is not None and not fut.done():
+                fut.set_result(err)
+        if ep is self._cur:
+            self.status = EngineStatus(connected=False, message="protocol error")
+
+    def _on_engine_event(self, ep: _EngineProc, obj: Dict[str, Any]) -> None:
+        version = obj.get("context_version")
+        if isinstance(version, str) and version != ep.context_version:
+            if ep.context_version is not None and self.result_cache is not None:
+                # The engine's inputs changed; nothing cached is trustworthy.
+                self.result_cache.clear()
+            ep.context_version = version
+
+        if not ep.negotiated:
+            # The first event is the startup event; it carries the framing offer.
+            ep.negotiated = True
+            selected = choose_framing(obj.get("framing"), self._preferred)
+            if selected != JSONL and ep.proc.stdin:
+                # The hello is the last JSONL line we write to this process.
+                ep.send({"type": "hello", "framing": selected})
+                ep.write_framing = selected
+        selected = obj.get("framing_selected")
+        if selected and selected == ep.write_framing:
+            # Engine ack; everything after this line arrives framed.
+            ep.read_framing = selected
+
+    async def _read_stderr_loop(self, proc: asyncio.subprocess.Process) -> None:
+        if not proc.stderr:
             return
         while True:
-            raw = await self._proc.stderr.readline()
+            raw = await proc.stderr.readline()
             if not raw:
                 break
             # v2: ignore stderr; future: route to debug view / error log
             await asyncio.sleep(0)
+
+def _to_event(request_id: str, obj: Dict[str, Any]) -> EngineEvent:
+    return EngineEvent(request_id=request_id, kind=str(obj.get("kind") or "event"), data=obj)
+
+def _with_cache_marker(payload: Dict[str, Any], key: str, hit: bool) -> Dict[str, Any]:
+    # Copy rather than mutate: the cached payload is shared between hits.
+    diagnostics = dict(payload.get("diagnostics") or {})
+    diagnostics["result_cache"] = {"hit": hit, "key": key[:16]}
+    return {**payload, "diagnostics": diagnostics}
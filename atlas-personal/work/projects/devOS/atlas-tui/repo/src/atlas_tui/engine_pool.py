@@ -0,0 +1,204 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import AsyncIterator, List, Optional
+
+from .engine_client import EngineCancelledError, EngineClient, EngineDisconnectedError, EngineEvent, EngineStatus
+from .models import EngineInput, EngineOutput, Workspace
+from .result_cache import ResultCache
+
+# Weight of the newest sample in the per-worker latency average.
+_LATENCY_ALPHA = 0.3
+
+# A request whose worker died is retried once, on another worker when there is
+# one; a request that keeps crashing its engine must not take down every worker.
+_MAX_ATTEMPTS = 2
+
+@dataclass
+class WorkerStats:
+    index: int
+    in_flight: int = 0
+    completed: int = 0
+    failed: int = 0
+    respawns: int = 0
+    latency_ms: Optional[float] = None
+    last_latency_ms: Optional[float] = None
+
+class EnginePool:
+    """
+    Supervises N engine child processes, each driven by its own EngineClient.
+
+    - submit() goes to the least-loaded worker (fewest in flight, then lowest
+      average latency)
+    - a worker whose process dies is respawned; requests it lost are resubmitted
+      to the pool instead of failing
+    - an optional ResultCache is shared by all workers
+    - same start/stop/restart/submit/status surface as EngineClient
+    """
+
+    def __init__(
+        self,
+        cmd: list[str],
+        workspace: Workspace,
+        timeout_s: float = 60.0,
+        workers: int = 2,
+        framing: str = "auto",
+        result_cache: Optional[ResultCache] = None,
+    ) -> None:
+        self.cmd = cmd
+        self.workspace = workspace
+        self.timeout_s = timeout_s
+        self._workers: List[EngineClient] = [
+            EngineClient(cmd=cmd, workspace=workspace, timeout_s=timeout_s, framing=framing, result_cache=result_cache)
+            for _ in range(max(1, workers))
+        ]
+        self._stats: List[WorkerStats] = [WorkerStats(index=i) for i in range(len(self._workers))]
+        self._respawning: dict[int, asyncio.Task] = {}
+        # Requests inside _dispatch, and those cancelled while no worker owned them.
+        self._dispatching: set[str] = set()
+        self._cancelled: set[str] = set()
+        self.status = EngineStatus(connected=False, message="not started")
+
+    @property
+    def size(self) -> int:
+        return len(self._workers)
+
+    @property
+    def in_flight(self) -> int:
+        return sum(w.in_flight for w in self._workers)
+
+    def stats(self) -> List[WorkerStats]:
+        for st, w in zip(self._stats, self._workers):
+            st.in_flight = w.in_flight
+        return list(self._stats)
+
+    def _refresh_status(self) -> None:
+        up = sum(1 for w in self._workers if w.alive)
+        depth = ",".join(str(w.in_flight) for w in self._workers)
+        self.status = EngineStatus(connected=up > 0, message=f"{up}/{self.size} workers (queue {depth})")
+
+    async def start(self) -> None:
+        await asyncio.gather(*(w.start() for w in self._workers))
+        self._refresh_status()
+
+    async def stop(self) -> None:
+        for t in self._respawning.values():
+            t.cancel()
+        self._respawning.clear()
+        await asyncio.gather(*(w.stop() for w in self._workers))
+        self.status = EngineStatus(connected=False, message="stopped")
+
+    async def restart(self) -> None:
+        # Each worker hot-swaps itself, so the pool never stops serving.
+        await asyncio.gather(*(w.restart() for w in self._workers))
+        self._refresh_status()
+
+    def cancel(self, request_id: str) -> bool:
+        cancelled = any([w.cancel(request_id) for w in self._workers])
+        if request_id in self._dispatching:
+            # Between retry attempts no worker owns the request; stop the next one.
+            self._cancelled.add(request_id)
+            return True
+        return cancelled
+
+    def _pick(self, exclude: set[int]) -> int:
+        candidates = [i for i in range(self.size) if i not in exclude and i not in self._respawning]
+        if not candidates:
+            candidates = [i for i in range(self.size) if i not in exclude] or list(range(self.size))
+
+        def load(i: int):
+            lat = self._stats[i].latency_ms
+            return (self._workers[i].in_flight, lat if lat is not None else 0.0, i)
+
+        return min(candidates, key=load)
+
+    def _respawn(self, i: int) -> None:
+        if i in self._respawning:
+            return
+
+        async def _run() -> None:
+            try:
+                await self._workers[i].restart()
+                self._stats[i].respawns += 1
+            finally:
+                self._respawning.pop(i, None)
+                self._refresh_status()
+
+        self._respawning[i] = asyncio.create_task(_run())
+
+    async def submit(self, request_id: str, engine_input: EngineInput) -> EngineOutput:
+        out: Optional[EngineOutput] = None
+        async for ev in self._dispatch(request_id, engine_input, stream=False, partial_chars=None):
+            out = ev.output
+        assert out is not None
+        return out
+
+    async def submit_stream(
+        self, request_id: str, engine_input: EngineInput, partial_chars: Optional[int] = None
+    ) -> AsyncIterator[EngineEvent]:
+        # A retried request streams again from the start; partial chunks carry
+        # offsets, so consumers can simply overwrite.
+        async for ev in self._dispatch(request_id, engine_input, stream=True, partial_chars=partial_chars):
+            yield ev
+
+    async def _dispatch(
+        self, request_id: str, engine_input: EngineInput, stream: bool, partial_chars: Optional[int]
+    ) -> AsyncIterator[EngineEvent]:
+        self._dispatching.add(request_id)
+        try:
+            async for ev in self._attempts(request_id, engine_input, stream, partial_chars):
+                yield ev
+        finally:
+            self._dispatching.discard(request_id)
+            self._cancelled.discard(request_id)
+
+    async def _attempts(
+        self, request_id: str, engine_input: EngineInput, stream: bool, partial_chars: Optional[int]
+    ) -> AsyncIterator[EngineEvent]:
+        tried: set[int] = set()
+        for attempt in range(_MAX_ATTEMPTS):
+            i = self._pick(tried)
+            pending = self._respawning.get(i)
+            if pending is not None:
+                # Wait for the respawn without inheriting its failure.
+                await asyncio.wait({pending})
+            if request_id in self._cancelled:
+                raise EngineCancelledError(f"Request {request_id} cancelled")
+            worker, st = self._workers[i], self._stats[i]
+            t0 = time.perf_counter()
+            try:
+                if stream:
+                    async for ev in worker.submit_stream(request_id, engine_input, partial_chars):
+                        if ev.output is not None:
+                            self._record(st, t0)
+                        yield ev
+                else:
+                    out = await worker.submit(request_id, engine_input)
+                    self._record(st, t0)
+                    yield EngineEvent(request_id=request_id, kind="result", data={}, output=out)
+                return
+            except EngineDisconnectedError:
+                st.failed += 1
+                self._respawn(i)
+                tried.add(i)
+                self._refresh_status()
+                if attempt == _MAX_ATTEMPTS - 1:
+                    raise
+                continue
+            except EngineCancelledError:
+                # A user cancel is not a worker failure; keep it out of the stats.
+                raise
+            except Exception:
+                st.failed += 1
+                self._refresh_status()
+                raise
+        raise EngineDisconnectedError("No engine worker available.")
+
+    def _record(self, st: WorkerStats, t0: float) -> None:
+        ms = (time.perf_counter() - t0) * 1000.0
+        st.completed += 1
+        st.last_latency_ms = ms
+        st.latency_ms = ms if st.latency_ms is None else (1 - _LATENCY_ALPHA) * st.latency_ms + _LATENCY_ALPHA * ms
+        self._refresh_status()
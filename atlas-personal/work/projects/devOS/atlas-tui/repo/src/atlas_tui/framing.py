@@ -0,0 +1,93 @@
+"""Wire framing for the engine protocol.
+
+- jsonl:      one JSON object per line (the default and fallback)
+- lp-json:    4-byte big-endian length prefix + UTF-8 JSON payload
+- lp-msgpack: 4-byte big-endian length prefix + msgpack payload
+
+Length-prefixed frames are read with exact-size reads, so large payloads need
+no line scanning and are not subject to StreamReader line limits.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import struct
+from typing import Any, BinaryIO, Dict, List, Optional
+
+try:  # optional: faster and smaller than JSON for large context packs
+    import msgpack  # type: ignore[import-not-found]
+except ImportError:  # pragma: no cover - depends on environment
+    msgpack = None
+
+JSONL = "jsonl"
+LP_JSON = "lp-json"
+LP_MSGPACK = "lp-msgpack"
+
+# Upper bound on a single frame; guards against reading garbage as a length.
+MAX_FRAME_BYTES = 256 * 1024 * 1024
+
+_HEADER = struct.Struct(">I")
+
+class FramingError(ValueError):
+    pass
+
+def supported_framings() -> List[str]:
+    """Framings this process can speak, most preferred first."""
+    out = [LP_JSON, JSONL]
+    if msgpack is not None:
+        out.insert(0, LP_MSGPACK)
+    return out
+
+def choose_framing(offered: Any, preferred: Optional[List[str]] = None) -> str:
+    """Pick the first of `preferred` the peer offered; JSONL if none match."""
+    if not isinstance(offered, list):
+        return JSONL
+    for f in preferred if preferred is not None else supported_framings():
+        if f in offered:
+            return f
+    return JSONL
+
+def encode(obj: Dict[str, Any], framing: str) -> bytes:
+    if framing == JSONL:
+        return (json.dumps(obj, ensure_ascii=False) + "\n").encode("utf-8")
+    if framing == LP_JSON:
+        body = json.dumps(obj, ensure_ascii=False).encode("utf-8")
+    elif framing == LP_MSGPACK and msgpack is not None:
+        body = msgpack.packb(obj, use_bin_type=True)
+    else:
+        raise FramingError(f"unsupported framing: {framing}")
+    return _HEADER.pack(len(body)) + body
+
+def decode(payload: bytes, framing: str) -> Dict[str, Any]:
+    """Decode one frame body (or one JSONL line) without re-encoding it."""
+    if framing == LP_MSGPACK and msgpack is not None:
+        return msgpack.unpackb(payload, raw=False)
+    if framing in (LP_JSON, JSONL):
+        return json.loads(payload)
+    raise FramingError(f"unsupported framing: {framing}")
+
+def _frame_size(header: bytes) -> int:
+    (n,) = _HEADER.unpack(header)
+    if n > MAX_FRAME_BYTES:
+        raise FramingError(f"frame of {n} bytes exceeds limit")
+    return n
+
+def read_frame(f: BinaryIO) -> Optional[bytes]:
+    """Read one length-prefixed frame from a blocking binary stream; None at EOF."""
+    header = f.read(_HEADER.size)
+    if len(header) < _HEADER.size:
+        return None
+    n = _frame_size(header)
+    body = f.read(n)
+    if len(body) < n:
+        return None
+    return body
+
+async def read_frame_async(reader: asyncio.StreamReader) -> Optional[bytes]:
+    """Read one length-prefixed frame from a StreamReader; None at EOF."""
+    try:
+        header = await reader.readexactly(_HEADER.size)
+        return await reader.readexactly(_frame_size(header))
+    except asyncio.IncompleteReadError:
+        return None
@@ -0,0 +1,241 @@
+"""Append-only segments of compressed assembled logs.
+
+<base>/archive/assembled-YYYYMMDD.jsonl.gz (or .zst) is the segment for one
+day. Each record is an independently compressed frame, so a segment is also
+a valid multi-member gzip/zstd stream of JSONL. The sidecar <name>.idx is
+append-only as well, one "request_id<TAB>offset<TAB>length<TAB>ts" line per
+record. Readers cache the index per segment and read only the lines added
+since, so finding a record is a dict lookup and reading it decompresses one
+frame.
+
+Segments are filled by retention (compacting loose logs) and, for
+high-volume sessions, directly by LogWriter(segments=True).
+
+Records are addressed as "<segment path>#<request_id>" wherever a log path
+is expected (catalog, latest pointer, read_assembled_log).
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from .blob_store import EXT, GZIP, ZSTD, compress, decompress, default_codec
+
+try:  # cross-process append lock (TUI writer vs. `atlas-tui-logs compact`)
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None  # type: ignore[assignment]
+
+ARCHIVE_DIR = "archive"
+_PREFIX = "assembled-"
+_INDEX_EXT = ".idx"
+
+_lock = threading.Lock()
+
+def archive_dir(base_dir: Path) -> Path:
+    return Path(base_dir) / ARCHIVE_DIR
+
+def archive_path(base_dir: Path, day: str, codec: Optional[str] = None) -> Path:
+    """Segment for a day (YYYYMMDD); an existing segment keeps the codec it was created with."""
+    d = archive_dir(base_dir)
+    for c in (ZSTD, GZIP):
+        p = d / f"{_PREFIX}{day}.jsonl{EXT[c]}"
+        if p.exists():
+            return p
+    return d / f"{_PREFIX}{day}.jsonl{EXT[codec or default_codec()]}"
+
+def index_path(data_path: Path) -> Path:
+    return data_path.with_name(data_path.name + _INDEX_EXT)
+
+def archive_day(data_path: Path) -> str:
+    return data_path.name[len(_PREFIX):len(_PREFIX) + 8]
+
+def list_archives(base_dir: Path) -> List[Path]:
+    d = archive_dir(base_dir)
+    if not d.is_dir():
+        return []
+    return sorted(p for p in d.iterdir() if p.name.startswith(_PREFIX) and not p.name.endswith((_INDEX_EXT, ".tmp")))
+
+def _codec(data_path: Path) -> str:
+    return ZSTD if data_path.suffix == EXT[ZSTD] else GZIP
+
+def is_archive_ref(path_or_ref: Any) -> bool:
+    path, sep, _ = str(path_or_ref).rpartition("#")
+    return bool(sep) and Path(path).name.startswith(_PREFIX)
+
+def make_ref(data_path: Path, request_id: str) -> str:
+    return f"{data_path}#{request_id}"
+
+def split_ref(ref: Any) -> Tuple[Path, str]:
+    path, _, request_id = str(ref).rpartition("#")
+    return Path(path), request_id
+
+class _SegmentIndex:
+    """In-memory copy of one sidecar index, extended by reading only new lines."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._reset(None)
+
+    def _reset(self, ino: Optional[int]) -> None:
+        self.ino = ino
+        self.pos = 0
+        # request_id -> (offset, length, ts); by_ts is (ts, request_id), sorted.
+        self.entries: Dict[str, Tuple[int, int, str]] = {}
+        self.by_ts: List[Tuple[str, str]] = []
+
+    def refresh(self) -> None:
+        try:
+            st = self.path.stat()
+        except FileNotFoundError:
+            self._reset(None)
+            return
+        if st.st_ino != self.ino or st.st_size < self.pos:
+            self._reset(st.st_ino)
+        if st.st_size == self.pos:
+            return
+        with self.path.open("rb") as f:
+            f.seek(self.pos)
+            chunk = f.read(st.st_size - self.pos)
+        # A line without its newline is an append still in progress (or torn).
+        end = chunk.rfind(b"\n") + 1
+        added: List[Tuple[str, str]] = []
+        rewritten = False
+        for line in chunk[:end].decode("utf-8", errors="replace").splitlines():
+            parts = line.split("\t")
+            if len(parts) != 4:
+                continue
+            try:
+                entry = (int(parts[1]), int(parts[2]), parts[3])
+            except ValueError:
+                continue
+            rewritten = rewritten or parts[0] in self.entries
+            self.entries[parts[0]] = entry
+            added.append((parts[3], parts[0]))
+        self.pos += end
+        if rewritten:
+            # A request_id was appended again; its newest line wins.
+            self.by_ts = sorted((ts, rid) for rid, (_o, _l, ts) in self.entries.items())
+        elif added:
+            added.sort()
+            in_order = not self.by_ts or self.by_ts[-1] <= added[0]
+            self.by_ts = self.by_ts + added if in_order else sorted(self.by_ts + added)
+
+_indexes: Dict[str, _SegmentIndex] = {}
+_indexes_lock = threading.RLock()
+
+def _index(data_path: Path) -> _SegmentIndex:
+    key = str(index_path(data_path))
+    with _indexes_lock:
+        idx = _indexes.get(key)
+        if idx is None:
+            idx = _indexes[key] = _SegmentIndex(Path(key))
+        idx.refresh()
+        if idx.ino is None:
+            _indexes.pop(key, None)
+        return idx
+
+def load_index(data_path: Path) -> Dict[str, Tuple[int, int, str]]:
+    """request_id -> (offset, length, ts) for one segment (a snapshot)."""
+    with _indexes_lock:
+        return dict(_index(data_path).entries)
+
+def _repair_index_tail(f: Any) -> None:
+    # Drop a line a crash left half-written, so the next line starts clean.
+    size = f.seek(0, os.SEEK_END)
+    if size == 0:
+        return
+    tail_start = max(0, size - 4096)
+    f.seek(tail_start)
+    tail = f.read()
+    if tail.endswith(b"\n"):
+        return
+    f.truncate(tail_start + tail.rfind(b"\n") + 1)
+    f.seek(0, os.SEEK_END)
+
+def append_records(data_path: Path, records: List[Tuple[str, str, Dict[str, Any]]]) -> Dict[str, str]:
+    """
+    Append (request_id, ts, payload) records; returns request_id -> ref.
+
+    The frames are fsynced before their index lines are appended, so a crash
+    leaves at worst unindexed frames at the end of the segment, never an
+    index line pointing at missing data.
+    """
+    if not records:
+        return {}
+    codec = _codec(data_path)
+    frames = [
+        (request_id, ts, compress((json.dumps(payload, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8"), codec))
+        for request_id, ts, payload in records
+    ]
+    lines: List[str] = []
+    refs: Dict[str, str] = {}
+    with _lock:
+        data_path.parent.mkdir(parents=True, exist_ok=True)
+        with data_path.open("ab") as f:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            offset = f.seek(0, os.SEEK_END)
+            for request_id, ts, frame in frames:
+                f.write(frame)
+                lines.append(f"{request_id}\t{offset}\t{len(frame)}\t{ts}\n")
+                offset += len(frame)
+                refs[request_id] = make_ref(data_path, request_id)
+            f.flush()
+            os.fsync(f.fileno())
+            # Still under the data lock: index lines land in frame order.
+            with index_path(data_path).open("a+b") as idx:
+                _repair_index_tail(idx)
+                idx.write("".join(lines).encode("utf-8"))
+                idx.flush()
+                os.fsync(idx.fileno())
+    return refs
+
+def _read_frame(f: Any, offset: int, length: int, codec: str) -> Dict[str, Any]:
+    f.seek(offset)
+    return json.loads(decompress(f.read(length), codec))
+
+def read_record(ref: Any) -> Dict[str, Any]:
+    data_path, request_id = split_ref(ref)
+    entry = _index(data_path).entries.get(request_id)
+    if entry is None:
+        raise FileNotFoundError(f"{request_id} not in segment {data_path}")
+    with data_path.open("rb") as f:
+        return _read_frame(f, entry[0], entry[1], _codec(data_path))
+
+def iter_records(data_path: Path) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """Indexed records of one segment, in file order."""
+    index = load_index(data_path)
+    codec = _codec(data_path)
+    with data_path.open("rb") as f:
+        for request_id, (offset, length, _ts) in sorted(index.items(), key=lambda kv: kv[1][0]):
+            try:
+                yield request_id, _read_frame(f, offset, length, codec)
+            except (OSError, ValueError):
+                continue
+
+def history(base_dir: Path, before: Optional[str] = None, limit: int = 50) -> List[Tuple[str, str, str]]:
+    """
+    (ts, request_id, ref) of segment records, newest first, with ts < before.
+
+    Only the indexes are read; segments whose day starts after `before`
+    are skipped without being opened.
+    """
+    out: List[Tuple[str, str, str]] = []
+    day_limit = before[:10].replace("-", "") if before else None
+    for data_path in reversed(list_archives(base_dir)):
+        if len(out) >= limit:
+            break
+        if day_limit and archive_day(data_path) > day_limit:
+            continue
+        for ts, request_id in reversed(_index(data_path).by_ts):
+            if before and ts >= before:
+                continue
+            out.append((ts, request_id, make_ref(data_path, request_id)))
+            if len(out) >= limit:
+                break
+    return out
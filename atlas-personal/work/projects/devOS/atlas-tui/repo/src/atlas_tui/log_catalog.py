@@ -0,0 +1,332 @@
+"""SQLite catalog over the assembled and chat logs under log_base_dir().
+
+The log files stay the source of truth; the catalog can always be rebuilt
+from them. LogWriter records every log it writes, so readers (glass, the
+project panel, `atlas-tui-logs`) never scan directories or parse JSON.
+"""
+
+from __future__ import annotations
+
+import gzip
+import json
+import sqlite3
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from .blob_store import BLOB_KEY
+from .log_archive import iter_records, list_archives, make_ref
+
+SCHEMA_VERSION = 1
+CATALOG_NAME = "catalog.sqlite3"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS assembled (
+    request_id TEXT PRIMARY KEY,
+    ts TEXT,
+    mode TEXT,
+    provider TEXT,
+    model TEXT,
+    system_chars INTEGER,
+    total_ms REAL,
+    timings TEXT,
+    blobs TEXT,
+    log_path TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS assembled_ts ON assembled (ts);
+CREATE TABLE IF NOT EXISTS chat (
+    id INTEGER PRIMARY KEY,
+    session_id TEXT,
+    ts TEXT,
+    line TEXT,
+    log_path TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS chat_ts ON chat (ts);
+CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5 (text, kind UNINDEXED, ref UNINDEXED);
+"""
+
+@dataclass
+class CatalogEntry:
+    request_id: str
+    ts: str
+    mode: str
+    provider: str
+    model: str
+    system_chars: int
+    total_ms: Optional[float]
+    timings: Dict[str, Any]
+    blobs: List[str]
+    log_path: str
+
+@dataclass
+class SearchHit:
+    kind: str  # "user" (ref is a request_id) or "chat" (ref is "<session_id>")
+    ref: str
+    ts: str
+    snippet: str
+    log_path: str
+
+def _blob_hashes(obj: Any, out: Optional[List[str]] = None) -> List[str]:
+    out = [] if out is None else out
+    if isinstance(obj, dict):
+        h = obj.get(BLOB_KEY)
+        if isinstance(h, str):
+            if h not in out:
+                out.append(h)
+            return out
+        for v in obj.values():
+            _blob_hashes(v, out)
+    elif isinstance(obj, list):
+        for v in obj:
+            _blob_hashes(v, out)
+    return out
+
+def _fts_query(q: str) -> str:
+    # Treat user input as plain terms, not FTS5 syntax.
+    terms = [t.replace('"', '""') for t in q.split()]
+    return " ".join(f'"{t}"' for t in terms)
+
+class LogCatalog:
+    """
+    - record_assembled()/record_chat() are called by the writer as logs land
+    - recent(), get(), latest() and search() answer from indexed tables
+    - rebuild() recreates everything from the files on disk; it runs on
+      first open if the catalog is new or from an older schema
+    """
+
+    def __init__(self, base_dir: Path) -> None:
+        self.base_dir = Path(base_dir)
+        self.path = self.base_dir / CATALOG_NAME
+        self._lock = threading.RLock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.base_dir.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._conn = conn
+            row = conn.execute("SELECT value FROM meta WHERE key = 'schema'").fetchone()
+            if row is None or row[0] != str(SCHEMA_VERSION):
+                self.rebuild()
+        return self._conn
+
+    def open(self) -> "LogCatalog":
+        """Open (building from disk if needed) before writing logs it should not count twice."""
+        with self._lock:
+            self._db()
+        return self
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _insert_assembled(self, db: sqlite3.Connection, log_path: Path, payload: Dict[str, Any]) -> None:
+        diagnostics = payload.get("diagnostics") or {}
+        timings = diagnostics.get("timings_ms") or {}
+        ac = payload.get("assembled_context") or {}
+        request_id = str(payload.get("request_id") or log_path.stem)
+        db.execute(
+            "INSERT OR REPLACE INTO assembled VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                request_id,
+                payload.get("ts") or "",
+                payload.get("mode") or "",
+                payload.get("provider") or "",
+                payload.get("model") or "",
+                int(ac.get("system_length_chars") or 0),
+                timings.get("total"),
+                json.dumps(timings),
+                " ".join(_blob_hashes(payload)),
+                str(log_path),
+            ),
+        )
+        db.execute("DELETE FROM messages_fts WHERE kind = 'user' AND ref = ?", (request_id,))
+        msg = payload.get("user_message")
+        if msg:
+            db.execute("INSERT INTO messages_fts (text, kind, ref) VALUES (?, 'user', ?)", (msg, request_id))
+
+    def _insert_chat(self, db: sqlite3.Connection, log_path: Path, entries: Iterable[Dict[str, Any]]) -> None:
+        for e in entries:
+            cur = db.execute(
+                "INSERT INTO chat (session_id, ts, line, log_path) VALUES (?, ?, ?, ?)",
+                (e.get("session_id") or log_path.stem, e.get("ts") or "", e.get("line") or "", str(log_path)),
+            )
+            if e.get("line"):
+                db.execute("INSERT INTO messages_fts (text, kind, ref) VALUES (?, 'chat', ?)", (e["line"], str(cur.lastrowid)))
+
+    def record_assembled(self, log_path: Path, payload: Dict[str, Any]) -> None:
+        with self._lock:
+            db = self._db()
+            db.execute("BEGIN")
+            try:
+                self._insert_assembled(db, Path(log_path), payload)
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+
+    def record_chat(self, log_path: Path, entries: List[Dict[str, Any]]) -> None:
+        with self._lock:
+            db = self._db()
+            db.execute("BEGIN")
+            try:
+                self._insert_chat(db, Path(log_path), entries)
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+
+    def rebuild(self) -> Tuple[int, int]:
+        """Recreate the catalog from the log files; returns (assembled, chat lines)."""
+        with self._lock:
+            db = self._conn if self._conn is not None else self._db()
+            n_assembled = n_chat = 0
+            db.execute("BEGIN")
+            try:
+                for table in ("assembled", "chat", "messages_fts"):
+                    db.execute(f"DELETE FROM {table}")
+                for p in sorted((self.base_dir / "assembled").glob("*.json")):
+                    try:
+                        payload = json.loads(p.read_text(encoding="utf-8"))
+                    except (OSError, ValueError):
+                        continue
+                    self._insert_assembled(db, p, payload)
+                    n_assembled += 1
+                for data_path in list_archives(self.base_dir):
+                    for request_id, payload in iter_records(data_path):
+                        self._insert_assembled(db, Path(make_ref(data_path, request_id)), payload)
+                        n_assembled += 1
+                chat_dir = self.base_dir / "chat"
+                for p in sorted([*chat_dir.glob("*.jsonl"), *chat_dir.glob("*.jsonl.gz")]):
+                    entries = []
+                    try:
+                        opener = gzip.open if p.suffix == ".gz" else open
+                        with opener(p, "rt", encoding="utf-8") as f:
+                            for line in f:
+                                try:
+                                    entries.append(json.loads(line))
+                                except ValueError:
+                                    continue
+                    except OSError:
+                        continue
+                    self._insert_chat(db, p, entries)
+                    n_chat += len(entries)
+                db.execute("INSERT OR REPLACE INTO meta VALUES ('schema', ?)", (str(SCHEMA_VERSION),))
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+            return n_assembled, n_chat
+
+    def relocate_assembled(self, refs: Dict[str, str]) -> None:
+        """Point request_id -> new log path (e.g. an archive ref after compaction)."""
+        with self._lock:
+            self._db().executemany("UPDATE assembled SET log_path = ? WHERE request_id = ?", [(v, k) for k, v in refs.items()])
+
+    def relocate_chat(self, old: Path, new: Path) -> None:
+        with self._lock:
+            self._db().execute("UPDATE chat SET log_path = ? WHERE log_path = ?", (str(new), str(old)))
+
+    def forget(self, paths: Iterable[Path]) -> int:
+        """Drop rows for deleted log files (an archive path also drops its refs)."""
+        n = 0
+        with self._lock:
+            db = self._db()
+            db.execute("BEGIN")
+            try:
+                for p in paths:
+                    p = str(p)
+                    prefix = p + "#"
+                    ids = [
+                        r[0]
+                        for r in db.execute(
+                            "SELECT request_id FROM assembled WHERE log_path = ? OR substr(log_path, 1, ?) = ?",
+                            (p, len(prefix), prefix),
+                        )
+                    ]
+                    db.executemany("DELETE FROM messages_fts WHERE kind = 'user' AND ref = ?", [(i,) for i in ids])
+                    db.executemany("DELETE FROM assembled WHERE request_id = ?", [(i,) for i in ids])
+                    chat_ids = [str(r[0]) for r in db.execute("SELECT id FROM chat WHERE log_path = ?", (p,))]
+                    db.executemany("DELETE FROM messages_fts WHERE kind = 'chat' AND ref = ?", [(i,) for i in chat_ids])
+                    db.execute("DELETE FROM chat WHERE log_path = ?", (p,))
+                    n += len(ids) + len(chat_ids)
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+        return n
+
+    def live_blobs(self) -> Set[str]:
+        """Every blob digest referenced by a cataloged log."""
+        with self._lock:
+            rows = self._db().execute("SELECT blobs FROM assembled WHERE blobs != ''").fetchall()
+        return {h for (b,) in rows for h in b.split()}
+
+    def assembled_paths(self) -> Set[str]:
+        """Log path (or archive ref) of every cataloged assembled log."""
+        with self._lock:
+            rows = self._db().execute("SELECT log_path FROM assembled").fetchall()
+        return {r[0] for r in rows}
+
+    def _entries(self, sql: str, args: Tuple[Any, ...]) -> List[CatalogEntry]:
+        with self._lock:
+            rows = self._db().execute(sql, args).fetchall()
+        return [
+            CatalogEntry(
+                request_id=r[0], ts=r[1], mode=r[2], provider=r[3], model=r[4], system_chars=r[5],
+                total_ms=r[6], timings=json.loads(r[7] or "{}"), blobs=(r[8] or "").split(), log_path=r[9],
+            )
+            for r in rows
+        ]
+
+    def recent(self, limit: int = 20) -> List[CatalogEntry]:
+        return self._entries("SELECT * FROM assembled ORDER BY ts DESC, rowid DESC LIMIT ?", (limit,))
+
+    def latest(self) -> Optional[CatalogEntry]:
+        found = self.recent(1)
+        return found[0] if found else None
+
+    def get(self, request_id: str) -> Optional[CatalogEntry]:
+        # Accept the 8-char tags shown in the transcript too.
+        found = self._entries("SELECT * FROM assembled WHERE request_id LIKE ? ORDER BY ts DESC LIMIT 1", (request_id.replace("%", "") + "%",))
+        return found[0] if found else None
+
+    def search(self, query: str, limit: int = 20) -> List[SearchHit]:
+        q = _fts_query(query)
+        if not q:
+            return []
+        sql = """
+            SELECT f.kind, f.ref, snippet(messages_fts, 0, '[', ']', '...', 12),
+                   COALESCE(a.ts, c.ts, ''), COALESCE(a.log_path, c.log_path, ''), c.session_id
+            FROM messages_fts f
+            LEFT JOIN assembled a ON f.kind = 'user' AND a.request_id = f.ref
+            LEFT JOIN chat c ON f.kind = 'chat' AND c.id = CAST(f.ref AS INTEGER)
+            WHERE messages_fts MATCH ?
+            ORDER BY rank
+            LIMIT ?
+        """
+        with self._lock:
+            rows = self._db().execute(sql, (q, limit)).fetchall()
+        return [
+            SearchHit(kind=k, ref=(sess if k == "chat" and sess else ref), ts=ts, snippet=snip, log_path=lp)
+            for k, ref, snip, ts, lp, sess in rows
+        ]
+
+_catalogs: Dict[str, LogCatalog] = {}
+_catalogs_lock = threading.Lock()
+
+def log_catalog(base_dir: Path) -> LogCatalog:
+    """Process-wide LogCatalog per log directory."""
+    key = str(Path(base_dir).resolve())
+    with _catalogs_lock:
+        cat = _catalogs.get(key)
+        if cat is None:
+            cat = _catalogs[key] = LogCatalog(Path(key))
+        return cat
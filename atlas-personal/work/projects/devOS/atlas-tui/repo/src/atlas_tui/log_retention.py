@@ -0,0 +1,244 @@
+"""Retention for the logs under log_base_dir(): compaction, age/count/size limits and blob GC.
+
+One apply_retention() pass, in order:
+
+1. compaction: loose assembled/*.json files older than compact_after_days,
+   or beyond the newest max_loose_files, move into daily archives
+   (see log_archive); idle chat/*.jsonl files are gzipped in place
+2. age: archives and chat logs older than max_age_days are deleted
+3. size: the oldest archives and chat logs are deleted until the log bytes
+   fit max_total_bytes
+4. blobs no log references any more are deleted (the catalog is checked,
+   plus any loose or segment log it is missing)
+
+The catalog is updated as files move or disappear, so readers keep finding
+compacted logs. Passes are idempotent and safe to run while LogWriter is
+writing: chat files it holds open are passed in as skip_paths.
+"""
+
+from __future__ import annotations
+
+import gzip
+import json
+import os
+import shutil
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from .blob_store import blob_store
+from .log_archive import append_records, archive_day, archive_path, index_path, list_archives, load_index, make_ref, read_record
+from .log_catalog import _blob_hashes, log_catalog
+
+# Loose files written within this window are never touched (a write may be in flight).
+MIN_IDLE_S = 60.0
+
+@dataclass
+class RetentionPolicy:
+    max_age_days: Optional[float] = 30.0
+    max_loose_files: Optional[int] = 200
+    max_total_bytes: Optional[int] = None  # archives + idle chat logs; blobs are reclaimed by GC
+    compact_after_days: float = 1.0
+    blob_grace_s: float = 3600.0
+
+@dataclass
+class RetentionReport:
+    compacted: int = 0
+    archives: List[str] = field(default_factory=list)
+    chat_compressed: int = 0
+    deleted: List[str] = field(default_factory=list)
+    freed_bytes: int = 0
+    blobs_deleted: int = 0
+    errors: List[str] = field(default_factory=list)
+    ms: float = 0.0
+
+    @property
+    def dirty(self) -> bool:
+        return bool(self.compacted or self.chat_compressed or self.deleted or self.blobs_deleted)
+
+def _size(p: Path) -> int:
+    try:
+        return p.stat().st_size
+    except OSError:
+        return 0
+
+def _mtime(p: Path) -> float:
+    try:
+        return p.stat().st_mtime
+    except OSError:
+        return 0.0
+
+def _loose_day(p: Path) -> str:
+    # Loose logs are named YYYYMMDD_HHMMSS_<request_id>.json.
+    day = p.name[:8]
+    return day if day.isdigit() else datetime.fromtimestamp(_mtime(p)).strftime("%Y%m%d")
+
+def _compact_assembled(base_dir: Path, policy: RetentionPolicy, now: float, report: RetentionReport) -> None:
+    loose = sorted((base_dir / "assembled").glob("*.json"))
+    cutoff = now - policy.compact_after_days * 86400
+    keep_newest = policy.max_loose_files if policy.max_loose_files is not None else len(loose)
+    overflow = len(loose) - max(0, keep_newest)
+    by_day: Dict[str, List[Path]] = {}
+    for i, p in enumerate(loose):
+        mtime = _mtime(p)
+        if mtime > now - MIN_IDLE_S:
+            continue
+        if mtime < cutoff or i < overflow:
+            by_day.setdefault(_loose_day(p), []).append(p)
+    catalog = log_catalog(base_dir)
+    for day, paths in sorted(by_day.items()):
+        records: List[Tuple[str, str, Dict[str, Any]]] = []
+        moved: List[Path] = []
+        for p in paths:
+            try:
+                payload = json.loads(p.read_text(encoding="utf-8"))
+            except (OSError, ValueError) as e:
+                report.errors.append(f"{p.name}: {e}")
+                continue
+            request_id = str(payload.get("request_id") or p.stem.rsplit("_", 1)[-1])
+            records.append((request_id, str(payload.get("ts") or ""), payload))
+            moved.append(p)
+        if not records:
+            continue
+        data_path = archive_path(base_dir, day)
+        refs = append_records(data_path, records)
+        catalog.relocate_assembled(refs)
+        for p in moved:
+            try:
+                p.unlink()
+            except OSError:
+                pass
+        report.compacted += len(moved)
+        if str(data_path) not in report.archives:
+            report.archives.append(str(data_path))
+
+def _compress_chat(base_dir: Path, policy: RetentionPolicy, now: float, skip: Set[Path], report: RetentionReport) -> None:
+    cutoff = min(now - policy.compact_after_days * 86400, now - MIN_IDLE_S)
+    catalog = log_catalog(base_dir)
+    for p in sorted((base_dir / "chat").glob("*.jsonl")):
+        if p.resolve() in skip or _mtime(p) >= cutoff:
+            continue
+        dest = p.with_name(p.name + ".gz")
+        if dest.exists():
+            # A resumed session: keep both rather than rewrite the archive.
+            dest = p.with_name(f"{p.stem}.{int(_mtime(p))}.jsonl.gz")
+        tmp = dest.with_name(dest.name + ".tmp")
+        try:
+            st = p.stat()
+            with p.open("rb") as src, gzip.open(tmp, "wb", compresslevel=6) as out:
+                shutil.copyfileobj(src, out)
+            # Keep the original mtime: age and size limits go by it.
+            os.utime(tmp, (st.st_atime, st.st_mtime))
+            os.replace(tmp, dest)
+            catalog.relocate_chat(p, dest)
+            p.unlink()
+        except OSError as e:
+            report.errors.append(f"{p.name}: {e}")
+            continue
+        report.chat_compressed += 1
+
+def _units(base_dir: Path, now: float, skip: Set[Path]) -> List[Tuple[float, List[Path]]]:
+    """Deletable log units, oldest first: (age key, files)."""
+    units: List[Tuple[float, List[Path]]] = []
+    today = datetime.fromtimestamp(now).strftime("%Y%m%d")
+    for data_path in list_archives(base_dir):
+        if archive_day(data_path) >= today:
+            # Today's segment may be receiving live writes (LogWriter(segments=True)).
+            continue
+        try:
+            day = datetime.strptime(archive_day(data_path), "%Y%m%d") + timedelta(days=1)
+            key = day.timestamp()
+        except ValueError:
+            key = _mtime(data_path)
+        units.append((key, [data_path, index_path(data_path)]))
+    for p in (base_dir / "chat").glob("*.jsonl*"):
+        if p.name.endswith(".tmp") or p.resolve() in skip:
+            continue
+        units.append((_mtime(p), [p]))
+    units.sort(key=lambda u: u[0])
+    return units
+
+def _delete(base_dir: Path, files: List[Path], report: RetentionReport) -> None:
+    for p in files:
+        n = _size(p)
+        try:
+            p.unlink()
+        except FileNotFoundError:
+            continue
+        except OSError as e:
+            report.errors.append(f"{p.name}: {e}")
+            continue
+        report.freed_bytes += n
+    log_catalog(base_dir).forget([files[0]])
+    report.deleted.append(str(files[0]))
+
+def _gc_blobs(base_dir: Path, policy: RetentionPolicy, report: RetentionReport) -> None:
+    root = base_dir / "blobs"
+    if not root.is_dir():
+        return
+    store = blob_store(root)
+    live = log_catalog(base_dir).live_blobs()
+    unused = [(d, p) for d, p in store.digests() if d not in live]
+    if not unused:
+        return
+    # Logs the catalog missed (a failed insert) still hold references.
+    for p in (base_dir / "assembled").glob("*.json"):
+        try:
+            live.update(_blob_hashes(json.loads(p.read_text(encoding="utf-8"))))
+        except (OSError, ValueError):
+            continue
+    # Of the segment records, only the uncataloged ones are decompressed.
+    cataloged = log_catalog(base_dir).assembled_paths()
+    for data_path in list_archives(base_dir):
+        for request_id in load_index(data_path):
+            ref = make_ref(data_path, request_id)
+            if ref in cataloged:
+                continue
+            try:
+                live.update(_blob_hashes(read_record(ref)))
+            except (OSError, ValueError):
+                continue
+    for digest, path in unused:
+        if digest in live:
+            continue
+        n = _size(path)
+        if store.delete_unused(digest, path, policy.blob_grace_s):
+            report.blobs_deleted += 1
+            report.freed_bytes += n
+
+def apply_retention(
+    base_dir: Path,
+    policy: Optional[RetentionPolicy] = None,
+    now: Optional[float] = None,
+    skip_paths: Iterable[Path] = (),
+) -> RetentionReport:
+    """Run one retention pass over base_dir (see the module docstring)."""
+    t0 = time.perf_counter()
+    base_dir = Path(base_dir)
+    policy = policy or RetentionPolicy()
+    now = time.time() if now is None else now
+    skip = {Path(p).resolve() for p in skip_paths}
+    report = RetentionReport()
+    if not base_dir.is_dir():
+        return report
+
+    _compact_assembled(base_dir, policy, now, report)
+    _compress_chat(base_dir, policy, now, skip, report)
+
+    units = _units(base_dir, now, skip)
+    if policy.max_age_days is not None:
+        cutoff = now - policy.max_age_days * 86400
+        while units and units[0][0] < cutoff:
+            _delete(base_dir, units.pop(0)[1], report)
+    if policy.max_total_bytes is not None:
+        total = sum(_size(p) for _, files in units for p in files)
+        while units and total > policy.max_total_bytes:
+            files = units.pop(0)[1]
+            total -= sum(_size(p) for p in files)
+            _delete(base_dir, files, report)
+
+    _gc_blobs(base_dir, policy, report)
+    report.ms = (time.perf_counter() - t0) * 1000
+    return report
@@ -1,11 +1,20 @@
 from __future__ import annotations
 
+import asyncio
+import atexit
 import json
+import os
+import queue
+import threading
+from concurrent.futures import Future
 from dataclasses import asdict
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Dict, IO, Optional
 
+from .blob_store import BlobStore, blob_store
+from .log_archive import append_records, archive_path, is_archive_ref, make_ref, read_record, split_ref
+from .log_catalog import LogCatalog, log_catalog
 from .models import EngineInput, EngineOutput, Workspace
 from .state_store import write_latest_pointer
 
@@ -17,6 +26,21 @@ def log_base_dir(workspace: Workspace) -> Path:
         return Path(workspace.project_root) / "logs" / "atlas-tui"
     return Path(workspace.repo_root) / ".atlas-tui" / "logs"
 
+def blobs_dir(workspace: Workspace) -> Path:
+    return log_base_dir(workspace) / "blobs"
+
+def assembled_log_path(workspace: Workspace, request_id: str) -> Path:
+    fname = datetime.now().strftime("%Y%m%d_%H%M%S") + f"_{request_id}.json"
+    return log_base_dir(workspace) / "assembled" / fname
+
+def segment_log_ref(workspace: Workspace, request_id: str) -> Path:
+    """Where an assembled log goes in segment mode: "<today's segment>#<request_id>"."""
+    data_path = archive_path(log_base_dir(workspace), datetime.now().strftime("%Y%m%d"))
+    return Path(make_ref(data_path, request_id))
+
+def chat_log_path(workspace: Workspace, session_id: str) -> Path:
+    return log_base_dir(workspace) / "chat" / f"{session_id}.jsonl"
+
 def _truncate(s: str, n: int) -> Dict[str, Any]:
     if n <= 0:
         return {"text": "", "truncated": len(s) > 0, "full_length": len(s)}
@@ -31,10 +55,21 @@ def write_assembled_log(
     engine_output: EngineOutput,
     preview_chars: int = DEFAULT_PREVIEW_CHARS,
     max_stored_system_chars: Optional[int] = DEFAULT_MAX_STORED_SYSTEM_CHARS,
+    use_blobs: bool = True,
+    path: Optional[Path] = None,
+    catalog: Optional[LogCatalog] = None,
+    segment: bool = False,
 ) -> Path:
+    """
+    Write one assembled log and return where it went.
+
+    With segment=True (or a segment ref as `path`) the log is appended to
+    the day's archive segment instead of its own JSON file; the returned
+    path is then the ref "<segment>#<request_id>".
+    """
     ts = datetime.now(timezone.utc).astimezone().isoformat(timespec="seconds")
-    base = log_base_dir(workspace) / "assembled"
-    base.mkdir(parents=True, exist_ok=True)
+    if path is None:
+        path = segment_log_ref(workspace, request_id) if segment else assembled_log_path(workspace, request_id)
 
     # Optional storage cap: reduce risk of multi-megabyte logs in extreme cases.
     assembled_system = engine_output.assembled_context.system
@@ -46,6 +81,26 @@ def write_assembled_log(
         if len(provider_system) > max_stored_system_chars:
             provider_system = provider_system[:max_stored_system_chars]
 
+    # System strings repeat across requests (and within one: assembled,
+    # provider and the system message are usually identical), so they are
+    # stored once in the blob store and referenced by hash.
+    stored: Dict[str, Any] = {}
+    store: Optional[BlobStore] = blob_store(blobs_dir(workspace)) if use_blobs else None
+
+    def _store(text: str) -> Any:
+        if store is None:
+            return text
+        if text not in stored:
+            stored[text] = store.put_text(text)
+        return stored[text]
+
+    messages = engine_output.provider_request.messages
+    if store is not None and messages:
+        messages = [
+            {**m, "content": _store(m["content"])} if m.get("role") == "system" and isinstance(m.get("content"), str) else m
+            for m in messages
+        ]
+
     payload: Dict[str, Any] = {
         "ts": ts,
         "request_id": request_id,
@@ -60,7 +115,7 @@ def write_assembled_log(
             "system_length_chars": len(engine_output.assembled_context.system),
             "system_preview": _truncate(engine_output.assembled_context.system, preview_chars),
             "system_stored_truncated": max_stored_system_chars is not None and len(engine_output.assembled_context.system) > max_stored_system_chars,
-            "system": assembled_system,
+            "system": _store(assembled_system),
         },
         "provider_request": {
             "provider": engine_output.provider_request.provider,
@@ -68,31 +123,261 @@ def write_assembled_log(
             "system_length_chars": len(engine_output.provider_request.system),
             "system_preview": _truncate(engine_output.provider_request.system, preview_chars),
             "system_stored_truncated": max_stored_system_chars is not None and len(engine_output.provider_request.system) > max_stored_system_chars,
-            "system": provider_system,
+            "system": _store(provider_system),
             "user": engine_output.provider_request.user,
-            "messages": engine_output.provider_request.messages,
+            "messages": messages,
         },
         "diagnostics": engine_output.diagnostics,
     }
 
-    fname = datetime.now().strftime("%Y%m%d_%H%M%S") + f"_{request_id}.json"
-    path = base / fname
-    path.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
+    if is_archive_ref(path):
+        # One compressed frame per record; append_records fsyncs it.
+        append_records(split_ref(path)[0], [(request_id, ts, payload)])
+    else:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(payload, ensure_ascii=False, separators=(",", ":")), encoding="utf-8")
 
     try:
         write_latest_pointer(workspace.repo_root, workspace.project_root, str(path), request_id)
     except Exception:
         pass
+    if catalog is not None:
+        # The file is the source of truth; a failed insert is fixed by rebuild().
+        try:
+            catalog.record_assembled(path, payload)
+        except Exception:
+            pass
     return path
 
+def read_assembled_log(path: Any) -> Dict[str, Any]:
+    """
+    Load an assembled log with blob references resolved to their text.
+
+    Accepts a log file path or an archive ref ("<archive>#<request_id>")
+    for logs that retention has compacted.
+    """
+    if is_archive_ref(path):
+        data_path, _ = split_ref(path)
+        data = read_record(path)
+    else:
+        data_path = Path(path)
+        data = json.loads(data_path.read_text(encoding="utf-8"))
+    # Logs live in <base>/assembled/ or <base>/archive/; blobs in <base>/blobs/.
+    return blob_store(data_path.parent.parent / "blobs").resolve(data)
+
 def write_chat_log(
     workspace: Workspace,
     session_id: str,
     entry: Dict[str, Any],
 ) -> Path:
-    base = log_base_dir(workspace) / "chat"
-    base.mkdir(parents=True, exist_ok=True)
-    path = base / f"{session_id}.jsonl"
+    path = chat_log_path(workspace, session_id)
+    path.parent.mkdir(parents=True, exist_ok=True)
     with path.open("a", encoding="utf-8") as f:
         f.write(json.dumps(entry, ensure_ascii=False) + "\n")
     return path
+
+FSYNC_NEVER = "never"
+FSYNC_BATCH = "batch"
+FSYNC_ALWAYS = "always"
+
+_STOP = object()
+
+class LogWriter:
+    """
+    Writes inspection and chat logs on a dedicated thread.
+
+    - a bounded queue decouples callers from disk; the caller never does
+      JSON serialization, blob hashing or file I/O
+    - chat logs keep one buffered handle open per session file
+    - fsync policy: "never" (flush only), "batch" (flush and fsync every file
+      touched once the queue drains), "always" (after each write)
+    - close() drains the queue and flushes; it also runs at interpreter exit
+    - when the queue is full, write_assembled() waits off the event loop and
+      chat lines are dropped (counted in `dropped`)
+    - with catalog=True every log is also recorded in the workspace's
+      LogCatalog (chat lines once per batch, in one transaction)
+    - with segments=True assembled logs are appended to the day's archive
+      segment (see log_archive) instead of one JSON file each
+    """
+
+    def __init__(self, max_queue: int = 256, fsync: str = FSYNC_BATCH, catalog: bool = True, segments: bool = False) -> None:
+        if fsync not in (FSYNC_NEVER, FSYNC_BATCH, FSYNC_ALWAYS):
+            raise ValueError(f"unknown fsync policy: {fsync}")
+        self.fsync = fsync
+        self.catalog = catalog
+        self.segments = segments
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=max(1, max_queue))
+        self._handles: Dict[Path, IO[str]] = {}
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.written = 0
+        self.dropped = 0
+        self.last_error: Optional[str] = None
+
+    def start(self) -> "LogWriter":
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="atlas-log-writer", daemon=True)
+                self._thread.start()
+                atexit.register(self.close)
+        return self
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def open_paths(self) -> "set[Path]":
+        """Chat logs currently held open (retention must leave them alone)."""
+        return set(self._handles.copy())
+
+    async def write_assembled(
+        self,
+        workspace: Workspace,
+        request_id: str,
+        engine_input: EngineInput,
+        engine_output: EngineOutput,
+        preview_chars: int = DEFAULT_PREVIEW_CHARS,
+    ) -> "tuple[Path, Future[Path]]":
+        """Queue an assembled log; returns its path (or segment ref) right away and a future for the write."""
+        path = segment_log_ref(workspace, request_id) if self.segments else assembled_log_path(workspace, request_id)
+        fut: "Future[Path]" = Future()
+
+        def job() -> Path:
+            return write_assembled_log(
+                workspace=workspace,
+                request_id=request_id,
+                engine_input=engine_input,
+                engine_output=engine_output,
+                preview_chars=preview_chars,
+                path=path,
+                catalog=log_catalog(log_base_dir(workspace)) if self.catalog else None,
+            )
+
+        item = (job, fut)
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            # Backpressure lands on the submitting task, not the event loop.
+            await asyncio.to_thread(self._queue.put, item)
+        return path, fut
+
+    def append_chat(self, workspace: Workspace, session_id: str, entry: Dict[str, Any]) -> Path:
+        path = chat_log_path(workspace, session_id)
+        line = json.dumps(entry, ensure_ascii=False) + "\n"
+        try:
+            self._queue.put_nowait((path, line, entry))
+        except queue.Full:
+            self.dropped += 1
+        return path
+
+    def _chat_handle(self, path: Path) -> IO[str]:
+        f = self._handles.get(path)
+        if f is None:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            f = self._handles[path] = path.open("a", encoding="utf-8", buffering=64 * 1024)
+        return f
+
+    def _sync(self, f: IO[str]) -> None:
+        f.flush()
+        if self.fsync != FSYNC_NEVER:
+            os.fsync(f.fileno())
+
+    def _handle(self, item: Any, touched: Dict[Path, IO[str]], chat: Dict[Path, list]) -> None:
+        if isinstance(item[0], Path):
+            path, line, entry = item
+            if self.catalog and path not in self._handles:
+                # Chat logs live in <base>/chat/; a new catalog is built from
+                # disk now, before this batch is appended and recorded.
+                log_catalog(path.parent.parent).open()
+            f = self._chat_handle(path)
+            f.write(line)
+            chat.setdefault(path, []).append(entry)
+            if self.fsync == FSYNC_ALWAYS:
+                self._sync(f)
+            else:
+                touched[path] = f
+            return
+        job, fut = item
+        if not fut.set_running_or_notify_cancel():
+            return
+        try:
+            path = job()
+            if isinstance(path, Path) and not is_archive_ref(path) and self.fsync != FSYNC_NEVER:
+                # The log was written and closed by write_text; sync it by fd.
+                fd = os.open(path, os.O_RDONLY)
+                try:
+                    os.fsync(fd)
+                finally:
+                    os.close(fd)
+            fut.set_result(path)
+        except BaseException as e:
+            fut.set_exception(e)
+            raise
+
+    def _run(self) -> None:
+        stop = False
+        while not stop:
+            item = self._queue.get()
+            touched: Dict[Path, IO[str]] = {}
+            chat: Dict[Path, list] = {}
+            # Drain whatever is queued, then flush/fsync once for the batch.
+            while True:
+                if item is _STOP:
+                    stop = True
+                else:
+                    try:
+                        self._handle(item, touched, chat)
+                        self.written += 1
+                    except Exception as e:
+                        self.last_error = str(e)
+                self._queue.task_done()
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            for f in touched.values():
+                try:
+                    f.flush()
+                    if self.fsync == FSYNC_BATCH:
+                        os.fsync(f.fileno())
+                except Exception as e:
+                    self.last_error = str(e)
+            if self.catalog:
+                for path, entries in chat.items():
+                    try:
+                        log_catalog(path.parent.parent).record_chat(path, entries)
+                    except Exception as e:
+                        self.last_error = str(e)
+        for f in self._handles.values():
+            try:
+                f.close()
+            except Exception:
+                pass
+        self._handles.clear()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until everything queued so far is written; False on timeout."""
+        if self._thread is None:
+            return True
+        done = threading.Event()
+        fut: "Future[None]" = Future()
+        fut.add_done_callback(lambda _f: done.set())
+        self._queue.put((self._flush_handles, fut))
+        return done.wait(timeout)
+
+    def _flush_handles(self) -> None:
+        for f in self._handles.values():
+            self._sync(f)
+
+    def close(self, timeout: Optional[float] = 10.0) -> None:
+        """Drain the queue, flush and close all files, and stop the thread."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is None:
+            return
+        self._queue.put(_STOP)
+        thread.join(timeout)
+        try:
+            atexit.unregister(self.close)
+        except Exception:
+            pass
@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from dataclasses import asdict
+from pathlib import Path
+from typing import List, Optional
+
+from .log_catalog import log_catalog
+from .log_retention import RetentionPolicy, apply_retention
+from .log_writer import log_base_dir, read_assembled_log
+from .workspace import discover_workspace
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="atlas-tui-logs",
+        description="Query atlas-tui inspection and chat logs through the log catalog.",
+    )
+    parser.add_argument("--workspace", type=str, default=None, help="Directory to discover the workspace from (default: cwd).")
+    parser.add_argument("--json", action="store_true", help="Print JSON instead of text.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_recent = sub.add_parser("recent", help="List the most recent assembled logs.")
+    p_recent.add_argument("-n", type=int, default=20)
+
+    p_search = sub.add_parser("search", help="Full-text search over user messages and chat lines.")
+    p_search.add_argument("query")
+    p_search.add_argument("-n", type=int, default=20)
+
+    p_show = sub.add_parser("show", help="Print one assembled log (blob references resolved).")
+    p_show.add_argument("request_id", help="Request id or its first characters.")
+
+    sub.add_parser("rebuild", help="Rebuild the catalog from the log files.")
+
+    p_compact = sub.add_parser("compact", help="Run one retention pass: compact old logs, apply limits, collect blobs.")
+    p_compact.add_argument("--days", type=float, default=30.0, help="Delete archived logs older than this; 0 keeps them (default: 30).")
+    p_compact.add_argument("--max-loose", type=int, default=200, help="Loose per-request logs to keep (default: 200).")
+    p_compact.add_argument("--max-mb", type=float, default=0.0, help="Cap on archived + chat log size in MB; 0 disables.")
+    p_compact.add_argument("--compact-after-days", type=float, default=1.0)
+    args = parser.parse_args(argv)
+
+    try:
+        workspace = discover_workspace(Path(args.workspace) if args.workspace else Path.cwd())
+    except Exception as e:
+        print(f"atlas-tui-logs: workspace discovery failed: {e}", file=sys.stderr)
+        return 2
+    catalog = log_catalog(log_base_dir(workspace))
+
+    if args.command == "rebuild":
+        n_assembled, n_chat = catalog.rebuild()
+        print(f"indexed {n_assembled} assembled logs and {n_chat} chat lines into {catalog.path}")
+        return 0
+
+    if args.command == "compact":
+        policy = RetentionPolicy(
+            max_age_days=args.days or None,
+            max_loose_files=max(0, args.max_loose),
+            max_total_bytes=int(args.max_mb * 1024 * 1024) or None,
+            compact_after_days=args.compact_after_days,
+        )
+        report = apply_retention(log_base_dir(workspace), policy)
+        if args.json:
+            print(json.dumps(asdict(report), ensure_ascii=False, indent=2))
+        else:
+            print(
+                f"compacted {report.compacted} logs into {len(report.archives)} archives, "
+                f"gzipped {report.chat_compressed} chat logs, deleted {len(report.deleted)} files "
+                f"and {report.blobs_deleted} blobs, freed {report.freed_bytes} bytes in {report.ms:.0f}ms"
+            )
+        for err in report.errors:
+            print(f"atlas-tui-logs: {err}", file=sys.stderr)
+        return 0
+
+    if args.command == "show":
+        entry = catalog.get(args.request_id)
+        if entry is None:
+            print(f"atlas-tui-logs: no log for {args.request_id}", file=sys.stderr)
+            return 1
+        print(json.dumps(read_assembled_log(Path(entry.log_path)), ensure_ascii=False, indent=2))
+        return 0
+
+    if args.command == "recent":
+        entries = catalog.recent(args.n)
+        if args.json:
+            print(json.dumps([asdict(e) for e in entries], ensure_ascii=False, indent=2))
+            return 0
+        for e in entries:
+            total = f"{e.total_ms:.1f}ms" if e.total_ms is not None else "-"
+            print(f"{e.ts}  {e.request_id[:8]}  {e.mode:<9} {e.provider}/{e.model}  {e.system_chars} chars  {total}")
+        return 0
+
+    hits = catalog.search(args.query, args.n)
+    if args.json:
+        print(json.dumps([asdict(h) for h in hits], ensure_ascii=False, indent=2))
+        return 0
+    for h in hits:
+        ref = h.ref[:8] if h.kind == "user" else h.ref
+        print(f"{h.ts}  {h.kind:<4}  {ref}  {h.snippet}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
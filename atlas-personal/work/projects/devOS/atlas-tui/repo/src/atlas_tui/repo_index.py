@@ -0,0 +1,424 @@
+from __future__ import annotations
+
+import bisect
+import fnmatch
+import hashlib
+import json
+import os
+import re
+import subprocess
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+from .state_store import state_dir
+
+INDEX_VERSION = 1
+
+_GLOB_CHARS = "*?["
+
+# Never indexed, whatever .gitignore says.
+ALWAYS_SKIP = {".git", ".atlas-tui"}
+
+LANGUAGES = {
+    ".py": "python", ".pyi": "python", ".md": "markdown", ".rst": "rst", ".txt": "text",
+    ".toml": "toml", ".cfg": "ini", ".ini": "ini", ".json": "json", ".yaml": "yaml", ".yml": "yaml",
+    ".js": "javascript", ".jsx": "javascript", ".ts": "typescript", ".tsx": "typescript",
+    ".css": "css", ".html": "html", ".sh": "shell", ".go": "go", ".rs": "rust", ".java": "java",
+    ".kt": "kotlin", ".c": "c", ".h": "c", ".cc": "cpp", ".cpp": "cpp", ".hpp": "cpp", ".cs": "csharp",
+    ".rb": "ruby", ".php": "php", ".swift": "swift", ".sql": "sql", ".lua": "lua",
+}
+
+# Rough chars-per-token ratio for the estimate kept with each file.
+CHARS_PER_TOKEN = 4
+
+def index_path(repo_root: str, project_root: Optional[str]) -> Path:
+    return state_dir(repo_root, project_root) / "repo_index.json"
+
+@dataclass
+class IndexEntry:
+    size: int
+    mtime_ns: int
+    sha256: str
+    language: Optional[str]
+    tokens: int
+    binary: bool = False
+
+    def to_row(self) -> list:
+        return [self.size, self.mtime_ns, self.sha256, self.language, self.tokens, self.binary]
+
+    @classmethod
+    def from_row(cls, row: list) -> "IndexEntry":
+        size, mtime_ns, sha256, language, tokens, binary = row
+        return cls(int(size), int(mtime_ns), str(sha256), language, int(tokens), bool(binary))
+
+@dataclass
+class IndexUpdate:
+    source: str  # "git" or "walk"
+    added: int = 0
+    changed: int = 0
+    removed: int = 0
+    rehashed: int = 0
+    hashed_bytes: int = 0
+    ms: float = 0.0
+
+    @property
+    def dirty(self) -> bool:
+        return bool(self.added or self.changed or self.removed)
+
+def _glob_regex(pattern: str) -> str:
+    out = []
+    i = 0
+    while i < len(pattern):
+        c = pattern[i]
+        if pattern.startswith("**/", i):
+            out.append("(?:.*/)?")
+            i += 3
+            continue
+        if pattern.startswith("**", i):
+            out.append(".*")
+            i += 2
+            continue
+        if c == "*":
+            out.append("[^/]*")
+        elif c == "?":
+            out.append("[^/]")
+        elif c == "[":
+            j = pattern.find("]", i + 1)
+            if j == -1:
+                out.append(re.escape(c))
+            else:
+                out.append("[" + pattern[i + 1:j].replace("\\", "\\\\") + "]")
+                i = j
+        else:
+            out.append(re.escape(c))
+        i += 1
+    return "".join(out)
+
+class _IgnoreRules:
+    """
+    Subset of .gitignore semantics used when the repo is not a git checkout:
+    negation, directory-only patterns, anchored patterns and ** globs. Later
+    rules win; a file inside an ignored directory is never re-included.
+    """
+
+    def __init__(self, rules: Optional[List[Tuple[str, "re.Pattern[str]", bool, bool, bool]]] = None, token: str = "") -> None:
+        self.rules = rules or []
+        # Identifies the accumulated rule text, so cached listings can tell
+        # when any ancestor .gitignore changed.
+        self.token = token
+
+    def extend(self, base: str, text: str) -> "_IgnoreRules":
+        rules = list(self.rules)
+        for line in text.splitlines():
+            line = line.rstrip()
+            if not line or line.startswith("#"):
+                continue
+            negate = line.startswith("!")
+            if negate:
+                line = line[1:]
+            line = line.replace("\\#", "#").replace("\\!", "!")
+            dir_only = line.endswith("/")
+            line = line.rstrip("/")
+            # A leading or interior slash anchors the pattern; a trailing one does not.
+            anchored = "/" in line
+            line = line.lstrip("/")
+            if not line:
+                continue
+            rules.append((base, re.compile(_glob_regex(line) + r"\Z"), negate, dir_only, anchored))
+        token = hashlib.sha256(f"{self.token}\0{base}\0{text}".encode("utf-8")).hexdigest()[:16]
+        return _IgnoreRules(rules, token)
+
+    def ignored(self, rel: str, is_dir: bool) -> bool:
+        result = False
+        name = rel.rsplit("/", 1)[-1]
+        for base, rx, negate, dir_only, anchored in self.rules:
+            if dir_only and not is_dir:
+                continue
+            if base:
+                if not rel.startswith(base + "/"):
+                    continue
+                sub = rel[len(base) + 1:]
+            else:
+                sub = rel
+            if rx.match(sub if anchored else name):
+                result = not negate
+        return result
+
+class RepoIndex:
+    """
+    Persistent index of the repository's files, stored as JSON under state_dir().
+
+    - one entry per repo-relative path: size, mtime, sha256, language guess
+      and token estimate
+    - respects .gitignore: file lists come from `git ls-files` in a checkout,
+      otherwise from a walk that applies .gitignore files itself
+    - update() re-stats files and only rehashes those whose size or mtime
+      changed; a walk reuses a directory's listing while the directory and
+      the .gitignore rules that apply to it are unchanged
+    - get(), is_dir() and `in` are dictionary lookups
+    """
+
+    def __init__(self, repo_root: str, path: Optional[Path] = None) -> None:
+        self.repo_root = str(Path(repo_root).resolve())
+        self.path = path
+        self.generation = 0
+        self.source: Optional[str] = None
+        self._files: Dict[str, IndexEntry] = {}
+        self._dirs: Dict[str, Tuple[str, List[str], List[str]]] = {}
+        self._dir_set: Set[str] = set()
+        self._sorted: Optional[List[str]] = None
+        self._lock = threading.Lock()
+        # mtime of the persisted file as last read or written by this instance.
+        self._disk_mtime_ns: Optional[int] = None
+
+    @classmethod
+    def load(cls, repo_root: str, project_root: Optional[str]) -> "RepoIndex":
+        idx = cls(repo_root, index_path(repo_root, project_root))
+        idx._read()
+        return idx
+
+    def _read(self) -> bool:
+        try:
+            mtime = self.path.stat().st_mtime_ns  # type: ignore[union-attr]
+            data = json.loads(self.path.read_text(encoding="utf-8"))  # type: ignore[union-attr]
+            self._disk_mtime_ns = mtime
+            if data.get("version") == INDEX_VERSION and data.get("repo_root") == self.repo_root:
+                files = {p: IndexEntry.from_row(r) for p, r in (data.get("files") or {}).items()}
+                dirs = {d: (str(v[0]), list(v[1]), list(v[2])) for d, v in (data.get("dirs") or {}).items()}
+                self._install(files, dirs, data.get("source"))
+                return True
+        except Exception:
+            pass
+        return False
+
+    def reload_if_changed(self) -> bool:
+        """Re-read the persisted index if another process (the TUI) saved a newer one."""
+        if self.path is None:
+            return False
+        try:
+            mtime = self.path.stat().st_mtime_ns
+        except OSError:
+            return False
+        if mtime == self._disk_mtime_ns:
+            return False
+        if not self._read():
+            return False
+        self.generation += 1
+        return True
+
+    def save(self) -> Optional[Path]:
+        if self.path is None:
+            return None
+        with self._lock:
+            data = {
+                "version": INDEX_VERSION,
+                "repo_root": self.repo_root,
+                "source": self.source,
+                "files": {p: e.to_row() for p, e in self._files.items()},
+                "dirs": {d: [m, ds, fs] for d, (m, ds, fs) in self._dirs.items()},
+            }
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_text(json.dumps(data, ensure_ascii=False, separators=(",", ":")), encoding="utf-8")
+        os.replace(tmp, self.path)
+        try:
+            self._disk_mtime_ns = self.path.stat().st_mtime_ns
+        except OSError:
+            pass
+        return self.path
+
+    def _install(self, files: Dict[str, IndexEntry], dirs: Dict[str, Tuple[str, List[str], List[str]]], source: Optional[str]) -> None:
+        dir_set: Set[str] = set()
+        for p in files:
+            parts = p.split("/")[:-1]
+            for i in range(1, len(parts) + 1):
+                dir_set.add("/".join(parts[:i]))
+        with self._lock:
+            self._files = files
+            self._dirs = dirs
+            self._dir_set = dir_set
+            self._sorted = None
+            self.source = source
+
+    def __len__(self) -> int:
+        return len(self._files)
+
+    def __contains__(self, rel: str) -> bool:
+        return rel in self._files or rel in self._dir_set
+
+    def get(self, rel: str) -> Optional[IndexEntry]:
+        return self._files.get(rel)
+
+    def is_dir(self, rel: str) -> bool:
+        return rel == "" or rel in self._dir_set
+
+    def paths(self, under: str = "") -> List[str]:
+        """Indexed file paths in sorted order, optionally limited to a directory."""
+        with self._lock:
+            if self._sorted is None:
+                self._sorted = sorted(self._files)
+            ordered = self._sorted
+        if not under:
+            return list(ordered)
+        prefix = under.rstrip("/") + "/"
+        # "0" sorts right after "/", so this slice is exactly the subtree.
+        lo = bisect.bisect_left(ordered, prefix)
+        return ordered[lo:bisect.bisect_left(ordered, prefix[:-1] + "0", lo)]
+
+    def matches(self, pattern: str) -> bool:
+        """True if a path, directory or glob names at least one indexed file."""
+        pattern = pattern.strip().strip("/")
+        if not pattern:
+            return False
+        first_glob = min((i for i in (pattern.find(c) for c in _GLOB_CHARS) if i >= 0), default=-1)
+        if first_glob < 0:
+            return pattern in self
+        # A real glob: scan only the files under its literal directory prefix.
+        base = pattern[:first_glob].rpartition("/")[0]
+        if base and not self.is_dir(base):
+            return False
+        return any(fnmatch.fnmatchcase(p, pattern) for p in self.paths(base))
+
+    def _git_ls_files(self) -> Optional[List[str]]:
+        try:
+            proc = subprocess.run(
+                ["git", "-C", self.repo_root, "ls-files", "-z", "--cached", "--others", "--exclude-standard"],
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                timeout=30,
+            )
+        except (OSError, subprocess.SubprocessError):
+            return None
+        if proc.returncode != 0:
+            return None
+        out = []
+        for raw in proc.stdout.split(b"\0"):
+            if not raw:
+                continue
+            rel = raw.decode("utf-8", errors="surrogateescape")
+            if rel.split("/", 1)[0] in ALWAYS_SKIP:
+                continue
+            out.append(rel)
+        return out
+
+    def _walk(self, dirs: Dict[str, Tuple[str, List[str], List[str]]]) -> List[str]:
+        out: List[str] = []
+        stack: List[Tuple[str, _IgnoreRules]] = [("", _IgnoreRules())]
+        while stack:
+            rel_dir, rules = stack.pop()
+            abs_dir = os.path.join(self.repo_root, *rel_dir.split("/")) if rel_dir else self.repo_root
+            try:
+                mtime = os.stat(abs_dir).st_mtime_ns
+            except OSError:
+                continue
+            try:
+                with open(os.path.join(abs_dir, ".gitignore"), encoding="utf-8", errors="replace") as f:
+                    rules = rules.extend(rel_dir, f.read())
+            except OSError:
+                pass
+            # A listing is reusable while the directory and every .gitignore
+            # that applies to it are unchanged.
+            stamp = f"{mtime}:{rules.token}"
+            cached = self._dirs.get(rel_dir)
+            if cached is not None and cached[0] == stamp:
+                subdirs, files = cached[1], cached[2]
+            else:
+                subdirs, files = [], []
+                try:
+                    with os.scandir(abs_dir) as it:
+                        for de in it:
+                            if de.name in ALWAYS_SKIP:
+                                continue
+                            rel = f"{rel_dir}/{de.name}" if rel_dir else de.name
+                            try:
+                                if de.is_dir(follow_symlinks=False):
+                                    if not rules.ignored(rel, True):
+                                        subdirs.append(rel)
+                                elif de.is_file() and not rules.ignored(rel, False):
+                                    files.append(rel)
+                            except OSError:
+                                continue
+                except OSError:
+                    continue
+                subdirs.sort()
+                files.sort()
+            dirs[rel_dir] = (stamp, subdirs, files)
+            out.extend(files)
+            stack.extend((d, rules) for d in reversed(subdirs))
+        return out
+
+    def _hash(self, abs_path: str) -> Tuple[str, bool, int]:
+        h = hashlib.sha256()
+        binary = False
+        n = 0
+        with open(abs_path, "rb") as f:
+            first = True
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                if first:
+                    binary = b"\0" in chunk[:8192]
+                    first = False
+                h.update(chunk)
+                n += len(chunk)
+        return h.hexdigest(), binary, n
+
+    def update(self, use_git: Optional[bool] = None) -> IndexUpdate:
+        """Bring the index up to date with the working tree (stat-diff, rehash changed files only)."""
+        t0 = time.perf_counter()
+        listed = self._git_ls_files() if use_git is not False else None
+        dirs: Dict[str, Tuple[str, List[str], List[str]]] = {}
+        if listed is None:
+            if use_git:
+                raise RuntimeError(f"git ls-files failed in {self.repo_root}")
+            listed = self._walk(dirs)
+            source = "walk"
+        else:
+            source = "git"
+
+        res = IndexUpdate(source=source)
+        old = self._files
+        files: Dict[str, IndexEntry] = {}
+        for rel in listed:
+            abs_path = os.path.join(self.repo_root, *rel.split("/"))
+            try:
+                st = os.stat(abs_path)
+            except OSError:
+                continue
+            if not os.path.isfile(abs_path):
+                continue
+            prev = old.get(rel)
+            if prev is not None and prev.size == st.st_size and prev.mtime_ns == st.st_mtime_ns:
+                files[rel] = prev
+                continue
+            try:
+                sha, binary, n = self._hash(abs_path)
+            except OSError:
+                continue
+            res.rehashed += 1
+            res.hashed_bytes += n
+            if prev is None:
+                res.added += 1
+            elif prev.sha256 != sha:
+                res.changed += 1
+            language = None if binary else LANGUAGES.get(os.path.splitext(rel)[1].lower())
+            tokens = 0 if binary else (st.st_size + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+            files[rel] = IndexEntry(st.st_size, st.st_mtime_ns, sha, language, tokens, binary)
+        res.removed = sum(1 for p in old if p not in files)
+
+        self._install(files, dirs, source)
+        if res.dirty:
+            self.generation += 1
+        res.ms = (time.perf_counter() - t0) * 1000.0
+        return res
+
+    def refresh(self, use_git: Optional[bool] = None) -> IndexUpdate:
+        """update(), then persist if any entry was rehashed or dropped."""
+        res = self.update(use_git)
+        if res.rehashed or res.removed:
+            try:
+                self.save()
+            except OSError:
+                pass
+        return res
@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import hashlib
+import json
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from .models import EngineInput
+
+def cache_key(engine_input: EngineInput, context_version: str) -> str:
+    """Canonical hash of the submit payload plus the engine's context version."""
+    canonical = json.dumps(engine_input.to_dict(), sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    h = hashlib.sha256()
+    h.update(context_version.encode("utf-8"))
+    h.update(b"\0")
+    h.update(canonical.encode("utf-8"))
+    return h.hexdigest()
+
+def _approx_size(obj: Any) -> int:
+    # Strings dominate engine payloads; count their characters and ignore the rest.
+    if isinstance(obj, str):
+        return len(obj)
+    if isinstance(obj, dict):
+        return sum(len(k) + _approx_size(v) for k, v in obj.items())
+    if isinstance(obj, list):
+        return sum(_approx_size(v) for v in obj)
+    return 8
+
+class ResultCache:
+    """
+    In-memory LRU of engine result payloads keyed by cache_key().
+
+    Bounded by entry count and by approximate payload size (characters of all
+    strings). Entries are only valid for the context version they were keyed
+    with; clear() drops everything when the engine reports a change.
+    """
+
+    def __init__(self, max_entries: int = 32, max_bytes: int = 64 * 1024 * 1024) -> None:
+        self.max_entries = max(1, max_entries)
+        self.max_bytes = max(1, max_bytes)
+        self._entries: "OrderedDict[str, Tuple[Dict[str, Any], int]]" = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def size_bytes(self) -> int:
+        return self._bytes
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def put(self, key: str, payload: Dict[str, Any]) -> None:
+        size = _approx_size(payload)
+        if size > self.max_bytes:
+            return
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._bytes -= old[1]
+        self._entries[key] = (payload, size)
+        self._bytes += size
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self._bytes -= evicted
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._bytes = 0
@@ -3,9 +3,10 @@ from __future__ import annotations
 import asyncio
 import os
 import uuid
+from concurrent.futures import Future
 from dataclasses import asdict
 from pathlib import Path
-from typing import Optional
+from typing import Optional, Union
 
 from textual.app import App, ComposeResult
 from textual.containers import Container, Horizontal, Vertical
@@ -14,9 +15,13 @@ from textual import on
 from textual.message import Message
 from textual.screen import ModalScreen
 
-from ..models import EngineInput, Mode, Provider, Workspace
-from ..engine_client import EngineClient
-from ..log_writer import write_assembled_log, write_chat_log, log_base_dir
+from ..models import EngineInput, EngineOutput, Mode, Provider, Workspace
+from ..engine_client import EngineCancelledError, EngineClient
+from ..engine_pool import EnginePool
+from ..result_cache import ResultCache
+from ..log_retention import RetentionPolicy, apply_retention
+from ..log_writer import LogWriter, chat_log_path, log_base_dir
+from ..repo_index import RepoIndex
 from ..state_store import UIContextPrefs, load_prefs, save_prefs
 from ..workspace import discover_workspace
 from .widgets import (
@@ -29,14 +34,17 @@ from .widgets import (
     ChatComposer,
     ContextPrefsScreen,
     QuitConfirmScreen,
+    RepoTree,
 )
 
 DEFAULT_MODE: Mode = "interpret"
+DEFAULT_MAX_INFLIGHT = 4
 DEFAULT_PROVIDER: Provider = "openai"
 DEFAULT_MODELS = {
     "openai": ["gpt-4.1-mini", "gpt-4.1", "gpt-4o-mini"],
     "anthropic": ["claude-3.5-sonnet", "claude-3.5-haiku"],
 }
+RETENTION_INTERVAL_S = 15 * 60
 
 class AtlasTUIApp(App):
     CSS = """
@@ -85,6 +93,7 @@ class AtlasTUIApp(App):
     BINDINGS = [
         ("f1", "toggle_help", "Help"),
         ("f2", "focus_cycle", "Cycle focus"),
+        ("f3", "cancel_request", "Cancel request"),
         ("escape", "escape", "Close/Back"),
         ("esc", "escape", "Close/Back"),
     ]
@@ -97,6 +106,11 @@ class AtlasTUIApp(App):
         preview_chars: int = 800,
         engine_timeout_s: float = 60.0,
         glass_url: Optional[str] = None,
+        max_inflight: int = DEFAULT_MAX_INFLIGHT,
+        engine_workers: int = 1,
+        result_cache: Optional[ResultCache] = None,
+        retention: Optional[RetentionPolicy] = None,
+        log_segments: bool = False,
     ) -> None:
         super().__init__()
         self.workspace = workspace
@@ -105,21 +119,32 @@ class AtlasTUIApp(App):
         self.preview_chars = preview_chars
         self.engine_timeout_s = engine_timeout_s
         self.glass_url = glass_url
+        self.max_inflight = max(1, max_inflight)
+        self.engine_workers = max(1, engine_workers)
+        self.result_cache = result_cache
+        self.retention = retention
 
         self.mode: Mode = DEFAULT_MODE
         self.provider: Provider = DEFAULT_PROVIDER
         self.model: str = DEFAULT_MODELS[self.provider][0]
 
-        self._engine: Optional[EngineClient] = None
-        self._busy: bool = False
+        self._engine: Optional[Union[EngineClient, EnginePool]] = None
+        # Submissions awaiting an engine result, keyed by request id.
+        self._inflight: dict[str, asyncio.Task] = {}
         self._last_log_path: Optional[Path] = None
 
         self._session_id: str = uuid.uuid4().hex[:10]
         self._chat_logging_enabled: bool = False
         self._chat_log_path: Optional[Path] = None
+        # Inspection and chat logs are written off the event loop.
+        self.log_writer = LogWriter(segments=log_segments)
+        self._retention_task: Optional[asyncio.Task] = None
 
         self._repo_root_path = Path(self.workspace.repo_root).resolve()
         self.prefs: UIContextPrefs = load_prefs(self.workspace.repo_root, self.workspace.project_root)
+        # Loaded from disk now; brought up to date in the background once mounted.
+        self.repo_index = RepoIndex.load(self.workspace.repo_root, self.workspace.project_root)
+        self._index_task: Optional[asyncio.Task] = None
         self._quit_confirm_pending: bool = False
         # Transcript buffer is maintained separately from UI rendering.
         # This avoids early-render crashes when widgets are not fully sized.
@@ -168,7 +193,7 @@ class AtlasTUIApp(App):
                 yield self.repo_health
                 self.selected_path_label = Static("selected_path: (none)", id="selected_path_label")
                 yield self.selected_path_label
-                self.repo_tree = DirectoryTree(Path(self.workspace.repo_root), id="repo_tree")
+                self.repo_tree = RepoTree(Path(self.workspace.repo_root), index=self.repo_index, id="repo_tree")
                 yield self.repo_tree
 
             with Vertical(id="center"):
@@ -203,9 +228,22 @@ class AtlasTUIApp(App):
         yield Footer()
 
     async def on_mount(self) -> None:
+        self.log_writer.start()
         self.set_focus(self.composer)
         # Keep identity out of the transcript; show in header/status instead.
 
+    async def on_unmount(self) -> None:
+        for task in list(self._inflight.values()):
+            task.cancel()
+        if self._index_task is not None:
+            self._index_task.cancel()
+        if self._retention_task is not None:
+            self._retention_task.cancel()
+        if self._engine:
+            await self._engine.stop()
+        # Everything queued reaches disk before the app exits.
+        await asyncio.to_thread(self.log_writer.close)
+
     async def on_ready(self) -> None:
         # UI layout is ready; safe to render transcript.
         self._transcript_ready = True
@@ -218,9 +256,13 @@ class AtlasTUIApp(App):
         await self._refresh_project_panel()
         await self._refresh_repo_health()
         self._update_selected_path_label()
+        self._index_task = asyncio.create_task(self._update_repo_index())
+        if self.retention is not None:
+            self._schedule_retention()
+            self.set_interval(RETENTION_INTERVAL_S, self._schedule_retention)
 
         # Start engine
-        self._engine = EngineClient(cmd=self.engine_cmd, workspace=self.workspace, timeout_s=self.engine_timeout_s)
+        self._engine = self._make_engine()
         try:
             await self._engine.start()
             self.status_bar.set_engine_status(self._engine.status.message)
@@ -232,6 +274,22 @@ class AtlasTUIApp(App):
             self.status_bar.set_glass("on", self.glass_url)
         self.status_bar.set_idle()
 
+    def _make_engine(self) -> Union[EngineClient, EnginePool]:
+        if self.engine_workers > 1:
+            return EnginePool(
+                cmd=self.engine_cmd,
+                workspace=self.workspace,
+                timeout_s=self.engine_timeout_s,
+                workers=self.engine_workers,
+                result_cache=self.result_cache,
+            )
+        return EngineClient(
+            cmd=self.engine_cmd,
+            workspace=self.workspace,
+            timeout_s=self.engine_timeout_s,
+            result_cache=self.result_cache,
+        )
+
     def _workspace_identity_text(self) -> str:
         repo_name = Path(self.workspace.repo_root).name or "repo"
         proj_name = Path(self.workspace.project_root).name if self.workspace.project_root else "None"
@@ -295,11 +353,7 @@ class AtlasTUIApp(App):
                 "session_id": self._session_id,
                 "line": line,
             }
-            try:
-                self._chat_log_path = write_chat_log(self.workspace, self._session_id, entry)
-            except Exception:
-                # avoid surfacing here; status bar will show last error on submit paths
-                pass
+            self._chat_log_path = self.log_writer.append_chat(self.workspace, self._session_id, entry)
 
     async def _refresh_project_panel(self) -> None:
         await self.project_panel.load(self.workspace)
@@ -307,20 +361,16 @@ class AtlasTUIApp(App):
     async def _refresh_repo_health(self) -> None:
         await self.repo_health.load(self.workspace)
 
-    def _set_busy(self, what: str) -> None:
-        self._busy = True
-        self.status_bar.set_busy(what)
-        self.composer.disabled = True
-
-    def _set_idle(self, what: str = "") -> None:
-        self._busy = False
-        self.status_bar.set_idle(what)
-        self.composer.disabled = False
-        self.set_focus(self.composer)
+    def _refresh_inflight(self) -> None:
+        n = len(self._inflight)
+        if n:
+            self.status_bar.set_busy(f"assembling context ({n}/{self.max_inflight} in flight)")
+        else:
+            self.status_bar.set_idle()
 
     async def action_submit(self) -> None:
-        if self._busy:
-            self.status_bar.flash("busy: request in flight")
+        if len(self._inflight) >= self.max_inflight:
+            self.status_bar.flash(f"busy: {len(self._inflight)} requests in flight (limit {self.max_inflight})")
             return
 
         msg = self._get_textarea_text(self.composer).strip()
@@ -328,9 +378,9 @@ class AtlasTUIApp(App):
             return
 
         self._set_textarea_text(self.composer, "")
-        self._append_transcript(f"> {msg}")
 
         request_id = uuid.uuid4().hex
+        self._append_transcript(f"> [{request_id[:8]}] {msg}")
         ui_state = {
             "focused_panel": self._focused_panel_name(),
             "selected_path": self._selected_path(),
@@ -350,20 +400,62 @@ class AtlasTUIApp(App):
         )
 
         if not self._engine:
-            self._engine = EngineClient(cmd=self.engine_cmd, workspace=self.workspace, timeout_s=self.engine_timeout_s)
-
-        self._set_busy("assembling context")
+            self._engine = self._make_engine()
+
+        # Run the round-trip in the background so the composer stays live and
+        # further submissions pipeline behind this one.
+        self._inflight[request_id] = asyncio.create_task(self._run_submission(request_id, engine_input))
+        self._refresh_inflight()
+
+    async def _stream_submission(self, request_id: str, engine_input: EngineInput) -> EngineOutput:
+        # Render progress and the first bytes of the system prompt while the
+        # engine is still assembling.
+        stage, done, total = "queued", 0, 0
+        chars = 0
+        preview = ""
+        timings: dict[str, float] = {}
+        stream = self._engine.submit_stream(request_id, engine_input, partial_chars=self.preview_chars)  # type: ignore[union-attr]
+        async for ev in stream:
+            if ev.output is not None:
+                return ev.output
+            d = ev.data
+            if ev.kind == "progress":
+                stage, done, total = str(d.get("stage", "")), int(d.get("done") or 0), int(d.get("total") or 0)
+            elif ev.kind == "timing":
+                timings[str(d.get("stage", ""))] = d.get("ms", 0)
+            elif ev.kind == "partial" and d.get("field") == "system":
+                off = int(d.get("offset") or 0)
+                chunk = str(d.get("data") or "")
+                chars = max(chars, int(d.get("total") or 0), off + len(chunk))
+                if off < self.preview_chars:
+                    preview = (preview[:off] + chunk)[: self.preview_chars]
+            else:
+                continue
+            self.inspection_panel.update_progress(
+                request_id=request_id,
+                stage=stage,
+                done=done,
+                total=total,
+                system_chars=chars,
+                system_preview=preview,
+                timings_ms=timings,
+            )
+        raise RuntimeError("Engine stream ended without a result")
 
+    async def _run_submission(self, request_id: str, engine_input: EngineInput) -> None:
+        tag = request_id[:8]
         try:
-            out = await self._engine.submit(request_id, engine_input)
-            # Write inspection log
-            log_path = write_assembled_log(
+            assert self._engine is not None
+            out = await self._stream_submission(request_id, engine_input)
+            # Queue the inspection log; its path is known before it is written.
+            log_path, written = await self.log_writer.write_assembled(
                 workspace=self.workspace,
                 request_id=request_id,
                 engine_input=engine_input,
                 engine_output=out,
                 preview_chars=self.preview_chars,
             )
+            self._watch_log_write(tag, written)
             self._last_log_path = log_path
 
             sys_len = len(out.assembled_context.system)
@@ -371,27 +463,53 @@ class AtlasTUIApp(App):
             self.inspection_panel.update_summary(
                 request_id=request_id,
                 log_path=self._short_path(log_path),
-                mode=self.mode,
-                provider=self.provider,
-                model=self.model,
+                mode=engine_input.mode,
+                provider=engine_input.provider,
+                model=engine_input.model,
                 system_len=sys_len,
                 system_preview=preview,
                 diagnostics=out.diagnostics,
             )
 
             self.status_bar.set_last_log(self._short_path(log_path))
+            cached = ((out.diagnostics or {}).get("result_cache") or {}).get("hit")
             self._append_transcript(
-                f"[engine] assembled context (len={sys_len}) - log: {self._short_path(log_path)}"
+                f"[engine] [{tag}] {'cached' if cached else 'assembled'} context (len={sys_len}) - log: {self._short_path(log_path)}"
             )
 
+        except asyncio.CancelledError:
+            raise
+        except EngineCancelledError:
+            self._append_transcript(f"[cancelled] [{tag}]")
         except Exception as e:
-            self._append_transcript(f"[error] {e}")
+            self._append_transcript(f"[error] [{tag}] {e}")
             self.status_bar.flash(f"error: {e}")
         finally:
+            self._inflight.pop(request_id, None)
             # Update engine status if available
             if self._engine:
                 self.status_bar.set_engine_status(self._engine.status.message)
-            self._set_idle()
+            self._refresh_inflight()
+
+    def _watch_log_write(self, tag: str, written: "Future[Path]") -> None:
+        async def _watch() -> None:
+            try:
+                await asyncio.wrap_future(written)
+            except Exception as e:
+                self._append_transcript(f"[error] [{tag}] failed to write log: {e}")
+
+        asyncio.create_task(_watch())
+
+    async def action_cancel_request(self) -> None:
+        # Cancels the most recent submission still in flight.
+        if not self._inflight or not self._engine:
+            self.status_bar.flash("nothing to cancel")
+            return
+        request_id = next(reversed(self._inflight))
+        if self._engine.cancel(request_id):
+            self.status_bar.flash(f"cancelled {request_id[:8]}")
+        else:
+            self.status_bar.flash(f"{request_id[:8]} already finished")
 
     def _focused_panel_name(self) -> str:
         w = self.focused
@@ -442,14 +560,50 @@ class AtlasTUIApp(App):
             return
         await self.action_focus_chat()
 
-    async def action_refresh_tree(self) -> None:
+    async def _update_repo_index(self) -> None:
+        try:
+            res = await asyncio.to_thread(self.repo_index.refresh)
+        except Exception as e:
+            self.status_bar.flash(f"repo index failed: {e}")
+            return
+        if res.dirty:
+            self._reload_tree()
+        self.status_bar.flash(f"repo index: {len(self.repo_index)} files (+{res.added} ~{res.changed} -{res.removed})")
+
+    def _schedule_retention(self) -> None:
+        if self._retention_task is None or self._retention_task.done():
+            self._retention_task = asyncio.create_task(self._apply_retention())
+
+    async def _apply_retention(self) -> None:
+        try:
+            report = await asyncio.to_thread(
+                apply_retention,
+                log_base_dir(self.workspace),
+                self.retention,
+                skip_paths=self.log_writer.open_paths(),
+            )
+        except Exception as e:
+            self.status_bar.flash(f"log retention failed: {e}")
+            return
+        if report.dirty:
+            await self._refresh_project_panel()
+            self.status_bar.flash(
+                f"logs: compacted {report.compacted}, deleted {len(report.deleted)}, "
+                f"freed {report.freed_bytes // 1024} KiB"
+            )
+
+    def _reload_tree(self) -> None:
         # DirectoryTree has a reload method in newer versions; rebuild if absent.
         try:
             self.repo_tree.reload()
         except Exception:
             self.repo_tree.remove()
-            self.repo_tree = DirectoryTree(Path(self.workspace.repo_root), id="repo_tree")
+            self.repo_tree = RepoTree(Path(self.workspace.repo_root), index=self.repo_index, id="repo_tree")
             self.query_one("#left").mount(self.repo_tree)
+
+    async def action_refresh_tree(self) -> None:
+        await self._update_repo_index()
+        self._reload_tree()
         await self._refresh_repo_health()
         self._update_selected_path_label()
         self.status_bar.flash("repo tree refreshed")
@@ -474,10 +628,10 @@ class AtlasTUIApp(App):
 
         try:
             # Textual 7+: avoid blocking an action handler waiting for dismissal.
-            await self.push_screen(ContextPrefsScreen(self.prefs), callback=_apply)  # type: ignore[call-arg]
+            await self.push_screen(ContextPrefsScreen(self.prefs, index=self.repo_index), callback=_apply)  # type: ignore[call-arg]
         except TypeError:
             # Older Textual: no callback arg.
-            _apply(await self.push_screen_wait(ContextPrefsScreen(self.prefs)))
+            _apply(await self.push_screen_wait(ContextPrefsScreen(self.prefs, index=self.repo_index)))
 
     async def action_escape(self) -> None:
         # Close modal if present; else open quit confirmation.
@@ -498,17 +652,16 @@ class AtlasTUIApp(App):
         self._chat_logging_enabled = not self._chat_logging_enabled
         state = "on" if self._chat_logging_enabled else "off"
         if self._chat_logging_enabled:
-            # Ensure directory exists
-            _ = log_base_dir(self.workspace) / "chat"
-            _.mkdir(parents=True, exist_ok=True)
-            self._chat_log_path = log_base_dir(self.workspace) / "chat" / f"{self._session_id}.jsonl"
+            # The writer thread creates the file on the first line.
+            self._chat_log_path = chat_log_path(self.workspace, self._session_id)
         self.status_bar.set_chat_log(state, str(self._chat_log_path) if self._chat_log_path else "")
         self.status_bar.flash(f"chat logging: {state}")
 
     async def action_restart_engine(self) -> None:
         if not self._engine:
-            self._engine = EngineClient(cmd=self.engine_cmd, workspace=self.workspace, timeout_s=self.engine_timeout_s)
-        self._set_busy("restarting engine")
+            self._engine = self._make_engine()
+        # Hot swap: submissions keep flowing while the replacement warms up.
+        self.status_bar.flash("restarting engine")
         try:
             await self._engine.restart()
             self.status_bar.flash("engine restarted")
@@ -516,7 +669,6 @@ class AtlasTUIApp(App):
             self.status_bar.flash(f"restart failed: {e}")
         finally:
             self.status_bar.set_engine_status(self._engine.status.message if self._engine else "n/a")
-            self._set_idle()
 
     async def _request_quit_confirm(self) -> None:
         if self._quit_confirm_pending:
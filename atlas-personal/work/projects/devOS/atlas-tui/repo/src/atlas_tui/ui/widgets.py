@@ -1,18 +1,22 @@
 from __future__ import annotations
 
+import asyncio
 import os
 import subprocess
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Iterable, List, Optional
 
 from textual import events
 from textual.app import ComposeResult
 from textual.containers import Horizontal, Vertical
 from textual.screen import ModalScreen
-from textual.widgets import Button, Input, Markdown, Select, Static, TextArea
+from textual.widgets import Button, DirectoryTree, Input, Markdown, Select, Static, TextArea
 
+from ..log_catalog import CatalogEntry, log_catalog
+from ..log_writer import log_base_dir
 from ..models import Workspace
+from ..repo_index import RepoIndex
 from ..state_store import UIContextPrefs
 
 def _safe_read_text(path: Path, max_bytes: int = 60_000) -> str:
@@ -50,6 +54,11 @@ class ChatComposer(TextArea):
             event.stop()
             return
 
+        if key == "f3":
+            await self.app.action_cancel_request()  # type: ignore[attr-defined]
+            event.stop()
+            return
+
         if key in {"escape", "esc"}:
             await self.app.action_escape()  # type: ignore[attr-defined]
             event.stop()
@@ -150,6 +159,8 @@ class InspectionPanel(Static):
         sel_count = len(sel) if isinstance(sel, list) else None
         timings = diag.get("timings_ms") or {}
         assemble_ms = timings.get("assemble")
+        cache = diag.get("result_cache") or {}
+        assembly_cache = diag.get("assembly_cache") or {}
 
         lines = [
             "Last assembly",
@@ -161,6 +172,11 @@ class InspectionPanel(Static):
             lines.append(f"selected_artifacts: {sel_count}")
         if assemble_ms is not None:
             lines.append(f"assemble_ms: {assemble_ms}")
+        if assembly_cache:
+            state = "hit" if assembly_cache.get("hit") else "miss"
+            lines.append(f"assembly_cache: {state} ({assembly_cache.get('hits', 0)}/{assembly_cache.get('misses', 0)} hit/miss)")
+        if cache.get("hit"):
+            lines.append(f"result_cache: hit ({cache.get('key', '')})")
         lines += [
             f"log: {log_path}",
             "",
@@ -169,6 +185,31 @@ class InspectionPanel(Static):
         ]
         self.update("\n".join(lines))
 
+    def update_progress(
+        self,
+        request_id: str,
+        stage: str,
+        done: int,
+        total: int,
+        system_chars: int,
+        system_preview: str,
+        timings_ms: Optional[Dict[str, float]] = None,
+    ) -> None:
+        lines = [
+            "Assembling",
+            f"request: {request_id}",
+            f"stage: {stage} ({done}/{total})" if total else f"stage: {stage}",
+            f"system_chars (so far): {system_chars}",
+        ]
+        for name, ms in (timings_ms or {}).items():
+            lines.append(f"{name}_ms: {ms}")
+        lines += [
+            "",
+            "Preview (streaming):",
+            system_preview,
+        ]
+        self.update("\n".join(lines))
+
 class ProjectPanel(Static):
     can_focus = True
 
@@ -183,7 +224,6 @@ class ProjectPanel(Static):
         pr = Path(workspace.project_root)
         now = pr / "now.md"
         specs = pr / "specs"
-        logs = pr / "logs"
 
         now_preview = ""
         if now.exists():
@@ -195,9 +235,12 @@ class ProjectPanel(Static):
         spec_files = []
         if specs.exists():
             spec_files = sorted([p for p in specs.glob("**/*") if p.is_file()], key=lambda p: p.stat().st_mtime, reverse=True)[:12]
-        log_files = []
-        if logs.exists():
-            log_files = sorted([p for p in logs.glob("**/*") if p.is_file()], key=lambda p: p.stat().st_mtime, reverse=True)[:10]
+        recent: list[CatalogEntry] = []
+        try:
+            # First use may build the catalog from disk; keep that off the event loop.
+            recent = await asyncio.to_thread(lambda: log_catalog(log_base_dir(workspace)).recent(10))
+        except Exception:
+            pass
 
         def fmt_list(items):
             return "\n".join([f"- {p.relative_to(pr)}" for p in items]) if items else "- (none)"
@@ -212,7 +255,9 @@ class ProjectPanel(Static):
             fmt_list(spec_files),
             "",
             "logs (recent):",
-            fmt_list(log_files),
+            "\n".join(
+                f"- {e.ts} {e.request_id[:8]} {e.mode} {e.model} ({e.system_chars} chars)" for e in recent
+            ) if recent else "- (none)",
         ]
         self.update("\n".join(text))
 
@@ -262,6 +307,7 @@ class HelpOverlay(ModalScreen):
  - Shift+Enter: newline (in composer)
  - F1: toggle help
  - F2: cycle focus (repo > chat > project)
+ - F3: cancel the most recent in-flight request
  - Ctrl+C: force quit (no confirmation)
  - Esc: close modal or quit (with confirmation) if no modal
 
@@ -296,13 +342,41 @@ class FilePreviewScreen(ModalScreen):
         )
 
 
+class RepoTree(DirectoryTree):
+    """DirectoryTree that only shows paths in the repo index (so .gitignore'd files are hidden).
+
+    Until the index has been built, everything but .git is shown.
+    """
+
+    def __init__(self, path: Path, index: Optional[RepoIndex] = None, **kwargs: Any) -> None:
+        super().__init__(path, **kwargs)
+        self.index = index
+        self._root = Path(path)
+
+    def filter_paths(self, paths: Iterable[Path]) -> Iterable[Path]:
+        index = self.index
+        if index is None or len(index) == 0:
+            return [p for p in paths if p.name != ".git"]
+        out = []
+        for p in paths:
+            try:
+                rel = p.relative_to(self._root).as_posix()
+            except ValueError:
+                continue
+            if rel in index:
+                out.append(p)
+        return out
+
+
 class ContextPrefsScreen(ModalScreen[Optional[UIContextPrefs]]):
     BINDINGS = [
         ("escape", "cancel", "Cancel"),
     ]
 
-    def __init__(self, prefs: UIContextPrefs) -> None:
+    def __init__(self, prefs: UIContextPrefs, index: Optional[RepoIndex] = None) -> None:
         super().__init__()
+        self._index = index
+        self._warned: Optional[List[str]] = None
         self._prefs = UIContextPrefs(
             context_profile=prefs.context_profile,
             budget_chars=prefs.budget_chars,
@@ -336,6 +410,9 @@ class ContextPrefsScreen(ModalScreen[Optional[UIContextPrefs]]):
         yield Static("Excluded:")
         yield self.excl_area
 
+        self.warning = Static("", id="ctx_warning")
+        yield self.warning
+
         with Horizontal():
             yield Button("Save", id="ctx_save", variant="primary")
             yield Button("Cancel", id="ctx_cancel")
@@ -354,6 +431,13 @@ class ContextPrefsScreen(ModalScreen[Optional[UIContextPrefs]]):
         pins = [p.strip() for p in (self.pins_area.text or "").splitlines() if p.strip()]
         excl = [p.strip() for p in (self.excl_area.text or "").splitlines() if p.strip()]
 
+        unknown = self._unknown_paths(pins, excl)
+        if unknown and unknown != self._warned:
+            # Warn once; saving again with the same paths keeps them.
+            self._warned = unknown
+            self.warning.update("Not in the repo index: " + ", ".join(unknown) + "\nPress Save again to keep them.")
+            return
+
         self._prefs.context_profile = prof  # type: ignore[assignment]
         self._prefs.budget_chars = budget
         self._prefs.pinned_paths = pins
@@ -361,6 +445,13 @@ class ContextPrefsScreen(ModalScreen[Optional[UIContextPrefs]]):
 
         self.dismiss(self._prefs)
 
+    def _unknown_paths(self, pins: List[str], excl: List[str]) -> List[str]:
+        if self._index is None or len(self._index) == 0:
+            return []
+        out = [p for p in pins if p.strip("/") not in self._index]
+        out += [p for p in excl if not self._index.matches(p)]
+        return out
+
 
 class QuitConfirmScreen(ModalScreen[bool]):
     BINDINGS = [
@@ -4,29 +4,53 @@ import json
 import threading
 from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from importlib import resources
-from pathlib import Path
+from dataclasses import asdict
 from typing import Optional
-from urllib.parse import urlparse
+from urllib.parse import parse_qs, urlparse
 
+from ..log_archive import archive_dir, history, is_archive_ref, split_ref
+from ..log_catalog import log_catalog
+from ..log_writer import log_base_dir, read_assembled_log
 from ..models import Workspace
 from ..state_store import latest_pointer_path
 
 
+def _load_log(path: str, meta: dict) -> Optional[dict]:
+    # path is a log file or, once retention has compacted it, an archive ref.
+    try:
+        data = read_assembled_log(path)
+    except FileNotFoundError:
+        return None
+    data["_log_path"] = str(path)
+    data["_latest_meta"] = meta
+    return data
+
+
+def _load_from_catalog(workspace: Workspace, request_id: Optional[str] = None) -> Optional[dict]:
+    try:
+        catalog = log_catalog(log_base_dir(workspace))
+        entry = catalog.get(request_id) if request_id else catalog.latest()
+        if entry is None:
+            return None
+        return _load_log(entry.log_path, {"last_log_path": entry.log_path, "request_id": entry.request_id})
+    except Exception:
+        return None
+
+
 def _load_latest(workspace: Workspace) -> Optional[dict]:
     ptr = latest_pointer_path(workspace.repo_root, workspace.project_root)
     if not ptr.exists():
-        return None
+        # No pointer (e.g. state was cleared): fall back to the catalog.
+        return _load_from_catalog(workspace)
     try:
         meta = json.loads(ptr.read_text(encoding="utf-8"))
         lp = meta.get("last_log_path")
         if not lp:
             return None
-        log_path = Path(lp)
-        if not log_path.exists():
-            return None
-        data = json.loads(log_path.read_text(encoding="utf-8"))
-        data["_log_path"] = str(log_path)
-        data["_latest_meta"] = meta
+        data = _load_log(lp, meta)
+        if data is None and meta.get("request_id"):
+            # The file was compacted into an archive; the catalog knows where.
+            return _load_from_catalog(workspace, meta["request_id"])
         return data
     except Exception:
         return None
@@ -63,6 +87,46 @@ class _Handler(BaseHTTPRequestHandler):
         if parsed.path in {"/", "/index.html"}:
             self._send_html(self.index_html)
             return
+        if parsed.path == "/api/logs":
+            # Recent logs, or full-text search over user messages and chat lines with ?q=.
+            qs = parse_qs(parsed.query)
+            try:
+                limit = max(1, min(200, int((qs.get("limit") or ["20"])[0])))
+            except ValueError:
+                limit = 20
+            catalog = log_catalog(log_base_dir(self.workspace))
+            q = (qs.get("q") or [""])[0]
+            items = catalog.search(q, limit) if q else catalog.recent(limit)
+            self._send_json({"status": "ok", "items": [asdict(i) for i in items]})
+            return
+        if parsed.path == "/api/history":
+            # Paged browsing of archive segments, newest first; pass the last ts as ?before=.
+            qs = parse_qs(parsed.query)
+            try:
+                limit = max(1, min(500, int((qs.get("limit") or ["50"])[0])))
+            except ValueError:
+                limit = 50
+            before = (qs.get("before") or [""])[0] or None
+            items = history(log_base_dir(self.workspace), before=before, limit=limit)
+            self._send_json({"status": "ok", "items": [{"ts": ts, "request_id": rid, "ref": ref} for ts, rid, ref in items]})
+            return
+        if parsed.path == "/api/log":
+            qs = parse_qs(parsed.query)
+            request_id = (qs.get("request_id") or [""])[0]
+            ref = (qs.get("ref") or [""])[0]
+            data = None
+            if ref:
+                # Only refs into this workspace's segments; never arbitrary paths.
+                if is_archive_ref(ref) and split_ref(ref)[0].parent == archive_dir(log_base_dir(self.workspace)):
+                    data = _load_log(ref, {"request_id": split_ref(ref)[1]})
+            else:
+                entry = log_catalog(log_base_dir(self.workspace)).get(request_id) if request_id else None
+                data = _load_log(entry.log_path, {"request_id": entry.request_id}) if entry else None
+            if not data:
+                self._send_json({"status": "none"}, status=404)
+                return
+            self._send_json({"status": "ok", "data": data})
+            return
         if parsed.path == "/api/latest":
             data = _load_latest(self.workspace)
             if not data:
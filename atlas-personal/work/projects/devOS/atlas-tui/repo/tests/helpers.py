@@ -0,0 +1,19 @@
+"""Small builders shared by the test modules."""
+
+from __future__ import annotations
+
+from typing import Any, Dict, Optional
+
+from atlas_tui.models import AssembledContext, EngineInput, EngineOutput, Mode, ProviderRequest, Workspace
+
+
+def engine_input(ws: Workspace, msg: str, mode: Mode = "interpret") -> EngineInput:
+    return EngineInput(workspace=ws, mode=mode, provider="openai", model="m", user_message=msg, ui_state={})
+
+
+def engine_output(system: str, diagnostics: Optional[Dict[str, Any]] = None) -> EngineOutput:
+    return EngineOutput(
+        assembled_context=AssembledContext(mode="plan", system=system),
+        provider_request=ProviderRequest(provider="openai", model="m", system=system, user="hi"),
+        diagnostics=diagnostics or {},
+    )
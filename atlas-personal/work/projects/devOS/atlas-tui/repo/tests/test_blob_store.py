@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from atlas_tui.blob_store import GZIP, NONE, BlobStore
+from atlas_tui.log_writer import blobs_dir, read_assembled_log, write_assembled_log
+from atlas_tui.models import AssembledContext, EngineInput, EngineOutput, ProviderRequest, Workspace
+
+
+class TestBlobStore(unittest.TestCase):
+    def test_round_trip_and_dedup(self) -> None:
+        with tempfile.TemporaryDirectory() as d:
+            store = BlobStore(Path(d), codec=GZIP)
+            text = "kernel text \u00e9 " * 1000
+            ref = store.put_text(text)
+            self.assertEqual(ref["chars"], len(text))
+            self.assertEqual(store.put_text(text), ref)
+            self.assertEqual(store.writes, 1)
+            self.assertEqual(store.get_text(ref["$blob"]), text)
+            # A store with another codec still finds the existing blob.
+            other = BlobStore(Path(d), codec=NONE)
+            self.assertEqual(other.put_text(text), ref)
+            self.assertEqual(other.writes, 0)
+            self.assertEqual(other.get_text(ref["$blob"]), text)
+
+
+class TestAssembledLogBlobs(unittest.TestCase):
+    def test_system_strings_are_stored_once_and_resolved(self) -> None:
+        with tempfile.TemporaryDirectory() as d:
+            ws = Workspace(repo_root=d, project_root=None)
+            system = "S" * 50_000
+            out = EngineOutput(
+                assembled_context=AssembledContext(mode="plan", system=system),
+                provider_request=ProviderRequest(
+                    provider="openai",
+                    model="m",
+                    system=system,
+                    user="hi",
+                    messages=[{"role": "system", "content": system}, {"role": "user", "content": "hi"}],
+                ),
+                diagnostics={},
+            )
+            inp = EngineInput(workspace=ws, mode="plan", provider="openai", model="m", user_message="hi")
+            p1 = write_assembled_log(ws, "r1", inp, out)
+            p2 = write_assembled_log(ws, "r2", inp, out)
+
+            self.assertLess(p1.stat().st_size, 10_000)
+            self.assertEqual(len([p for p in blobs_dir(ws).rglob("*") if p.is_file()]), 1)
+            raw = json.loads(p2.read_text(encoding="utf-8"))
+            self.assertIn("$blob", raw["assembled_context"]["system"])
+
+            data = read_assembled_log(p2)
+            self.assertEqual(data["assembled_context"]["system"], system)
+            self.assertEqual(data["provider_request"]["system"], system)
+            self.assertEqual(data["provider_request"]["messages"][0]["content"], system)
+            self.assertEqual(data["provider_request"]["messages"][1]["content"], "hi")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import os
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from atlas_tui import dummy_engine
+from atlas_tui.assets import atlas_docs_root
+
+
+class TestDummyEngineAssemblyCache(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self._tmp.name) / "atlas"
+        shutil.copytree(str(atlas_docs_root()), self.root)
+        self.emitted: list[dict] = []
+        patches = [
+            mock.patch.object(dummy_engine, "atlas_docs_root", lambda: self.root),
+            mock.patch.object(dummy_engine, "_emit", self.emitted.append),
+            mock.patch.object(dummy_engine, "_assembly_cache", dummy_engine._AssemblyCache()),
+            mock.patch.object(dummy_engine, "_context_version", None),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+        self.addCleanup(self._tmp.cleanup)
+
+    def _submit(self, req_id: str, mode: str) -> dict:
+        dummy_engine._handle_submit(req_id, {"mode": mode, "user_message": "hi"})
+        results = [m for m in self.emitted if m.get("type") == "result" and m.get("id") == req_id]
+        self.assertEqual(len(results), 1)
+        self.assertTrue(results[0]["ok"], msg=results[0])
+        return results[0]["payload"]
+
+    def test_hit_after_first_assembly_per_mode(self) -> None:
+        first = self._submit("r1", "plan")
+        second = self._submit("r2", "plan")
+        other = self._submit("r3", "execute")
+
+        self.assertEqual(first["diagnostics"]["assembly_cache"], {"hit": False, "hits": 0, "misses": 1})
+        self.assertEqual(second["diagnostics"]["assembly_cache"], {"hit": True, "hits": 1, "misses": 1})
+        self.assertFalse(other["diagnostics"]["assembly_cache"]["hit"])
+        self.assertEqual(first["assembled_context"]["system"], second["assembled_context"]["system"])
+        self.assertEqual(set(second["diagnostics"]["timings_ms"]), {"signature", "assemble", "repo", "total"})
+
+    def test_modified_document_invalidates(self) -> None:
+        self._submit("r1", "plan")
+        projection = self.root / "projections" / "plan-opencode.md"
+        projection.write_text("changed projection", encoding="utf-8")
+        st = projection.stat()
+        os.utime(projection, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+        out = self._submit("r2", "plan")
+        self.assertFalse(out["diagnostics"]["assembly_cache"]["hit"])
+        self.assertTrue(out["assembled_context"]["system"].endswith("changed projection"))
+        changed = [m for m in self.emitted if m.get("kind") == "context_changed"]
+        self.assertEqual(len(changed), 1)
+        self.assertEqual(changed[0]["context_version"], out["diagnostics"]["context_version"])
+
+
+class TestDummyEngineRepoContext(unittest.TestCase):
+    def test_pinned_file_is_appended_to_system(self) -> None:
+        emitted: list[dict] = []
+        with tempfile.TemporaryDirectory() as d, mock.patch.object(dummy_engine, "_emit", emitted.append):
+            (Path(d) / "NOTES.md").write_text("pinned body\n", encoding="utf-8")
+            dummy_engine._handle_submit("r1", {
+                "mode": "plan",
+                "user_message": "hi",
+                "workspace": {"repo_root": d, "project_root": None},
+                "ui_state": {"context_profile": "minimal", "budget_chars": 10_000, "pinned_paths": ["NOTES.md"]},
+            })
+        result = [m for m in emitted if m.get("type") == "result"][0]
+        self.assertTrue(result["ok"], msg=result)
+        out = result["payload"]
+        self.assertIn("# Repository context", out["assembled_context"]["system"])
+        self.assertIn("pinned body", out["assembled_context"]["system"])
+        self.assertEqual([f["path"] for f in out["diagnostics"]["repo_context"]["files"]], ["NOTES.md"])
+        self.assertIn("repo:NOTES.md", out["diagnostics"]["selected_artifacts"])
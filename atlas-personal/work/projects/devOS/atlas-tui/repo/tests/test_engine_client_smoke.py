@@ -1,13 +1,16 @@
 from __future__ import annotations
 
+import asyncio
 import sys
 import tempfile
 import unittest
 from pathlib import Path
 
-from atlas_tui.engine_client import EngineClient
+from atlas_tui.engine_client import EngineCancelledError, EngineClient, EngineProtocolError
 from atlas_tui.models import EngineInput, Workspace
 
+from .helpers import engine_input
+
 
 ENGINE_STUB = r"""
 import json, sys, time
@@ -70,3 +73,304 @@ class TestEngineClientSmoke(unittest.IsolatedAsyncioTestCase):
                 self.assertEqual(out.provider_request.user, "hello")
             finally:
                 await client.stop()
+
+
+# Holds every submit until three have arrived, then answers in reverse order.
+REVERSING_STUB = r"""
+import json, sys
+held = []
+for raw in sys.stdin:
+    msg = json.loads(raw)
+    held.append(msg)
+    if len(held) < 3:
+        continue
+    for m in reversed(held):
+        system = "sys-" + m["payload"]["user_message"]
+        out = {
+            "assembled_context": {"mode": "interpret", "system": system},
+            "provider_request": {"provider": "openai", "model": "m", "system": system, "user": m["payload"]["user_message"], "messages": []},
+            "diagnostics": {},
+        }
+        print(json.dumps({"type": "result", "id": m["id"], "ok": True, "payload": out}), flush=True)
+    held = []
+"""
+
+# The engine child does not inherit the test's sys.path, so point it at src/.
+SRC = Path(__file__).resolve().parents[1] / "src"
+DUMMY_ENGINE = (
+    f"import sys; sys.path.insert(0, {str(SRC)!r}); "
+    "from atlas_tui.dummy_engine import main; raise SystemExit(main(sys.argv[1:]))"
+)
+
+
+class TestEngineClientPipelining(unittest.IsolatedAsyncioTestCase):
+    async def test_out_of_order_results_match_by_id(self) -> None:
+        with tempfile.TemporaryDirectory() as d:
+            ws = Workspace(repo_root=str(Path(d).resolve()), project_root=None)
+            client = EngineClient(cmd=[sys.executable, "-u", "-c", REVERSING_STUB], workspace=ws, timeout_s=5.0)
+            try:
+                outs = await asyncio.gather(*(client.submit(f"req-{i}", engine_input(ws, f"m{i}")) for i in range(3)))
+                self.assertEqual([o.assembled_context.system for o in outs], ["sys-m0", "sys-m1", "sys-m2"])
+                self.assertEqual(client.in_flight, 0)
+            finally:
+                await client.stop()
+
+    async def test_dummy_engine_concurrent_submits(self) -> None:
+        with tempfile.TemporaryDirectory() as d:
+            ws = Workspace(repo_root=str(Path(d).resolve()), project_root=None)
+            client = EngineClient(cmd=[sys.executable, "-u", "-c", DUMMY_ENGINE], workspace=ws, timeout_s=10.0)
+            try:
+                modes = ["interpret", "plan", "execute", "interpret", "plan"]
+                inputs = [
+                    engine_input(ws, f"q{i}", mode=m)  # type: ignore[arg-type]
+                    for i, m in enumerate(modes)
+                ]
+                outs = await asyncio.gather(*(client.submit(f"r{i}", inp) for i, inp in enumerate(inputs)))
+                for inp, out in zip(inputs, outs):
+                    self.assertEqual(out.assembled_context.mode, inp.mode)
+                    self.assertEqual(out.provider_request.user, inp.user_message)
+            finally:
+                await client.stop()
+
+
+# Announces itself, then answers each submit with its pid after sleeping for
+# the number of seconds given as the user message.
+PID_STUB = r"""
+import json, os, sys, time
+print(json.dumps({"type": "event", "level": "info", "message": "stub started"}), flush=True)
+for raw in sys.stdin:
+    msg = json.loads(raw)
+    user = msg["payload"]["user_message"]
+    time.sleep(float(user))
+    system = str(os.getpid())
+    out = {
+        "assembled_context": {"mode": "interpret", "system": system},
+        "provider_request": {"provider": "openai", "model": "m", "system": system, "user": user, "messages": []},
+        "diagnostics": {},
+    }
+    print(json.dumps({"type": "result", "id": msg["id"], "ok": True, "payload": out}), flush=True)
+"""
+
+
+class TestEngineClientHotSwap(unittest.IsolatedAsyncioTestCase):
+    async def test_restart_drains_old_and_routes_new(self) -> None:
+        with tempfile.TemporaryDirectory() as d:
+            ws = Workspace(repo_root=str(Path(d).resolve()), project_root=None)
+            client = EngineClient(cmd=[sys.executable, "-u", "-c", PID_STUB], workspace=ws, timeout_s=5.0)
+            try:
+                first = await client.submit("warm", engine_input(ws, "0"))
+                old_pid = first.assembled_context.system
+
+                slow = asyncio.create_task(client.submit("slow", engine_input(ws, "0.4")))
+                await asyncio.sleep(0.05)
+                restart = asyncio.create_task(client.restart())
+                # Wait for the replacement to announce itself and take over.
+                await asyncio.sleep(0)
+                self.assertEqual(client.status.message, "restarting")
+                while client.status.message == "restarting":
+                    await asyncio.sleep(0.01)
+                self.assertFalse(slow.done())
+                fresh = await client.submit("fresh", engine_input(ws, "0"))
+
+                self.assertEqual((await slow).assembled_context.system, old_pid)
+                await restart
+                self.assertNotEqual(fresh.assembled_context.system, old_pid)
+                self.assertTrue(client.alive)
+            finally:
+                await client.stop()
+
+    async def test_restart_resubmits_after_drain_timeout(self) -> None:
+        with tempfile.TemporaryDirectory() as d:
+            ws = Workspace(repo_root=str(Path(d).resolve()), project_root=None)
+            client = EngineClient(
+                cmd=[sys.executable, "-u", "-c", PID_STUB], workspace=ws, timeout_s=5.0, drain_timeout_s=0.1
+            )
+            try:
+                await client.start()
+                stuck = asyncio.create_task(client.submit("stuck", engine_input(ws, "0.8")))
+                await asyncio.sleep(0.05)
+                await client.restart()
+                out = await stuck
+                self.assertEqual(out.provider_request.user, "0.8")
+                self.assertEqual(client.in_flight, 0)
+            finally:
+                await client.stop()
+
+
+# Offers length-prefixed framing and answers with a system string whose size is
+# the user message, to exercise payloads far beyond a default line limit. The
+# message "garbage" is answered with a frame header no reader can accept.
+BIG_STUB = (
+    f"import sys; sys.path.insert(0, {str(SRC)!r})\n"
+    + r"""
+import time
+from atlas_tui import framing
+out = sys.stdout.buffer
+inp = sys.stdin.buffer
+mode = framing.JSONL
+out.write(framing.encode({"type": "event", "message": "started", "framing": framing.supported_framings()}, mode)); out.flush()
+while True:
+    raw = inp.readline() if mode == framing.JSONL else framing.read_frame(inp)
+    if not raw:
+        break
+    msg = framing.decode(raw, mode)
+    if msg["type"] == "hello":
+        out.write(framing.encode({"type": "event", "message": "ack", "framing_selected": msg["framing"]}, mode)); out.flush()
+        mode = msg["framing"]
+        continue
+    if msg["payload"]["user_message"] == "garbage":
+        out.write(b"\xff\xff\xff\xff"); out.flush()
+        continue
+    system = "s" * int(msg["payload"]["user_message"])
+    res = {
+        "assembled_context": {"mode": "interpret", "system": system},
+        "provider_request": {"provider": "openai", "model": "m", "system": system, "user": "", "messages": []},
+        "diagnostics": {},
+    }
+    out.write(framing.encode({"type": "result", "id": msg["id"], "ok": True, "payload": res}, mode)); out.flush()
+"""
+)
+
+
+class TestEngineClientFraming(unittest.IsolatedAsyncioTestCase):
+    async def _roundtrip(self, framing_mode: str) -> tuple[str, int]:
+        with tempfile.TemporaryDirectory() as d:
+            ws = Workspace(repo_root=str(Path(d).resolve()), project_root=None)
+            client = EngineClient(cmd=[sys.executable, "-u", "-c", BIG_STUB], workspace=ws, timeout_s=10.0, framing=framing_mode)
+            try:
+                # The first submit may race the handshake; the second is sent after it.
+                sizes = []
+                for i, n in enumerate([10, 3_000_000]):
+                    out = await client.submit(f"r{i}", engine_input(ws, str(n)))
+                    sizes.append(len(out.assembled_context.system))
+                self.assertEqual(sizes, [10, 3_000_000])
+                assert client._cur is not None
+                return client._cur.read_framing, sizes[-1]
+            finally:
+                await client.stop()
+
+    async def test_negotiates_length_prefixed_framing(self) -> None:
+        read_framing, _ = await self._roundtrip("auto")
+        self.assertIn(read_framing, {"lp-json", "lp-msgpack"})
+
+    async def test_jsonl_fallback_carries_large_payloads(self) -> None:
+        read_framing, _ = await self._roundtrip("jsonl")
+        self.assertEqual(read_framing, "jsonl")
+
+    async def test_bad_frame_header_ends_the_process(self) -> None:
+        with tempfile.TemporaryDirectory() as d:
+            ws = Workspace(repo_root=str(Path(d).resolve()), project_root=None)
+            client = EngineClient(cmd=[sys.executable, "-u", "-c", BIG_STUB], workspace=ws, timeout_s=10.0)
+            try:
+                await client.submit("r0", engine_input(ws, "1"))
+                assert client._cur is not None
+                old = client._cur.proc
+                # r0 may have raced the handshake; wait for the switch.
+                while client._cur.read_framing == "jsonl":
+                    await asyncio.sleep(0.01)
+                with self.assertRaises(EngineProtocolError):
+                    await client.submit("r1", engine_input(ws, "garbage"))
+                await asyncio.wait_for(old.wait(), timeout=5.0)
+                # The next submit runs on a fresh process.
+                out = await client.submit("r2", engine_input(ws, "3"))
+                self.assertEqual(out.assembled_context.system, "sss")
+                self.assertIsNot(client._cur.proc, old)
+            finally:
+                await client.stop()
+
+    async def test_dummy_engine_negotiates(self) -> None:
+        with tempfile.TemporaryDirectory() as d:
+            ws = Workspace(repo_root=str(Path(d).resolve()), project_root=None)
+            client = EngineClient(cmd=[sys.executable, "-u", "-c", DUMMY_ENGINE], workspace=ws, timeout_s=10.0)
+            try:
+                await client.start()
+                await client.submit("r0", engine_input(ws, "hi"))
+                out = await client.submit("r1", engine_input(ws, "again"))
+                self.assertEqual(out.provider_request.user, "again")
+                assert client._cur is not None
+                self.assertNotEqual(client._cur.read_framing, "jsonl")
+            finally:
+                await client.stop()
+
+
+class TestEngineClientStreaming(unittest.IsolatedAsyncioTestCase):
+    async def test_submit_stream_yields_events_then_result(self) -> None:
+        with tempfile.TemporaryDirectory() as d:
+            ws = Workspace(repo_root=str(Path(d).resolve()), project_root=None)
+            client = EngineClient(cmd=[sys.executable, "-u", "-c", DUMMY_ENGINE], workspace=ws, timeout_s=10.0)
+            inp = engine_input(ws, "hi", mode="plan")
+            try:
+                events = [ev async for ev in client.submit_stream("s1", inp)]
+                self.assertEqual(events[-1].kind, "result")
+                out = events[-1].output
+                assert out is not None
+                self.assertTrue(all(ev.output is None for ev in events[:-1]))
+
+                stages = [ev.data["stage"] for ev in events if ev.kind == "progress"]
+                self.assertEqual(stages, ["kernel", "protocol", "projection", "repo"])
+                self.assertEqual(len([ev for ev in events if ev.kind == "timing"]), 4)
+
+                chunks = sorted((ev.data["offset"], ev.data["data"]) for ev in events if ev.kind == "partial")
+                self.assertEqual("".join(c for _, c in chunks), out.assembled_context.system)
+                self.assertFalse(client._streams)
+
+                # With a preview limit only that prefix is streamed.
+                events = [ev async for ev in client.submit_stream("s3", inp, partial_chars=100)]
+                partials = [ev.data for ev in events if ev.kind == "partial"]
+                self.assertEqual("".join(p["data"] for p in partials), out.assembled_context.system[:100])
+                self.assertEqual({p["total"] for p in partials}, {len(out.assembled_context.system)})
+                self.assertEqual(events[-1].output.assembled_context.system, out.assembled_context.system)
+
+                # A plain submit asks for no events.
+                plain = await client.submit("s2", inp)
+                self.assertEqual(plain.assembled_context.system, out.assembled_context.system)
+            finally:
+                await client.stop()
+
+
+class TestEngineClientCancellation(unittest.IsolatedAsyncioTestCase):
+    def _client(self, ws: Workspace, timeout_s: float) -> EngineClient:
+        # One worker and 0.4 s per stage: a submit occupies the engine for 1.2 s.
+        cmd = [sys.executable, "-u", "-c", DUMMY_ENGINE, "--concurrency", "1", "--stage-delay-ms", "400"]
+        return EngineClient(cmd=cmd, workspace=ws, timeout_s=timeout_s)
+
+    async def test_cancel_frees_engine_for_queued_request(self) -> None:
+        with tempfile.TemporaryDirectory() as d:
+            ws = Workspace(repo_root=str(Path(d).resolve()), project_root=None)
+            client = self._client(ws, timeout_s=10.0)
+            try:
+                await client.start()
+                loop = asyncio.get_running_loop()
+                t0 = loop.time()
+                heavy = asyncio.create_task(client.submit("heavy", engine_input(ws, "heavy")))
+                queued = asyncio.create_task(client.submit("queued", engine_input(ws, "queued")))
+                await asyncio.sleep(0.2)
+                self.assertTrue(client.cancel("heavy"))
+                self.assertFalse(client.cancel("heavy"))
+
+                with self.assertRaises(EngineCancelledError):
+                    await heavy
+                out = await queued
+                self.assertEqual(out.provider_request.user, "queued")
+                # Without cancellation the queued request would finish after ~2.4 s.
+                self.assertLess(loop.time() - t0, 2.0)
+                self.assertEqual(client.in_flight, 0)
+            finally:
+                await client.stop()
+
+    async def test_timeout_cancels_engine_work(self) -> None:
+        with tempfile.TemporaryDirectory() as d:
+            ws = Workspace(repo_root=str(Path(d).resolve()), project_root=None)
+            client = self._client(ws, timeout_s=0.2)
+            try:
+                await client.start()
+                loop = asyncio.get_running_loop()
+                t0 = loop.time()
+                with self.assertRaises(RuntimeError):
+                    await client.submit("slow", engine_input(ws, "slow"))
+                client.timeout_s = 10.0
+                out = await client.submit("next", engine_input(ws, "next"))
+                self.assertEqual(out.provider_request.user, "next")
+                self.assertLess(loop.time() - t0, 2.0)
+            finally:
+                await client.stop()
@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+from atlas_tui.engine.context import FileIndex, assemble_repo_context
+
+
+def _write(root: Path, rel: str, text: str) -> None:
+    p = root / rel
+    p.parent.mkdir(parents=True, exist_ok=True)
+    p.write_text(text, encoding="utf-8")
+
+
+class TestRepoContextAssembly(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        self.root = Path(self._tmp.name)
+        _write(self.root, "README.md", "# demo\n")
+        _write(self.root, "src/app.py", "print('app')\n")
+        _write(self.root, "src/util.py", "x = 1\n" * 50)
+        _write(self.root, "secrets/key.txt", "do not send\n")
+        _write(self.root, "notes/pinned.md", "pinned notes\n")
+        _write(self.root, "node_modules/dep/index.js", "ignored\n")
+        self.index = FileIndex(str(self.root))
+
+    def _paths(self, ctx) -> list[str]:
+        return [f["path"] for f in ctx.files]
+
+    def test_pinned_first_then_ranked_and_exclusions_win(self) -> None:
+        ctx = assemble_repo_context(self.index, {
+            "context_profile": "repo",
+            "budget_chars": 100_000,
+            "pinned_paths": ["notes/pinned.md", "secrets/key.txt", "../outside.txt"],
+            "excluded_paths": ["secrets"],
+            "selected_path": "src/app.py",
+        })
+        paths = self._paths(ctx)
+        self.assertEqual(paths[:3], ["notes/pinned.md", "src/app.py", "src/util.py"])
+        self.assertIn("README.md", paths)
+        self.assertNotIn("secrets/key.txt", paths)
+        self.assertNotIn("node_modules/dep/index.js", paths)
+        self.assertEqual(ctx.excluded, ["secrets/key.txt"])
+        self.assertEqual(ctx.missing_pins, ["../outside.txt"])
+        self.assertNotIn("do not send", ctx.text)
+
+    def test_only_files_within_budget_are_stated(self) -> None:
+        for i in range(200):
+            _write(self.root, f"pkg/mod{i:03d}.py", "y = 2\n" * 20)
+        index = FileIndex(str(self.root))
+        stated: list[str] = []
+        real = index.entry
+
+        def counting(rel: str):
+            stated.append(rel)
+            return real(rel)
+
+        index.entry = counting  # type: ignore[method-assign]
+        ctx = assemble_repo_context(index, {"context_profile": "repo", "budget_chars": 2_000})
+        self.assertTrue(ctx.truncated)
+        # What was included, plus the one file that no longer fit.
+        self.assertEqual(len(stated), len(ctx.files) + 1)
+        self.assertLess(len(stated), 20)
+
+    def test_refresh_recent_polls_only_included_files(self) -> None:
+        ctx = assemble_repo_context(self.index, {"context_profile": "minimal", "budget_chars": 10_000, "pinned_paths": ["src/app.py"]})
+        self.assertEqual(self._paths(ctx), ["src/app.py"])
+        self.assertFalse(self.index.refresh_recent())
+        # A file that was never included is not polled...
+        _write(self.root, "src/util.py", "x = 2\n")
+        self.assertFalse(self.index.refresh_recent())
+        # ...an included one is.
+        p = self.root / "src/app.py"
+        p.write_text("print('changed')\n", encoding="utf-8")
+        st = p.stat()
+        os.utime(p, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+        self.assertTrue(self.index.refresh_recent())
+
+    def test_budget_is_never_exceeded_and_truncation_is_deterministic(self) -> None:
+        ui = {"context_profile": "repo", "budget_chars": 260, "pinned_paths": ["src/util.py"]}
+        first = assemble_repo_context(self.index, ui)
+        second = assemble_repo_context(FileIndex(str(self.root)), ui)
+        self.assertLessEqual(len(first.text), 260)
+        self.assertEqual(first.truncated, "src/util.py")
+        self.assertIn("[truncated at", first.text)
+        self.assertEqual(first.text, second.text)
+
+    def test_minimal_profile_uses_only_pins_and_selection(self) -> None:
+        ctx = assemble_repo_context(self.index, {
+            "context_profile": "minimal",
+            "budget_chars": 100_000,
+            "selected_path": "src/app.py",
+        })
+        self.assertEqual(self._paths(ctx), ["src/app.py"])
+
+    def test_refresh_detects_edits_to_used_files(self) -> None:
+        ui = {"context_profile": "minimal", "budget_chars": 10_000, "pinned_paths": ["src/app.py"]}
+        assemble_repo_context(self.index, ui)
+        self.assertFalse(self.index.refresh())
+
+        p = self.root / "src" / "app.py"
+        p.write_text("print('edited')\n", encoding="utf-8")
+        st = p.stat()
+        os.utime(p, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+        self.assertTrue(self.index.refresh())
+        self.assertIn("edited", assemble_repo_context(self.index, ui).text)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import asyncio
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+from atlas_tui.engine_client import EngineCancelledError, EngineDisconnectedError
+from atlas_tui.engine_pool import EnginePool
+from atlas_tui.models import Workspace
+
+from .helpers import engine_input
+
+
+# Answers with its own pid after a short delay. A "crash" message kills the
+# first process that sees it (a marker file records that it happened); a
+# "poison" message kills every process that sees it.
+ENGINE_STUB = r"""
+import json, os, sys, time
+marker = os.path.join(os.getcwd(), "crashed")
+print(json.dumps({"type": "event", "level": "info", "message": "stub started"}), flush=True)
+for raw in sys.stdin:
+    msg = json.loads(raw)
+    user = msg["payload"]["user_message"]
+    if user == "crash" and not os.path.exists(marker):
+        open(marker, "w").close()
+        os._exit(3)
+    if user == "poison":
+        os._exit(3)
+    time.sleep(0.1)
+    system = str(os.getpid())
+    out = {
+        "assembled_context": {"mode": "interpret", "system": system},
+        "provider_request": {"provider": "openai", "model": "m", "system": system, "user": user, "messages": []},
+        "diagnostics": {},
+    }
+    print(json.dumps({"type": "result", "id": msg["id"], "ok": True, "payload": out}), flush=True)
+"""
+
+
+class TestEnginePoolSmoke(unittest.IsolatedAsyncioTestCase):
+    async def test_least_loaded_dispatch(self) -> None:
+        with tempfile.TemporaryDirectory() as d:
+            ws = Workspace(repo_root=str(Path(d).resolve()), project_root=None)
+            pool = EnginePool(cmd=[sys.executable, "-u", "-c", ENGINE_STUB], workspace=ws, timeout_s=5.0, workers=2)
+            try:
+                await pool.start()
+                outs = await asyncio.gather(*(pool.submit(f"r{i}", engine_input(ws, f"m{i}")) for i in range(4)))
+                pids = [o.assembled_context.system for o in outs]
+                self.assertEqual(len(set(pids)), 2)
+                self.assertEqual(sorted(pids.count(p) for p in set(pids)), [2, 2])
+                self.assertEqual([s.completed for s in pool.stats()], [2, 2])
+                self.assertTrue(all(s.latency_ms is not None for s in pool.stats()))
+            finally:
+                await pool.stop()
+
+    async def test_crashed_worker_is_respawned_and_request_retried(self) -> None:
+        with tempfile.TemporaryDirectory() as d:
+            ws = Workspace(repo_root=str(Path(d).resolve()), project_root=None)
+            pool = EnginePool(cmd=[sys.executable, "-u", "-c", ENGINE_STUB], workspace=ws, timeout_s=5.0, workers=2)
+            try:
+                await pool.start()
+                out = await pool.submit("r-crash", engine_input(ws, "crash"))
+                self.assertEqual(out.provider_request.user, "crash")
+                for _ in range(50):
+                    if sum(s.respawns for s in pool.stats()) == 1:
+                        break
+                    await asyncio.sleep(0.05)
+                stats = pool.stats()
+                self.assertEqual(sum(s.failed for s in stats), 1)
+                self.assertEqual(sum(s.respawns for s in stats), 1)
+
+                outs = await asyncio.gather(*(pool.submit(f"r{i}", engine_input(ws, f"m{i}")) for i in range(2)))
+                self.assertEqual(len({o.assembled_context.system for o in outs}), 2)
+            finally:
+                await pool.stop()
+
+    async def test_poison_request_is_retried_once(self) -> None:
+        with tempfile.TemporaryDirectory() as d:
+            ws = Workspace(repo_root=str(Path(d).resolve()), project_root=None)
+            pool = EnginePool(cmd=[sys.executable, "-u", "-c", ENGINE_STUB], workspace=ws, timeout_s=5.0, workers=3)
+            try:
+                await pool.start()
+                with self.assertRaises(EngineDisconnectedError):
+                    await pool.submit("r-poison", engine_input(ws, "poison"))
+                self.assertEqual(sorted(s.failed for s in pool.stats()), [0, 1, 1])
+            finally:
+                await pool.stop()
+
+    async def test_cancel_while_waiting_for_respawn(self) -> None:
+        with tempfile.TemporaryDirectory() as d:
+            ws = Workspace(repo_root=str(Path(d).resolve()), project_root=None)
+            pool = EnginePool(cmd=[sys.executable, "-u", "-c", ENGINE_STUB], workspace=ws, timeout_s=5.0, workers=1)
+            try:
+                await pool.start()
+                worker = pool._workers[0]
+                restart = worker.restart
+
+                async def slow_restart() -> None:
+                    await asyncio.sleep(0.3)
+                    await restart()
+
+                worker.restart = slow_restart  # type: ignore[method-assign]
+                task = asyncio.create_task(pool.submit("r-crash", engine_input(ws, "crash")))
+                while pool.stats()[0].failed == 0:
+                    await asyncio.sleep(0.01)
+                # The only worker is respawning, so no worker owns the request.
+                self.assertTrue(pool.cancel("r-crash"))
+                with self.assertRaises(EngineCancelledError):
+                    await task
+                self.assertEqual(pool.stats()[0].completed, 0)
+                self.assertFalse(pool.cancel("r-crash"))
+            finally:
+                await pool.stop()
+
+    async def test_cancel_is_not_counted_as_failure(self) -> None:
+        with tempfile.TemporaryDirectory() as d:
+            ws = Workspace(repo_root=str(Path(d).resolve()), project_root=None)
+            pool = EnginePool(cmd=[sys.executable, "-u", "-c", ENGINE_STUB], workspace=ws, timeout_s=5.0, workers=1)
+            try:
+                await pool.start()
+                task = asyncio.create_task(pool.submit("r-cancel", engine_input(ws, "slow")))
+                await asyncio.sleep(0.02)
+                self.assertTrue(pool.cancel("r-cancel"))
+                with self.assertRaises(EngineCancelledError):
+                    await task
+                self.assertEqual([s.failed for s in pool.stats()], [0])
+            finally:
+                await pool.stop()
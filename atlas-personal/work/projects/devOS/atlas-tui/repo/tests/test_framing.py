@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+import asyncio
+import io
+import unittest
+
+from atlas_tui import framing
+
+
+class TestFraming(unittest.TestCase):
+    def test_roundtrip_each_supported_framing(self) -> None:
+        obj = {"type": "result", "id": "r1", "payload": {"system": "x" * 100_000 + "\u00e9"}}
+        for f in framing.supported_framings():
+            data = framing.encode(obj, f)
+            if f == framing.JSONL:
+                self.assertEqual(framing.decode(data.strip(), f), obj)
+            else:
+                self.assertEqual(framing.decode(framing.read_frame(io.BytesIO(data)), f), obj)
+
+    def test_read_frame_handles_eof_and_truncation(self) -> None:
+        data = framing.encode({"a": 1}, framing.LP_JSON)
+        self.assertIsNone(framing.read_frame(io.BytesIO(b"")))
+        self.assertIsNone(framing.read_frame(io.BytesIO(data[:-1])))
+        stream = io.BytesIO(data + data)
+        self.assertEqual(framing.read_frame(stream), framing.read_frame(stream))
+
+    def test_oversized_frame_rejected(self) -> None:
+        header = (framing.MAX_FRAME_BYTES + 1).to_bytes(4, "big")
+        with self.assertRaises(framing.FramingError):
+            framing.read_frame(io.BytesIO(header))
+
+    def test_choose_framing(self) -> None:
+        self.assertEqual(framing.choose_framing(["lp-json", "jsonl"], ["lp-msgpack", "lp-json"]), "lp-json")
+        self.assertEqual(framing.choose_framing(["lp-msgpack"], ["lp-json"]), "jsonl")
+        self.assertEqual(framing.choose_framing(None), "jsonl")
+
+    def test_async_reader(self) -> None:
+        async def run() -> list:
+            reader = asyncio.StreamReader()
+            reader.feed_data(framing.encode({"n": 1}, framing.LP_JSON) + framing.encode({"n": 2}, framing.LP_JSON)[:3])
+            reader.feed_eof()
+            return [await framing.read_frame_async(reader), await framing.read_frame_async(reader)]
+
+        first, second = asyncio.run(run())
+        self.assertEqual(framing.decode(first, framing.LP_JSON), {"n": 1})
+        self.assertIsNone(second)
@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import gzip
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from atlas_tui.log_archive import append_records, archive_path, history, index_path, is_archive_ref, load_index, read_record
+from atlas_tui.log_catalog import LogCatalog
+from atlas_tui.log_writer import LogWriter, log_base_dir, read_assembled_log
+from atlas_tui.models import EngineInput, Workspace
+
+from .helpers import engine_output
+
+
+def _record(i: int, day: str = "2024-01-01") -> tuple:
+    return (f"r{i:03d}", f"{day}T10:{i:02d}:00+00:00", {"request_id": f"r{i:03d}", "n": i})
+
+
+class TestSegments(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        self.base = Path(self._tmp.name)
+        self.seg = archive_path(self.base, "20240101", codec="gzip")
+
+    def test_records_are_read_by_frame_and_index_is_incremental(self) -> None:
+        refs = append_records(self.seg, [_record(i) for i in range(3)])
+        self.assertEqual(read_record(refs["r001"])["n"], 1)
+        append_records(self.seg, [_record(3)])
+        # The cached index picks up lines appended since the last read.
+        self.assertEqual(sorted(load_index(self.seg)), ["r000", "r001", "r002", "r003"])
+        self.assertEqual(read_record(f"{self.seg}#r003")["n"], 3)
+        # Frames concatenate into an ordinary multi-member gzip JSONL stream.
+        with gzip.open(self.seg, "rt", encoding="utf-8") as f:
+            self.assertEqual([json.loads(line)["n"] for line in f], [0, 1, 2, 3])
+
+    def test_torn_index_line_is_ignored_then_repaired(self) -> None:
+        append_records(self.seg, [_record(0)])
+        with index_path(self.seg).open("ab") as f:
+            f.write(b"r999\t12")
+        self.assertEqual(sorted(load_index(self.seg)), ["r000"])
+        append_records(self.seg, [_record(1)])
+        self.assertEqual(sorted(load_index(self.seg)), ["r000", "r001"])
+        self.assertEqual(read_record(f"{self.seg}#r001")["n"], 1)
+
+    def test_history_pages_newest_first_across_segments(self) -> None:
+        append_records(self.seg, [_record(i) for i in range(3)])
+        append_records(archive_path(self.base, "20240102", codec="gzip"), [_record(i, "2024-01-02") for i in range(2)])
+        page = history(self.base, limit=3)
+        self.assertEqual([rid for _ts, rid, _ref in page], ["r001", "r000", "r002"])
+        self.assertEqual([ts[:10] for ts, _rid, _ref in page], ["2024-01-02", "2024-01-02", "2024-01-01"])
+        rest = history(self.base, before=page[-1][0], limit=10)
+        self.assertEqual([rid for _ts, rid, _ref in rest], ["r001", "r000"])
+        self.assertEqual(read_record(rest[0][2])["n"], 1)
+
+
+class TestSegmentWriter(unittest.IsolatedAsyncioTestCase):
+    async def test_writer_appends_assembled_logs_to_segment(self) -> None:
+        with tempfile.TemporaryDirectory() as d:
+            ws = Workspace(repo_root=d, project_root=None)
+            out = engine_output("kernel")
+            writer = LogWriter(segments=True).start()
+            try:
+                paths = []
+                for i in range(3):
+                    inp = EngineInput(workspace=ws, mode="plan", provider="openai", model="m", user_message=f"msg {i}")
+                    path, written = await writer.write_assembled(ws, f"{i}" * 32, inp, out)
+                    self.assertEqual(written.result(timeout=5), path)
+                    paths.append(path)
+            finally:
+                writer.close()
+            self.assertIsNone(writer.last_error)
+            self.assertTrue(all(is_archive_ref(p) for p in paths))
+            self.assertFalse((log_base_dir(ws) / "assembled").exists())
+            self.assertEqual(read_assembled_log(paths[1])["user_message"], "msg 1")
+            cat = LogCatalog(log_base_dir(ws))
+            self.addCleanup(cat.close)
+            self.assertEqual(cat.get("2" * 32).log_path, str(paths[2]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import tempfile
+import unittest
+from pathlib import Path
+
+from atlas_tui.log_catalog import LogCatalog
+from atlas_tui.log_writer import LogWriter, log_base_dir
+from atlas_tui.models import EngineInput, Workspace
+
+from .helpers import engine_output
+
+
+class TestLogCatalog(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        self.ws = Workspace(repo_root=self._tmp.name, project_root=None)
+        writer = LogWriter(fsync="never").start()
+        for i, msg in enumerate(["refactor the parser", "explain the framing code", "parser error on startup"]):
+            inp = EngineInput(workspace=self.ws, mode="plan", provider="openai", model="m", user_message=msg)
+            _, written = await writer.write_assembled(self.ws, f"{i}" * 32, inp, engine_output("kernel", {"timings_ms": {"assemble": 1.0, "total": 2.5}}))
+            written.result(timeout=5)
+        writer.append_chat(self.ws, "s1", {"ts": "t1", "session_id": "s1", "line": "> parser question"})
+        writer.close()
+        self.assertIsNone(writer.last_error)
+
+    async def asyncTearDown(self) -> None:
+        self._tmp.cleanup()
+
+    def _catalog(self) -> LogCatalog:
+        # A fresh instance reads what the writer's process-wide catalog stored.
+        cat = LogCatalog(log_base_dir(self.ws))
+        self.addCleanup(cat.close)
+        return cat
+
+    async def test_writer_records_assembled_logs(self) -> None:
+        cat = self._catalog()
+        recent = cat.recent(10)
+        self.assertEqual(len(recent), 3)
+        entry = cat.get("11111111")
+        assert entry is not None
+        self.assertEqual(entry.request_id, "1" * 32)
+        self.assertEqual(entry.total_ms, 2.5)
+        self.assertEqual(len(entry.blobs), 1)
+        self.assertTrue(Path(entry.log_path).exists())
+
+    async def test_search_covers_user_messages_and_chat(self) -> None:
+        hits = self._catalog().search("parser")
+        self.assertEqual(sorted((h.kind, h.ref) for h in hits), [("chat", "s1"), ("user", "0" * 32), ("user", "2" * 32)])
+        self.assertEqual(self._catalog().search('"unbalanced'), [])
+
+    async def test_rebuild_matches_incremental_catalog(self) -> None:
+        cat = self._catalog()
+        before = [(e.request_id, e.blobs) for e in cat.recent(10)]
+        self.assertEqual(cat.rebuild(), (3, 1))
+        self.assertEqual([(e.request_id, e.blobs) for e in cat.recent(10)], before)
+        self.assertEqual(len(cat.search("parser")), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
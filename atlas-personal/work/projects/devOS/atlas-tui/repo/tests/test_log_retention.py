@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import gzip
+import os
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+from atlas_tui.blob_store import blob_store
+from atlas_tui.log_archive import is_archive_ref, list_archives
+from atlas_tui.log_catalog import LogCatalog, log_catalog
+from atlas_tui.log_retention import RetentionPolicy, apply_retention
+from atlas_tui.log_writer import log_base_dir, read_assembled_log, write_assembled_log
+from atlas_tui.models import EngineInput, Workspace
+from atlas_tui.state_store import write_latest_pointer
+from atlas_tui.web.server import _load_latest
+
+from .helpers import engine_output
+
+DAY = 86400.0
+
+
+class TestLogRetention(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        self.ws = Workspace(repo_root=self._tmp.name, project_root=None)
+        self.base = log_base_dir(self.ws)
+        self.now = time.time()
+        # Two logs three days old and one fresh one.
+        self.paths = [
+            self._write("20240101_100000", "a" * 32, "old system", age_days=3),
+            self._write("20240101_110000", "b" * 32, "old system", age_days=3),
+            self._write("20240104_090000", "c" * 32, "new system", age_days=0.01),
+        ]
+
+    def _write(self, stamp: str, request_id: str, system: str, age_days: float) -> Path:
+        inp = EngineInput(workspace=self.ws, mode="plan", provider="openai", model="m", user_message=f"msg {request_id[0]}")
+        path = self.base / "assembled" / f"{stamp}_{request_id}.json"
+        write_assembled_log(self.ws, request_id, inp, engine_output(system), path=path, catalog=log_catalog(self.base))
+        t = self.now - age_days * DAY
+        os.utime(path, (t, t))
+        return path
+
+    def _catalog(self) -> LogCatalog:
+        cat = LogCatalog(self.base)
+        self.addCleanup(cat.close)
+        return cat
+
+    def test_old_logs_are_compacted_and_stay_readable(self) -> None:
+        report = apply_retention(self.base, RetentionPolicy(max_age_days=None), now=self.now)
+        self.assertEqual(report.compacted, 2)
+        self.assertEqual([p.exists() for p in self.paths], [False, False, True])
+        self.assertEqual([p.name for p in list_archives(self.base)], ["assembled-20240101.jsonl.gz"])
+
+        entry = self._catalog().get("a" * 32)
+        assert entry is not None
+        self.assertTrue(is_archive_ref(entry.log_path))
+        self.assertEqual(read_assembled_log(entry.log_path)["provider_request"]["system"], "old system")
+        # The latest pointer names a compacted file for "b"; glass finds it via the catalog.
+        write_latest_pointer(self.ws.repo_root, None, str(self.paths[1]), "b" * 32)
+        data = _load_latest(self.ws)
+        assert data is not None
+        self.assertEqual(data["request_id"], "b" * 32)
+
+        # Archives are part of the source of truth for a rebuild.
+        self.assertEqual(self._catalog().rebuild(), (3, 0))
+        self.assertTrue(is_archive_ref(self._catalog().get("b" * 32).log_path))
+        # A second pass has nothing left to do.
+        self.assertFalse(apply_retention(self.base, RetentionPolicy(max_age_days=None), now=self.now).dirty)
+
+    def test_count_limit_compacts_beyond_newest(self) -> None:
+        policy = RetentionPolicy(max_age_days=None, max_loose_files=1, compact_after_days=30)
+        report = apply_retention(self.base, policy, now=self.now)
+        # The fresh log is both the newest and inside the in-flight window.
+        self.assertEqual(report.compacted, 2)
+        self.assertTrue(self.paths[2].exists())
+
+    def test_age_limit_deletes_archives_and_unreferenced_blobs(self) -> None:
+        apply_retention(self.base, RetentionPolicy(max_age_days=None), now=self.now)
+        policy = RetentionPolicy(max_age_days=1, blob_grace_s=0)
+        report = apply_retention(self.base, policy, now=self.now + 1)
+        self.assertEqual(len(report.deleted), 1)
+        self.assertEqual(list_archives(self.base), [])
+        self.assertEqual([e.request_id for e in self._catalog().recent(10)], ["c" * 32])
+        self.assertEqual(report.blobs_deleted, 1)
+        store = blob_store(self.base / "blobs")
+        self.assertEqual(read_assembled_log(self.paths[2])["provider_request"]["system"], "new system")
+        self.assertEqual(len(list(store.digests())), 1)
+
+    def test_gc_keeps_blobs_of_uncataloged_segment_records(self) -> None:
+        apply_retention(self.base, RetentionPolicy(max_age_days=None), now=self.now)
+        ref = self._catalog().get("a" * 32).log_path
+        # As if the catalog insert for the segment records had failed.
+        self._catalog().forget(list_archives(self.base))
+        report = apply_retention(self.base, RetentionPolicy(max_age_days=None, blob_grace_s=0), now=self.now + 1)
+        self.assertEqual(report.blobs_deleted, 0)
+        self.assertEqual(read_assembled_log(ref)["provider_request"]["system"], "old system")
+
+    def test_idle_chat_logs_are_gzipped_unless_open(self) -> None:
+        chat = self.base / "chat"
+        chat.mkdir(parents=True)
+        idle, open_ = chat / "s1.jsonl", chat / "s2.jsonl"
+        for p in (idle, open_):
+            p.write_text('{"ts": "t", "session_id": "s", "line": "> hi"}\n', encoding="utf-8")
+            t = self.now - 2 * DAY
+            os.utime(p, (t, t))
+        report = apply_retention(self.base, RetentionPolicy(max_age_days=None), now=self.now, skip_paths=[open_])
+        self.assertEqual(report.chat_compressed, 1)
+        self.assertFalse(idle.exists())
+        self.assertTrue(open_.exists())
+        with gzip.open(chat / "s1.jsonl.gz", "rt", encoding="utf-8") as f:
+            self.assertIn("> hi", f.read())
+        self.assertEqual(self._catalog().rebuild(), (3, 2))
+
+
+if __name__ == "__main__":
+    unittest.main()
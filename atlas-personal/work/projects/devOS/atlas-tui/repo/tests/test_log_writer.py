@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from atlas_tui.log_writer import LogWriter, chat_log_path, read_assembled_log
+from atlas_tui.models import EngineInput, Workspace
+from atlas_tui.state_store import latest_pointer_path
+
+from .helpers import engine_output
+
+
+class TestLogWriter(unittest.IsolatedAsyncioTestCase):
+    async def test_assembled_log_is_written_in_background(self) -> None:
+        with tempfile.TemporaryDirectory() as d:
+            ws = Workspace(repo_root=d, project_root=None)
+            inp = EngineInput(workspace=ws, mode="plan", provider="openai", model="m", user_message="hi")
+            writer = LogWriter().start()
+            try:
+                path, written = await writer.write_assembled(ws, "r1", inp, engine_output("system text"))
+                self.assertEqual(written.result(timeout=5), path)
+            finally:
+                writer.close()
+            self.assertEqual(read_assembled_log(path)["assembled_context"]["system"], "system text")
+            latest = json.loads(latest_pointer_path(d, None).read_text(encoding="utf-8"))
+            self.assertEqual(latest["last_log_path"], str(path))
+
+    async def test_close_flushes_chat_lines_in_order(self) -> None:
+        with tempfile.TemporaryDirectory() as d:
+            ws = Workspace(repo_root=d, project_root=None)
+            writer = LogWriter(fsync="never").start()
+            for i in range(50):
+                writer.append_chat(ws, "s1", {"line": f"l{i}"})
+            writer.close()
+            lines = chat_log_path(ws, "s1").read_text(encoding="utf-8").splitlines()
+            self.assertEqual([json.loads(x)["line"] for x in lines], [f"l{i}" for i in range(50)])
+            self.assertEqual(writer.last_error, None)
+
+    async def test_full_queue_drops_chat_lines_without_blocking(self) -> None:
+        with tempfile.TemporaryDirectory() as d:
+            ws = Workspace(repo_root=d, project_root=None)
+            writer = LogWriter(max_queue=1)  # not started: nothing drains
+            for i in range(3):
+                writer.append_chat(ws, "s1", {"line": i})
+            self.assertEqual(writer.dropped, 2)
+            self.assertFalse(Path(chat_log_path(ws, "s1")).exists())
+
+
+if __name__ == "__main__":
+    unittest.main()
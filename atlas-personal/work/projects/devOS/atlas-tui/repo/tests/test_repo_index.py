@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+from pathlib import Path
+
+from atlas_tui.repo_index import RepoIndex, index_path
+
+
+def _write(root: Path, rel: str, text: str) -> None:
+    p = root / rel
+    p.parent.mkdir(parents=True, exist_ok=True)
+    p.write_text(text, encoding="utf-8")
+
+
+def _touch_later(p: Path) -> None:
+    st = p.stat()
+    os.utime(p, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+
+class TestRepoIndexWalk(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        self.root = Path(self._tmp.name)
+        _write(self.root, ".gitignore", "*.log\nbuild/\n!keep.log\n/top.txt\n")
+        _write(self.root, "src/app.py", "print('app')\n")
+        _write(self.root, "src/debug.log", "noise\n")
+        _write(self.root, "src/keep.log", "kept\n")
+        _write(self.root, "build/out.py", "generated\n")
+        _write(self.root, "top.txt", "anchored\n")
+        _write(self.root, "docs/top.txt", "not anchored here\n")
+        _write(self.root, "docs/.gitignore", "draft.md\n")
+        _write(self.root, "docs/draft.md", "wip\n")
+        _write(self.root, "docs/guide.md", "# guide\n")
+
+    def test_respects_gitignore_rules(self) -> None:
+        idx = RepoIndex(str(self.root))
+        res = idx.update(use_git=False)
+        self.assertEqual(res.source, "walk")
+        self.assertEqual(
+            idx.paths(),
+            [".gitignore", "docs/.gitignore", "docs/guide.md", "docs/top.txt", "src/app.py", "src/keep.log"],
+        )
+        self.assertTrue(idx.is_dir("docs"))
+        self.assertNotIn("build", idx)
+        entry = idx.get("src/app.py")
+        assert entry is not None
+        self.assertEqual(entry.language, "python")
+        self.assertEqual(entry.tokens, 4)
+
+    def test_anchored_dir_pattern_ignores_only_top_level_dir(self) -> None:
+        _write(self.root, ".gitignore", "/build/\n")
+        _write(self.root, "src/build/keep.py", "source\n")
+        idx = RepoIndex(str(self.root))
+        idx.update(use_git=False)
+        self.assertNotIn("build/out.py", idx)
+        self.assertIn("src/build/keep.py", idx)
+
+    def test_matches_looks_up_literals_and_scans_only_glob_subtrees(self) -> None:
+        _write(self.root, "src-extra/app.py", "x\n")
+        idx = RepoIndex(str(self.root))
+        idx.update(use_git=False)
+        self.assertEqual(idx.paths("src"), ["src/app.py", "src/keep.log"])
+        self.assertTrue(idx.matches("src/app.py"))
+        self.assertTrue(idx.matches("docs/"))
+        self.assertFalse(idx.matches("src/missing.py"))
+        self.assertTrue(idx.matches("src/*.log"))
+        self.assertTrue(idx.matches("*.md"))
+        self.assertFalse(idx.matches("nope/*.py"))
+        self.assertFalse(idx.matches("src/*.md"))
+
+    def test_update_only_rehashes_changed_files(self) -> None:
+        idx = RepoIndex(str(self.root))
+        first = idx.update(use_git=False)
+        self.assertEqual(first.added, 6)
+
+        again = idx.update(use_git=False)
+        self.assertEqual((again.rehashed, again.added, again.changed, again.removed), (0, 0, 0, 0))
+        self.assertFalse(again.dirty)
+
+        p = self.root / "src" / "app.py"
+        p.write_text("print('edited')\n", encoding="utf-8")
+        _touch_later(p)
+        (self.root / "docs" / "guide.md").unlink()
+        _write(self.root, "src/new.py", "x = 1\n")
+        res = idx.update(use_git=False)
+        self.assertEqual((res.rehashed, res.added, res.changed, res.removed), (2, 1, 1, 1))
+        self.assertEqual(idx.generation, 2)
+
+    def test_persists_under_state_dir(self) -> None:
+        idx = RepoIndex.load(str(self.root), None)
+        idx.refresh(use_git=False)
+        self.assertEqual(idx.path, index_path(str(self.root), None))
+        self.assertTrue(idx.path.exists())  # type: ignore[union-attr]
+
+        reloaded = RepoIndex.load(str(self.root), None)
+        self.assertEqual(reloaded.paths(), idx.paths())
+        self.assertEqual(reloaded.update(use_git=False).rehashed, 0)
+
+        # Another process saving a newer index is picked up with one stat.
+        self.assertFalse(reloaded.reload_if_changed())
+        _write(self.root, "src/new.py", "n = 1\n")
+        idx.refresh(use_git=False)
+        _touch_later(idx.path)  # type: ignore[arg-type]
+        self.assertTrue(reloaded.reload_if_changed())
+        self.assertIn("src/new.py", reloaded)
+
+
+@unittest.skipUnless(shutil.which("git"), "git not available")
+class TestRepoIndexGit(unittest.TestCase):
+    def test_uses_git_ls_files(self) -> None:
+        with tempfile.TemporaryDirectory() as d:
+            root = Path(d)
+            subprocess.run(["git", "init", "-q", d], check=True)
+            _write(root, ".gitignore", "*.log\n")
+            _write(root, "tracked.py", "a = 1\n")
+            _write(root, "ignored.log", "noise\n")
+            _write(root, "untracked.md", "new\n")
+            subprocess.run(["git", "-C", d, "add", "tracked.py"], check=True)
+
+            idx = RepoIndex(d)
+            res = idx.update()
+            self.assertEqual(res.source, "git")
+            self.assertEqual(idx.paths(), [".gitignore", "tracked.py", "untracked.md"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+from atlas_tui.assets import atlas_docs_root
+from atlas_tui.engine_client import EngineClient
+from atlas_tui.models import EngineInput, Workspace
+from atlas_tui.result_cache import ResultCache, cache_key
+
+from .helpers import engine_input
+
+
+WS = Workspace(repo_root="/tmp/repo", project_root=None)
+
+
+def _input(msg: str, **ui_state) -> EngineInput:
+    return EngineInput(workspace=WS, mode="interpret", provider="openai", model="m", user_message=msg, ui_state=ui_state)
+
+
+class TestResultCache(unittest.TestCase):
+    def test_key_is_canonical_and_versioned(self) -> None:
+        a = _input("hi", selected_path="a", budget_chars=1)
+        b = EngineInput(**{**a.__dict__, "ui_state": {"budget_chars": 1, "selected_path": "a"}})
+        self.assertEqual(cache_key(a, "v1"), cache_key(b, "v1"))
+        self.assertNotEqual(cache_key(a, "v1"), cache_key(a, "v2"))
+        self.assertNotEqual(cache_key(a, "v1"), cache_key(_input("hi!", selected_path="a", budget_chars=1), "v1"))
+
+    def test_lru_entry_bound(self) -> None:
+        cache = ResultCache(max_entries=2)
+        cache.put("a", {"s": "1"})
+        cache.put("b", {"s": "2"})
+        self.assertIsNotNone(cache.get("a"))
+        cache.put("c", {"s": "3"})
+        self.assertIsNone(cache.get("b"))
+        self.assertIsNotNone(cache.get("a"))
+        self.assertEqual(len(cache), 2)
+        self.assertEqual((cache.hits, cache.misses), (2, 1))
+
+    def test_size_bound(self) -> None:
+        cache = ResultCache(max_entries=10, max_bytes=250)
+        for k in "abc":
+            cache.put(k, {"s": "x" * 100})
+        self.assertEqual(len(cache), 2)
+        self.assertLessEqual(cache.size_bytes, 250)
+        cache.put("huge", {"s": "x" * 1000})
+        self.assertIsNone(cache.get("huge"))
+
+
+# Announces context version v1; a "bump" submit reports changed inputs first.
+VERSION_STUB = r"""
+import json, sys
+def emit(o):
+    print(json.dumps(o), flush=True)
+emit({"type": "event", "message": "started", "context_version": "v1"})
+version = "v1"
+for raw in sys.stdin:
+    msg = json.loads(raw)
+    user = msg["payload"]["user_message"]
+    if user == "bump":
+        version = "v2"
+        emit({"type": "event", "kind": "context_changed", "context_version": version})
+    system = version + ":" + user
+    out = {
+        "assembled_context": {"mode": "interpret", "system": system},
+        "provider_request": {"provider": "openai", "model": "m", "system": system, "user": user, "messages": []},
+        "diagnostics": {"context_version": version},
+    }
+    emit({"type": "result", "id": msg["id"], "ok": True, "payload": out})
+"""
+
+
+class TestEngineClientResultCache(unittest.IsolatedAsyncioTestCase):
+    async def test_hits_and_invalidation(self) -> None:
+        with tempfile.TemporaryDirectory() as d:
+            ws = Workspace(repo_root=str(Path(d).resolve()), project_root=None)
+            cache = ResultCache()
+            client = EngineClient(cmd=[sys.executable, "-u", "-c", VERSION_STUB], workspace=ws, timeout_s=5.0, result_cache=cache)
+
+            def inp(msg: str) -> EngineInput:
+                return EngineInput(workspace=ws, mode="interpret", provider="openai", model="m", user_message=msg, ui_state={})
+
+            try:
+                await client.start()
+                while client.context_version is None:
+                    await asyncio.sleep(0.01)
+
+                first = await client.submit("r1", inp("hello"))
+                again = await client.submit("r2", inp("hello"))
+                self.assertFalse(first.diagnostics["result_cache"]["hit"])
+                self.assertTrue(again.diagnostics["result_cache"]["hit"])
+                self.assertEqual(again.assembled_context.system, "v1:hello")
+                self.assertNotIn("result_cache", cache.get(cache_key(inp("hello"), "v1")).get("diagnostics", {}))
+
+                await client.submit("r3", inp("bump"))
+                self.assertEqual(client.context_version, "v2")
+                self.assertEqual(len(cache), 0)
+
+                fresh = await client.submit("r4", inp("hello"))
+                self.assertFalse(fresh.diagnostics["result_cache"]["hit"])
+                self.assertEqual(fresh.assembled_context.system, "v2:hello")
+            finally:
+                await client.stop()
+
+
+# The dummy engine reading its documents from a copy the test can edit.
+DOCS_ENGINE = (
+    "import sys; from pathlib import Path; sys.path.insert(0, {src!r}); "
+    "from atlas_tui import dummy_engine; dummy_engine.atlas_docs_root = lambda: Path({root!r}); "
+    "raise SystemExit(dummy_engine.main(sys.argv[1:]))"
+)
+
+
+class TestDummyEngineResultCache(unittest.IsolatedAsyncioTestCase):
+    async def test_edited_document_clears_cache_without_a_submit(self) -> None:
+        with tempfile.TemporaryDirectory() as d:
+            root = Path(d) / "atlas"
+            shutil.copytree(str(atlas_docs_root()), root)
+            (Path(d) / "repo").mkdir()
+            ws = Workspace(repo_root=str(Path(d) / "repo"), project_root=None)
+            cache = ResultCache()
+            src = str(Path(__file__).resolve().parents[1] / "src")
+            cmd = [sys.executable, "-u", "-c", DOCS_ENGINE.format(src=src, root=str(root)), "--watch-interval-s", "0.05"]
+            client = EngineClient(cmd=cmd, workspace=ws, timeout_s=10.0, result_cache=cache)
+            inp = engine_input(ws, "hello", mode="plan")
+            try:
+                await client.start()
+                while client.context_version is None:
+                    await asyncio.sleep(0.01)
+                # The first submit for a repo indexes it, which bumps the version.
+                await client.submit("r0", inp)
+                await client.submit("r1", inp)
+                self.assertEqual(len(cache), 1)
+
+                version = client.context_version
+                kernel = root / "core" / "kernel.md"
+                kernel.write_text("edited kernel", encoding="utf-8")
+                st = kernel.stat()
+                os.utime(kernel, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+                for _ in range(200):
+                    if client.context_version != version:
+                        break
+                    await asyncio.sleep(0.02)
+                self.assertNotEqual(client.context_version, version)
+                self.assertEqual(len(cache), 0)
+
+                out = await client.submit("r2", inp)
+                self.assertFalse(out.diagnostics["result_cache"]["hit"])
+                self.assertIn("edited kernel", out.assembled_context.system)
+            finally:
+                await client.stop()
+
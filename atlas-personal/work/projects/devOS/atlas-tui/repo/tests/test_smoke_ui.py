@@ -105,3 +105,27 @@ class TestUISmoke(unittest.IsolatedAsyncioTestCase):
 
                 await pilot.press("f2")
                 self.assertEqual(app._focused_panel_name(), "chat", msg=_dump_app(app))
+
+    async def test_submissions_pipeline_up_to_limit(self) -> None:
+        ws, tmp = _make_temp_workspace()
+        # Engine that accepts submits but never answers keeps them in flight.
+        app = AtlasTUIApp(
+            workspace=ws,
+            engine_cmd=[sys.executable, "-c", "import sys\nfor _ in sys.stdin: pass"],
+            engine_cmd_str="(unused)",
+            max_inflight=2,
+        )
+
+        with tmp:
+            async with app.run_test(size=(120, 40)) as pilot:
+                await pilot.pause(0.05)
+                for text in ["one", "two", "three"]:
+                    app._set_textarea_text(app.composer, text)
+                    await app.action_submit()
+                    await pilot.pause(0.05)
+
+                self.assertEqual(len(app._inflight), 2, msg=_dump_app(app))
+                sent = [ln for ln in app._transcript_lines if ln.startswith("> [")]
+                self.assertEqual([ln.split("] ", 1)[1] for ln in sent], ["one", "two"])
+                self.assertEqual(len({ln[3:11] for ln in sent}), 2)
+                self.assertEqual(app._get_textarea_text(app.composer), "three")
@@ -0,0 +1,88 @@
+"""Micro-benchmark of airlock_text on multi-MB inputs against the per-character reference.
+
+Usage:
+
+python benchmarks/bench_airlock.py --mb 8
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import time
+from typing import List, Optional, Tuple
+
+from marcopolo.util import REPAIR_TABLE, airlock_text
+
+def airlock_reference(s: str, repair_common_punct: bool = False) -> Tuple[Optional[str], dict]:
+    non_ascii = [(i, ch) for i, ch in enumerate(s) if ord(ch) > 127]
+    if not non_ascii:
+        return s, {"ascii_ok": True, "repaired": False, "non_ascii": []}
+
+    if not repair_common_punct:
+        return None, {
+            "ascii_ok": False,
+            "repaired": False,
+            "non_ascii": [
+                {"pos": i, "char": ch, "codepoint": f"U+{ord(ch):04X}"}
+                for i, ch in non_ascii[:200]
+            ],
+        }
+
+    out_chars: List[str] = []
+    repairs: List[dict] = []
+    for i, ch in enumerate(s):
+        if ord(ch) <= 127:
+            out_chars.append(ch)
+            continue
+        repl = REPAIR_TABLE.get(ch)
+        if repl is None:
+            return None, {
+                "ascii_ok": False,
+                "repaired": False,
+                "non_ascii": [{"pos": i, "char": ch, "codepoint": f"U+{ord(ch):04X}"}],
+            }
+        out_chars.append(repl)
+        repairs.append({"pos": i, "from": f"U+{ord(ch):04X}", "to": repl})
+
+    return "".join(out_chars), {
+        "ascii_ok": True,
+        "repaired": True,
+        "repairs": repairs,
+        "non_ascii": [{"pos": i, "codepoint": f"U+{ord(ch):04X}"} for i, ch in non_ascii[:200]],
+    }
+
+def synth(n_chars: int, punct_every: int, seed: int = 0) -> str:
+    rnd = random.Random(seed)
+    base = "the operator notes a kernel boundary and a pipeline.\n"
+    s = (base * (n_chars // len(base) + 1))[:n_chars]
+    if not punct_every:
+        return s
+    chars = list(s)
+    keys = list(REPAIR_TABLE)
+    for i in range(0, n_chars, punct_every):
+        chars[i] = rnd.choice(keys)
+    return "".join(chars)
+
+def main() -> None:
+    p = argparse.ArgumentParser()
+    p.add_argument("--mb", type=float, default=8.0)
+    args = p.parse_args()
+    n = int(args.mb * 1024 * 1024)
+
+    cases = [
+        ("ascii", synth(n, 0), False),
+        ("strict-fail", synth(n, 997), False),
+        ("repair", synth(n, 997), True),
+    ]
+    for label, text, repair in cases:
+        row = [f"{label:>12}"]
+        outs = []
+        for fn in (airlock_reference, airlock_text):
+            t0 = time.perf_counter()
+            outs.append(fn(text, repair_common_punct=repair))
+            row.append(f"{fn.__name__}={1000 * (time.perf_counter() - t0):8.1f} ms")
+        row.append(f"identical={outs[0] == outs[1]}")
+        print("  ".join(row))
+
+if __name__ == "__main__":
+    main()
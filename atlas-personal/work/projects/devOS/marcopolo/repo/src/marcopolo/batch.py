@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+import json
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from .cache import TfidfCache
+from .pipeline import verify_pair
+
+@dataclass
+class Pair:
+    name: str
+    marco: str
+    polo: str
+
+_ROLE_RE = re.compile(r"^(marco|polo)(.*)$", re.IGNORECASE)
+_PAIR_EXTS = (".md", ".txt")
+
+def _unique(name: str, seen: Dict[str, int]) -> str:
+    n = seen.get(name, 0) + 1
+    seen[name] = n
+    return name if n == 1 else f"{name}-{n}"
+
+def discover_pairs(root: str) -> List[Pair]:
+    """Pair MARCO<suffix> with POLO<suffix> files in root (case-insensitive).
+
+    MARCO files without a POLO partner are skipped.
+    """
+    by_role: Dict[str, Dict[str, str]] = {"marco": {}, "polo": {}}
+    for fname in sorted(os.listdir(root)):
+        stem, ext = os.path.splitext(fname)
+        if ext.lower() not in _PAIR_EXTS:
+            continue
+        m = _ROLE_RE.match(stem)
+        if not m:
+            continue
+        by_role[m.group(1).lower()].setdefault(m.group(2).lower(), os.path.join(root, fname))
+
+    pairs: List[Pair] = []
+    seen: Dict[str, int] = {}
+    for suffix, marco in sorted(by_role["marco"].items(), key=lambda kv: kv[1]):
+        polo = by_role["polo"].get(suffix)
+        if polo is None:
+            continue
+        name = _unique(os.path.splitext(os.path.basename(marco))[0], seen)
+        pairs.append(Pair(name, marco, polo))
+    return pairs
+
+def load_manifest(path: str) -> List[Pair]:
+    """Read a JSONL manifest of {"marco", "polo", "name"?} objects.
+
+    Relative paths are resolved against the manifest's directory.
+    """
+    base = os.path.dirname(os.path.abspath(path))
+    pairs: List[Pair] = []
+    seen: Dict[str, int] = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for lineno, ln in enumerate(f, 1):
+            if not ln.strip():
+                continue
+            obj = json.loads(ln)
+            if "marco" not in obj or "polo" not in obj:
+                raise ValueError(f"{path}:{lineno}: manifest entry needs 'marco' and 'polo'")
+            marco = os.path.join(base, obj["marco"])
+            polo = os.path.join(base, obj["polo"])
+            name = obj.get("name") or os.path.splitext(os.path.basename(marco))[0]
+            # The name becomes a directory under out_root; keep it there.
+            if (
+                not isinstance(name, str)
+                or name in (".", "..")
+                or "/" in name
+                or "\\" in name
+                or (os.altsep and os.altsep in name)
+                or os.path.isabs(name)
+            ):
+                raise ValueError(f"{path}:{lineno}: manifest name must be a plain directory name, got {name!r}")
+            pairs.append(Pair(_unique(name, seen), marco, polo))
+    return pairs
+
+# Per-process state, set once by _init_worker so pooled workers reuse it.
+_WORKER: dict = {}
+
+def _init_worker(cfg: dict, repair_common_punct: bool, cache_dir: Optional[str], cache_max_entries: int) -> None:
+    _WORKER["cfg"] = cfg
+    _WORKER["repair"] = repair_common_punct
+    _WORKER["cache"] = TfidfCache(cache_dir, max_entries=cache_max_entries) if cache_dir else None
+
+def _verify_task(task: Tuple[str, str, str, str]) -> dict:
+    name, marco, polo, out_dir = task
+    rec = {"name": name, "marco": marco, "polo": polo, "out": out_dir}
+    t0 = time.perf_counter()
+    try:
+        code, report = verify_pair(
+            marco, polo, out_dir, _WORKER["cfg"],
+            repair_common_punct=_WORKER["repair"],
+            cache=_WORKER["cache"],
+        )
+    except Exception as e:
+        rec.update({"status": "error", "exit_code": 1, "error": f"{type(e).__name__}: {e}"})
+    else:
+        rec["exit_code"] = code
+        if report is None:
+            rec["status"] = "airlock_failed"
+        else:
+            rec.update({
+                "status": "ok",
+                "coverage": report["coverage"],
+                "confidence": report["confidence"],
+                "label": report["label"],
+                "unsupported_units": len(report["unsupported_units"]),
+                "ambiguous_units": len(report["ambiguous_units"]),
+            })
+    rec["elapsed_ms"] = round((time.perf_counter() - t0) * 1000.0, 3)
+    return rec
+
+def run_batch(
+    pairs: List[Pair],
+    out_root: str,
+    cfg: dict,
+    jobs: int = 1,
+    repair_common_punct: bool = False,
+    cache_dir: Optional[str] = None,
+    cache_max_entries: int = 8,
+) -> int:
+    """Verify pairs into out_root/<name>/ and write out_root/batch_summary.jsonl.
+
+    jobs > 1 uses a process pool whose workers are initialized once and reused
+    across pairs. Summary lines follow input order. Returns the worst exit code.
+    """
+    os.makedirs(out_root, exist_ok=True)
+    tasks = [(p.name, p.marco, p.polo, os.path.join(out_root, p.name)) for p in pairs]
+    initargs = (cfg, repair_common_punct, cache_dir, cache_max_entries)
+
+    if jobs <= 1 or len(tasks) <= 1:
+        _init_worker(*initargs)
+        results = [_verify_task(t) for t in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=min(jobs, len(tasks)), initializer=_init_worker, initargs=initargs) as ex:
+            results = list(ex.map(_verify_task, tasks))
+
+    with open(os.path.join(out_root, "batch_summary.jsonl"), "w", encoding="utf-8", newline="\n") as f:
+        for rec in results:
+            f.write(json.dumps(rec) + "\n")
+
+    return max((r["exit_code"] for r in results), default=0)
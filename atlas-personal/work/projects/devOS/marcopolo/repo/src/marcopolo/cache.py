@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import tempfile
+from typing import List, Optional, Tuple
+
+import numpy as np
+import scipy.sparse as sp
+import sklearn
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from .extract import Span
+
+# Bump when the vectorizer parameters in new_vectorizer() change.
+VECTORIZER_TAG = "tfidf:v1:lowercase=1:stop_words=english"
+
+def new_vectorizer() -> TfidfVectorizer:
+    return TfidfVectorizer(lowercase=True, stop_words="english")
+
+def marco_key(spans: List[Span]) -> str:
+    h = hashlib.sha256()
+    h.update(f"{VECTORIZER_TAG}:sklearn={sklearn.__version__}\n".encode("utf-8"))
+    for s in spans:
+        h.update(s.fingerprint.encode("ascii"))
+        h.update(b"\n")
+    return h.hexdigest()
+
+class TfidfCache:
+    """On-disk LRU of fitted span vectorizers, one .npz per MARCO key.
+
+    Each entry holds the vocabulary (terms ordered by column), the idf weights
+    and the CSR span matrix. Recency is the file mtime, refreshed on hit.
+    """
+
+    def __init__(self, root: str, max_entries: int = 8):
+        self.root = root
+        self.max_entries = max(1, int(max_entries))
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, f"{key}.npz")
+
+    def get(self, key: str) -> Optional[Tuple[TfidfVectorizer, sp.csr_matrix]]:
+        path = self._path(key)
+        try:
+            with np.load(path, allow_pickle=False) as z:
+                terms = z["terms"]
+                idf = z["idf"]
+                X = sp.csr_matrix((z["data"], z["indices"], z["indptr"]), shape=tuple(z["shape"]))
+        except (OSError, KeyError, ValueError):
+            self.misses += 1
+            return None
+        vec = new_vectorizer()
+        vec.vocabulary_ = {str(t): i for i, t in enumerate(terms)}
+        vec.idf_ = idf
+        try:
+            os.utime(path)
+        except OSError:
+            # Evicted by another worker since the load; the loaded copy is still good.
+            pass
+        self.hits += 1
+        return vec, X
+
+    def put(self, key: str, vec: TfidfVectorizer, X: sp.csr_matrix) -> None:
+        os.makedirs(self.root, exist_ok=True)
+        terms = np.empty(len(vec.vocabulary_), dtype=object)
+        for t, i in vec.vocabulary_.items():
+            terms[i] = t
+        X = X.tocsr()
+        fd, tmp = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez(
+                    f,
+                    terms=terms.astype(str),
+                    idf=np.asarray(vec.idf_),
+                    data=X.data,
+                    indices=X.indices,
+                    indptr=X.indptr,
+                    shape=np.asarray(X.shape),
+                )
+            os.replace(tmp, self._path(key))
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        self._evict()
+
+    def _evict(self) -> None:
+        entries = []
+        for name in os.listdir(self.root):
+            if name.endswith(".npz"):
+                p = os.path.join(self.root, name)
+                try:
+                    entries.append((os.path.getmtime(p), name, p))
+                except OSError:
+                    continue
+        entries.sort(reverse=True)
+        for _, _, p in entries[self.max_entries:]:
+            try:
+                os.remove(p)
+            except OSError:
+                pass
+
+def fit_spans(
+    spans: List[Span],
+    cache: Optional[TfidfCache] = None,
+) -> Tuple[TfidfVectorizer, sp.csr_matrix]:
+    key = marco_key(spans) if cache is not None else None
+    if cache is not None:
+        hit = cache.get(key)
+        if hit is not None:
+            return hit
+    vec = new_vectorizer()
+    X = vec.fit_transform([s.text for s in spans])
+    if cache is not None:
+        cache.put(key, vec, X)
+    return vec, X
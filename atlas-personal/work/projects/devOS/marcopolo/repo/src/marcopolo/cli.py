@@ -4,22 +4,31 @@ import argparse
 import json
 import os
 from pathlib import Path
+from typing import TYPE_CHECKING
 
 from .util import airlock_text
-from .extract import extract_marco_spans, extract_polo_units, write_spans_jsonl, write_units_jsonl
-from .match import match_units_to_spans, write_edges_jsonl
-from .verify import compute_report
-from .draft import draft_polo_from_marco
+
+# numpy/sklearn are pulled in by cache/match; subcommands import them on demand
+# so that `airlock` stays pure string work.
+if TYPE_CHECKING:
+    from .cache import TfidfCache
 
 def _load_cfg(cfg_path: str | None) -> dict:
     if cfg_path is None:
-        here = Path(__file__).resolve().parents[3]
+        here = Path(__file__).resolve().parents[2]
         default_path = here / "config" / "defaults.json"
         with open(default_path, "r", encoding="utf-8") as f:
             return json.load(f)
     with open(cfg_path, "r", encoding="utf-8") as f:
         return json.load(f)
 
+def _make_cache(args: argparse.Namespace) -> TfidfCache | None:
+    if not args.cache_dir:
+        return None
+    from .cache import TfidfCache
+
+    return TfidfCache(args.cache_dir, max_entries=args.cache_max_entries)
+
 def cmd_airlock(args: argparse.Namespace) -> int:
     out = {"files": {}}
     ok = True
@@ -37,64 +46,60 @@ def cmd_airlock(args: argparse.Namespace) -> int:
     return 0 if ok else 2
 
 def cmd_verify(args: argparse.Namespace) -> int:
-    cfg = _load_cfg(args.config)
+    from .pipeline import verify_pair
 
-    with open(args.marco, "r", encoding="utf-8") as f:
-        marco_raw = f.read()
-    with open(args.polo, "r", encoding="utf-8") as f:
-        polo_raw = f.read()
-
-    marco_txt, rep_m = airlock_text(marco_raw, repair_common_punct=args.repair_common_punct)
-    polo_txt, rep_p = airlock_text(polo_raw, repair_common_punct=args.repair_common_punct)
-    if marco_txt is None or polo_txt is None:
-        os.makedirs(args.out, exist_ok=True)
-        with open(os.path.join(args.out, "airlock_report.json"), "w", encoding="utf-8", newline="\n") as f:
-            f.write(json.dumps({"marco": rep_m, "polo": rep_p}, indent=2) + "\n")
-        return 2
-
-    spans = extract_marco_spans(marco_txt)
-    units = extract_polo_units(polo_txt)
-
-    edges, candidates = match_units_to_spans(
-        spans, units,
-        match_min=float(cfg.get("match_min", 0.22)),
-        top_k=5
+    cfg = _load_cfg(args.config)
+    code, _ = verify_pair(
+        args.marco, args.polo, args.out, cfg,
+        repair_common_punct=args.repair_common_punct,
+        cache=_make_cache(args),
+        incremental=args.incremental,
     )
+    return code
 
-    report_obj, report_md = compute_report(spans, units, edges, candidates, cfg)
-
-    os.makedirs(args.out, exist_ok=True)
-    write_spans_jsonl(spans, os.path.join(args.out, "marco_spans.jsonl"))
-    write_units_jsonl(units, os.path.join(args.out, "polo_units.jsonl"))
-    write_edges_jsonl(edges, os.path.join(args.out, "trace_edges.jsonl"))
-    with open(os.path.join(args.out, "verify_report.json"), "w", encoding="utf-8", newline="\n") as f:
-        f.write(json.dumps(report_obj, indent=2) + "\n")
-    with open(os.path.join(args.out, "verify_report.md"), "w", encoding="utf-8", newline="\n") as f:
-        f.write(report_md)
+def cmd_verify_batch(args: argparse.Namespace) -> int:
+    from .batch import discover_pairs, load_manifest, run_batch
 
-    return 0
+    cfg = _load_cfg(args.config)
+    if os.path.isdir(args.source):
+        pairs = discover_pairs(args.source)
+    else:
+        pairs = load_manifest(args.source)
+    return run_batch(
+        pairs, args.out, cfg,
+        jobs=args.jobs,
+        repair_common_punct=args.repair_common_punct,
+        cache_dir=args.cache_dir,
+        cache_max_entries=args.cache_max_entries,
+    )
 
 def cmd_draft(args: argparse.Namespace) -> int:
-    cfg = _load_cfg(args.config)
+    from .draft import draft_polo_from_marco
+    from .extract import extract_polo_units, write_spans_jsonl, write_units_jsonl
+    from .match import match_units_to_spans, write_candidates_jsonl, write_edges_jsonl
+    from .pipeline import load_marco_spans
+    from .verify import compute_report
 
-    with open(args.marco, "r", encoding="utf-8") as f:
-        marco_raw = f.read()
+    cfg = _load_cfg(args.config)
 
-    marco_txt, rep = airlock_text(marco_raw, repair_common_punct=args.repair_common_punct)
-    if marco_txt is None:
+    spans, rep = load_marco_spans(args.marco, repair_common_punct=args.repair_common_punct)
+    if spans is None:
         os.makedirs(args.out, exist_ok=True)
         with open(os.path.join(args.out, "airlock_report.json"), "w", encoding="utf-8", newline="\n") as f:
             f.write(json.dumps({"marco": rep}, indent=2) + "\n")
         return 2
 
-    spans = extract_marco_spans(marco_txt)
     polo_draft = draft_polo_from_marco(spans)
 
     units = extract_polo_units(polo_draft)
+    engine = str(cfg.get("match_engine", "sparse"))
     edges, candidates = match_units_to_spans(
         spans, units,
         match_min=float(cfg.get("match_min", 0.22)),
-        top_k=5
+        top_k=5,
+        engine=engine,
+        cache=_make_cache(args),
+        jobs=int(cfg.get("match_jobs", 1)),
     )
     report_obj, report_md = compute_report(spans, units, edges, candidates, cfg)
 
@@ -105,6 +110,7 @@ def cmd_draft(args: argparse.Namespace) -> int:
     write_spans_jsonl(spans, os.path.join(args.out, "marco_spans.jsonl"))
     write_units_jsonl(units, os.path.join(args.out, "polo_units.jsonl"))
     write_edges_jsonl(edges, os.path.join(args.out, "trace_edges.jsonl"))
+    write_candidates_jsonl(candidates, engine, os.path.join(args.out, "trace_candidates.jsonl"))
     with open(os.path.join(args.out, "verify_report.json"), "w", encoding="utf-8", newline="\n") as f:
         f.write(json.dumps(report_obj, indent=2) + "\n")
     with open(os.path.join(args.out, "verify_report.md"), "w", encoding="utf-8", newline="\n") as f:
@@ -127,13 +133,28 @@ def main() -> None:
     pv.add_argument("polo")
     pv.add_argument("--repair-common-punct", action="store_true")
     pv.add_argument("--config", default=None)
+    pv.add_argument("--cache-dir", default=None, help="Reuse fitted MARCO TF-IDF models across runs (dense and sparse match engines only)")
+    pv.add_argument("--cache-max-entries", type=int, default=8)
     pv.add_argument("--out", default="out")
+    pv.add_argument("--incremental", action="store_true", help="Rescore only units changed since the run in --out")
     pv.set_defaults(func=cmd_verify)
 
+    pb = sub.add_parser("verify-batch", help="Verify many MARCO/POLO pairs (manifest or directory) in a process pool")
+    pb.add_argument("source", help="Directory of MARCO*/POLO* files, or a JSONL manifest")
+    pb.add_argument("--jobs", type=int, default=os.cpu_count() or 1)
+    pb.add_argument("--repair-common-punct", action="store_true")
+    pb.add_argument("--config", default=None)
+    pb.add_argument("--cache-dir", default=None, help="Reuse fitted MARCO TF-IDF models across runs (dense and sparse match engines only)")
+    pb.add_argument("--cache-max-entries", type=int, default=8)
+    pb.add_argument("--out", default="out")
+    pb.set_defaults(func=cmd_verify_batch)
+
     pd = sub.add_parser("draft", help="Draft POLO from MARCO (conservative) + verify draft")
     pd.add_argument("marco")
     pd.add_argument("--repair-common-punct", action="store_true")
     pd.add_argument("--config", default=None)
+    pd.add_argument("--cache-dir", default=None, help="Reuse fitted MARCO TF-IDF models across runs (dense and sparse match engines only)")
+    pd.add_argument("--cache-max-entries", type=int, default=8)
     pd.add_argument("--out", default="out")
     pd.set_defaults(func=cmd_draft)
 
@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 import re
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
 
 from .extract import Span
 
@@ -17,23 +17,82 @@ TOPIC_RULES: List[Tuple[str, List[str]]] = [
 
 Q_MARKERS = ["?", "unclear", "needs decision", "what determines", "how do", "is there any way"]
 
-def _contains_any(s: str, needles: List[str]) -> bool:
-    s = s.lower()
-    return any(n in s for n in needles)
+_PROP_RE = re.compile(r"\b(readme|docs/|src/|\.md|\.py)\b")
+
+def _trie_pattern(words: List[str]) -> str:
+    # Alternation factored by common prefix, so each text position branches on
+    # one character instead of trying every keyword. Longer paths come first,
+    # so the match at a position is the longest keyword starting there.
+    trie: dict = {}
+    for w in words:
+        node = trie
+        for ch in w:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def emit(node: dict) -> str:
+        alts = [re.escape(ch) + emit(sub) for ch, sub in sorted(node.items()) if ch]
+        if not alts:
+            return ""
+        body = alts[0] if len(alts) == 1 else "(?:" + "|".join(alts) + ")"
+        if "" in node:
+            body = "(?:" + body + ")?"
+        return body
+
+    return emit(trie)
+
+class _SpanClassifier:
+    """Classifies a span against every TOPIC_RULES keyword and Q_MARKERS entry
+    with one compiled trie regex over the lowercased text.
+
+    Each search resumes one character after the previous match start, so
+    overlapping keywords are all seen. A match names the longest keyword at its
+    position; every keyword that is a prefix of it occurs there too.
+    """
+
+    def __init__(self, topic_rules: List[Tuple[str, List[str]]], q_markers: List[str]):
+        self.topic_of: Dict[str, int] = {}
+        for ti, (_, kws) in enumerate(topic_rules):
+            for kw in kws:
+                self.topic_of.setdefault(kw, ti)
+        self.markers = set(q_markers)
+        needles = sorted(set(self.topic_of) | self.markers)
+        self.implied = {n: [m for m in needles if n.startswith(m)] for n in needles}
+        self.rx = re.compile(_trie_pattern(needles))
+
+    def classify(self, text: str) -> Tuple[Optional[int], bool, bool]:
+        """Return (first matching topic index or None, has_question, has_doc_ref)."""
+        low = text.lower()
+        topic: Optional[int] = None
+        question = False
+        pos = 0
+        while True:
+            m = self.rx.search(low, pos)
+            if m is None:
+                break
+            for n in self.implied[m.group()]:
+                ti = self.topic_of.get(n)
+                if ti is not None and (topic is None or ti < topic):
+                    topic = ti
+                if n in self.markers:
+                    question = True
+            pos = m.start() + 1
+        return topic, question, _PROP_RE.search(low) is not None
+
+_CLASSIFIER = _SpanClassifier(TOPIC_RULES, Q_MARKERS)
 
 def draft_polo_from_marco(spans: List[Span]) -> str:
     buckets: Dict[str, List[Span]] = {title: [] for title, _ in TOPIC_RULES}
     misc: List[Span] = []
+    flags: Dict[str, Tuple[bool, bool]] = {}
 
     for sp in spans:
-        placed = False
-        for title, kws in TOPIC_RULES:
-            if _contains_any(sp.text, kws):
-                buckets[title].append(sp)
-                placed = True
-                break
-        if not placed:
+        topic, question, doc_ref = _CLASSIFIER.classify(sp.text)
+        flags[sp.id] = (question, doc_ref)
+        if topic is None:
             misc.append(sp)
+        else:
+            buckets[TOPIC_RULES[topic][0]].append(sp)
 
     out: List[str] = []
     thread_num = 0
@@ -44,11 +103,12 @@ def draft_polo_from_marco(spans: List[Span]) -> str:
         out.append(f"## Thread {thread_num}: {title}")
         out.append("")
         for sp in buckets[title]:
+            question, doc_ref = flags[sp.id]
             txt = sp.text.replace("\n", " ").strip()
             out.append(f"SRC: {txt} [trace:{sp.id}]")
-            if _contains_any(sp.text, Q_MARKERS):
+            if question:
                 out.append(f"OPEN: Clarify decision/question implied by: {sp.id} [trace:{sp.id}]")
-            if re.search(r"\b(readme|docs/|src/|\.md|\.py)\b", sp.text.lower()):
+            if doc_ref:
                 out.append(f"PROP: Consider routing this to an appropriate doc surface. [trace:{sp.id}]")
         out.append("")
 
@@ -57,9 +117,10 @@ def draft_polo_from_marco(spans: List[Span]) -> str:
         out.append(f"## Thread {thread_num}: Misc")
         out.append("")
         for sp in misc:
+            question, _ = flags[sp.id]
             txt = sp.text.replace("\n", " ").strip()
             out.append(f"SRC: {txt} [trace:{sp.id}]")
-            if _contains_any(sp.text, Q_MARKERS):
+            if question:
                 out.append(f"OPEN: Clarify decision/question implied by: {sp.id} [trace:{sp.id}]")
         out.append("")
 
@@ -3,7 +3,7 @@ from __future__ import annotations
 import json
 import re
 from dataclasses import dataclass
-from typing import List
+from typing import Iterable, Iterator, List, Union
 
 from .util import normalize_ascii, sha256_hex
 
@@ -21,71 +21,80 @@ class Span:
 _NUM_RE = re.compile(r"^\s*(\d+)[\.)]\s+")
 _BUL_RE = re.compile(r"^\s*[-*+]\s+")
 
-def extract_marco_spans(text: str) -> List[Span]:
-    text = normalize_ascii(text)
-    lines = text.split("\n")
-
-    spans: List[Span] = []
+def _split_lines(chunks: Iterable[Union[str, bytes]]) -> Iterator[str]:
+    # Yields exactly normalize_ascii(text).split("\n") for text = "".join(chunks),
+    # without holding more than one pending line.
+    buf = ""
+    for chunk in chunks:
+        if isinstance(chunk, (bytes, bytearray)):
+            chunk = chunk.decode("utf-8")
+        buf += chunk
+        if buf.endswith("\r"):
+            continue  # a following "\n" may complete "\r\n"
+        buf = buf.replace("\r\n", "\n").replace("\r", "\n")
+        parts = buf.split("\n")
+        buf = parts.pop()
+        for part in parts:
+            yield part.rstrip()
+    buf = buf.replace("\r\n", "\n").replace("\r", "\n")
+    for part in buf.split("\n"):
+        yield part.rstrip()
+
+def iter_marco_spans(chunks: Iterable[Union[str, bytes]]) -> Iterator[Span]:
+    """Yield MARCO spans from a stream of text chunks (file object lines, mmap
+    readline() bytes, or one whole string). Ids, ranges and fingerprints match
+    extract_marco_spans on the joined text.
+    """
+    n_spans = 0
     cur_lines: List[str] = []
     cur_kind: str | None = None
     cur_start: int | None = None
+    prev_len = 0
 
-    def flush(end_i: int) -> None:
-        nonlocal cur_lines, cur_kind, cur_start
+    def flush(end_i: int, end_len: int) -> Iterator[Span]:
+        nonlocal cur_lines, cur_kind, cur_start, n_spans
         if not cur_lines or cur_kind is None or cur_start is None:
             cur_lines, cur_kind, cur_start = [], None, None
             return
         span_text = "\n".join(cur_lines).strip()
         if span_text:
-            sid = f"m:{len(spans)+1:04d}"
-            spans.append(Span(
-                id=sid,
+            n_spans += 1
+            yield Span(
+                id=f"m:{n_spans:04d}",
                 kind=cur_kind,
                 line_start=cur_start+1,
                 line_end=end_i+1,
                 col_start=0,
-                col_end=len(lines[end_i]) if 0 <= end_i < len(lines) else 0,
+                col_end=end_len,
                 text=span_text,
                 fingerprint=sha256_hex(span_text),
-            ))
+            )
         cur_lines, cur_kind, cur_start = [], None, None
 
-    for i, ln in enumerate(lines):
+    i = -1
+    for i, ln in enumerate(_split_lines(chunks)):
         if ln.strip() == "":
             if cur_lines:
-                flush(i-1 if i > 0 else 0)
-            continue
-
-        is_num = bool(_NUM_RE.match(ln))
-        is_bul = bool(_BUL_RE.match(ln))
-
-        if is_num:
+                yield from flush(i-1, prev_len)
+        elif _NUM_RE.match(ln) or _BUL_RE.match(ln):
             if cur_lines:
-                flush(i-1)
-            cur_kind = "numbered_item"
+                yield from flush(i-1, prev_len)
+            cur_kind = "numbered_item" if _NUM_RE.match(ln) else "bullet"
             cur_start = i
             cur_lines = [ln]
-            continue
-
-        if is_bul:
-            if cur_lines:
-                flush(i-1)
-            cur_kind = "bullet"
-            cur_start = i
-            cur_lines = [ln]
-            continue
-
-        if not cur_lines:
+        elif not cur_lines:
             cur_kind = "block"
             cur_start = i
             cur_lines = [ln]
         else:
             cur_lines.append(ln)
+        prev_len = len(ln)
 
     if cur_lines:
-        flush(len(lines)-1)
+        yield from flush(i, prev_len)
 
-    return spans
+def extract_marco_spans(text: str) -> List[Span]:
+    return list(iter_marco_spans([text]))
 
 _THREAD_RE = re.compile(r"^\s*##\s+(.+?)\s*$")
 _TYPED_RE = re.compile(r"^\s*(SRC|OPEN|PROP)\s*:\s*(.*)$")
@@ -130,7 +139,7 @@ def extract_polo_units(text: str) -> List[Unit]:
 
     return units
 
-def write_spans_jsonl(spans: List[Span], path: str) -> None:
+def write_spans_jsonl(spans: Iterable[Span], path: str) -> None:
     with open(path, "w", encoding="utf-8", newline="\n") as f:
         for sp in spans:
             f.write(json.dumps({
@@ -1,13 +1,23 @@
 from __future__ import annotations
 
+import heapq
 import json
+import math
+import os
+import tempfile
+import warnings
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
-from typing import Dict, List, Tuple
+from typing import Dict, Iterable, List, Optional, Tuple
 
 import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
+from scipy.sparse import csr_matrix
+from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS
 from sklearn.metrics.pairwise import cosine_similarity
+from sklearn.preprocessing import normalize
 
+from .cache import TfidfCache, fit_spans
 from .extract import Span, Unit
 from .util import normalize_ascii
 
@@ -32,32 +42,198 @@ def _tokens(s: str) -> List[str]:
     cleaned = "".join([ch if ch.isalnum() else " " for ch in s])
     return [t for t in cleaned.split() if len(t) >= 3]
 
+def _dense_topk(Y, X, top_k: int) -> List[Tuple[np.ndarray, np.ndarray]]:
+    sims = cosine_similarity(Y, X)  # (units, spans)
+    out: List[Tuple[np.ndarray, np.ndarray]] = []
+    for row in sims:
+        idxs = np.argsort(-row, kind="stable")[:top_k]
+        out.append((idxs, row[idxs]))
+    return out
+
+def _row_topk(cols: np.ndarray, vals: np.ndarray, n_cols: int, top_k: int) -> Tuple[np.ndarray, np.ndarray]:
+    # Order is (score desc, span index asc), matching a stable argsort of the dense row.
+    keep = vals > 0.0
+    cols, vals = cols[keep], vals[keep]
+    if len(vals) > top_k:
+        part = np.argpartition(-vals, top_k - 1)[:top_k]
+        thr = vals[part].min()
+        sel = vals >= thr
+        cols, vals = cols[sel], vals[sel]
+    order = np.lexsort((cols, -vals))[:top_k]
+    cols, vals = cols[order], vals[order]
+    if len(cols) < top_k:
+        # Pad with zero-score spans in index order; nonzero columns are skipped.
+        need = min(top_k, n_cols) - len(cols)
+        pad: List[int] = []
+        taken = set(cols.tolist())
+        j = 0
+        while len(pad) < need:
+            if j not in taken:
+                pad.append(j)
+            j += 1
+        cols = np.concatenate([cols, np.asarray(pad, dtype=cols.dtype)])
+        vals = np.concatenate([vals, np.zeros(len(pad), dtype=vals.dtype)])
+    return cols, vals
+
+def _sparse_topk(Y, X, top_k: int, block_size: int = 1024) -> List[Tuple[np.ndarray, np.ndarray]]:
+    # Same normalization and products as cosine_similarity, but block by block on
+    # CSR rows so the (units, spans) matrix is never materialized densely.
+    Xt = normalize(X, copy=True).T.tocsr()
+    Yn = normalize(Y, copy=True)
+    return _topk_blocks(Yn, Xt, top_k, block_size)
+
+def _topk_blocks(Yn, Xt, top_k: int, block_size: int) -> List[Tuple[np.ndarray, np.ndarray]]:
+    n_cols = Xt.shape[1]
+    out: List[Tuple[np.ndarray, np.ndarray]] = []
+    for start in range(0, Yn.shape[0], block_size):
+        blk = (Yn[start:start + block_size] @ Xt).tocsr()
+        for r in range(blk.shape[0]):
+            lo, hi = blk.indptr[r], blk.indptr[r + 1]
+            out.append(_row_topk(blk.indices[lo:hi], blk.data[lo:hi], n_cols, top_k))
+    return out
+
+# Worker-side view of the span matrix, attached once per process by _attach_spans.
+_SHARED: dict = {}
+
+def _attach_spans(dirpath: str, shape: Tuple[int, int]) -> None:
+    parts = [np.load(os.path.join(dirpath, f"{k}.npy"), mmap_mode="r") for k in ("data", "indices", "indptr")]
+    _SHARED["Xt"] = csr_matrix(tuple(parts), shape=shape, copy=False)
+
+def _shard_topk(task: Tuple[object, int, int]) -> List[Tuple[np.ndarray, np.ndarray]]:
+    Yn, top_k, block_size = task
+    return _topk_blocks(Yn, _SHARED["Xt"], top_k, block_size)
+
+def _parallel_sparse_topk(
+    Y,
+    X,
+    top_k: int,
+    jobs: int,
+    block_size: int = 1024,
+) -> List[Tuple[np.ndarray, np.ndarray]]:
+    # The normalized span matrix is written once as memory-mapped .npy CSR
+    # components that every worker maps read-only; only unit shards are pickled.
+    # Shards are contiguous and results are concatenated in order, so output is
+    # identical to _sparse_topk.
+    Xt = normalize(X, copy=True).T.tocsr()
+    Yn = normalize(Y, copy=True)
+    n = Yn.shape[0]
+    step = max(1, -(-n // (jobs * 4)))
+    with tempfile.TemporaryDirectory(prefix="marcopolo-spans-") as d:
+        for k in ("data", "indices", "indptr"):
+            np.save(os.path.join(d, f"{k}.npy"), getattr(Xt, k))
+        tasks = [(Yn[a:a + step], top_k, block_size) for a in range(0, n, step)]
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_attach_spans, initargs=(d, Xt.shape)) as ex:
+            out: List[Tuple[np.ndarray, np.ndarray]] = []
+            for part in ex.map(_shard_topk, tasks):
+                out.extend(part)
+    return out
+
+TFIDF_ENGINES = {
+    "dense": _dense_topk,
+    "sparse": _sparse_topk,
+}
+
+ENGINES = ("dense", "sparse", "index")
+
+class InvertedIndex:
+    """Term -> postings index over span tokens with smoothed TF-IDF weights.
+
+    Tokens come from `_tokens` minus English stop words. Span and unit vectors
+    are L2-normalized, so scores are cosines in [0, 1] like the matrix engines,
+    but only spans sharing at least one term with the unit are ever touched.
+    """
+
+    def __init__(self, spans: List[Span]):
+        self.n_spans = len(spans)
+        counts = [Counter(_informative(sp.text)) for sp in spans]
+        df: Counter = Counter()
+        for c in counts:
+            df.update(c.keys())
+        n = self.n_spans
+        self.idf: Dict[str, float] = {t: math.log((1 + n) / (1 + d)) + 1.0 for t, d in df.items()}
+        self.postings: Dict[str, List[Tuple[int, float]]] = {}
+        for si, c in enumerate(counts):
+            w = {t: tf * self.idf[t] for t, tf in c.items()}
+            norm = math.sqrt(sum(v * v for v in w.values())) or 1.0
+            for t in sorted(w):
+                self.postings.setdefault(t, []).append((si, w[t] / norm))
+
+    def query(self, text: str, top_k: int) -> Tuple[List[int], List[float]]:
+        c = Counter(t for t in _informative(text) if t in self.idf)
+        w = {t: tf * self.idf[t] for t, tf in c.items()}
+        norm = math.sqrt(sum(v * v for v in w.values())) or 1.0
+
+        acc: Dict[int, float] = {}
+        for t in sorted(w):
+            qw = w[t] / norm
+            for si, sw in self.postings[t]:
+                acc[si] = acc.get(si, 0.0) + qw * sw
+
+        best = heapq.nsmallest(top_k, ((-v, si) for si, v in acc.items() if v > 0.0))
+        idxs = [si for _, si in best]
+        scores = [-v for v, _ in best]
+        j = 0
+        while len(idxs) < min(top_k, self.n_spans):
+            if j not in acc or acc[j] <= 0.0:
+                idxs.append(j)
+                scores.append(0.0)
+            j += 1
+        return idxs, scores
+
+def _informative(s: str) -> List[str]:
+    return [t for t in _tokens(s) if t not in ENGLISH_STOP_WORDS]
+
 def match_units_to_spans(
-    spans: List[Span],
+    spans: Iterable[Span],
     units: List[Unit],
     match_min: float = 0.22,
     top_k: int = 5,
+    engine: str = "sparse",
+    cache: Optional[TfidfCache] = None,
+    jobs: int = 1,
 ) -> Tuple[List[Edge], Dict[str, List[Tuple[str, float]]]]:
-    span_texts = [sp.text for sp in spans]
+    # Candidates index back into spans, so a lazy source is materialized once.
+    spans = spans if isinstance(spans, list) else list(spans)
     unit_texts = [u.text for u in units]
 
-    if not span_texts or not unit_texts:
+    if not spans or not unit_texts:
         return [], {}
+    if engine not in ENGINES:
+        raise ValueError(f"unknown match engine: {engine}")
 
-    vec = TfidfVectorizer(lowercase=True, stop_words="english")
-    X = vec.fit_transform(span_texts)
-    Y = vec.transform(unit_texts)
+    if engine == "index":
+        if cache is not None:
+            warnings.warn("the index match engine fits no TF-IDF model; the cache is not used", stacklevel=2)
+        index = InvertedIndex(spans)
+        topk = [index.query(t, top_k) for t in unit_texts]
+    else:
+        vec, X = fit_spans(spans, cache)
+        Y = vec.transform(unit_texts)
+        if engine == "sparse" and jobs > 1:
+            topk = _parallel_sparse_topk(Y, X, top_k, jobs)
+        else:
+            topk = TFIDF_ENGINES[engine](Y, X, top_k)
 
-    sims = cosine_similarity(Y, X)  # (units, spans)
+    candidates: Dict[str, List[Tuple[str, float]]] = {}
+    for ui, u in enumerate(units):
+        idxs, scores = topk[ui]
+        candidates[u.id] = [(spans[int(i)].id, float(v)) for i, v in zip(idxs, scores)]
+
+    return edges_from_candidates(spans, units, candidates, match_min), candidates
 
+def edges_from_candidates(
+    spans: List[Span],
+    units: List[Unit],
+    candidates: Dict[str, List[Tuple[str, float]]],
+    match_min: float = 0.22,
+) -> List[Edge]:
+    span_by_id = {sp.id: sp for sp in spans}
     edges: List[Edge] = []
-    candidates: Dict[str, List[Tuple[str, float]]] = {}
 
-    for ui, u in enumerate(units):
-        row = sims[ui]
-        idxs = np.argsort(-row)[:top_k]
-        cand = [(spans[i].id, float(row[i])) for i in idxs]
-        candidates[u.id] = cand
+    for u in units:
+        cand = candidates.get(u.id)
+        if not cand:
+            continue
 
         best_id, best_score = cand[0]
         if best_score < match_min:
@@ -66,7 +242,7 @@ def match_units_to_spans(
         rel = REL_BY_KIND.get(u.kind, "mentions")
 
         ut = set(_tokens(u.text))
-        st = set(_tokens(spans[int(idxs[0])].text))
+        st = set(_tokens(span_by_id[best_id].text))
         shared = sorted(list(ut.intersection(st)))[:6]
         rationale = "shared:" + (",".join(shared) if shared else "(none)")
 
@@ -79,7 +255,7 @@ def match_units_to_spans(
             rationale=rationale,
         ))
 
-    return edges, candidates
+    return edges
 
 def write_edges_jsonl(edges: List[Edge], path: str) -> None:
     with open(path, "w", encoding="utf-8", newline="\n") as f:
@@ -92,3 +268,16 @@ def write_edges_jsonl(edges: List[Edge], path: str) -> None:
                 "features": e.features,
                 "rationale": e.rationale,
             }) + "\n")
+
+def write_candidates_jsonl(
+    candidates: Dict[str, List[Tuple[str, float]]],
+    engine: str,
+    path: str,
+) -> None:
+    with open(path, "w", encoding="utf-8", newline="\n") as f:
+        for polo_id, cand in candidates.items():
+            f.write(json.dumps({
+                "polo_id": polo_id,
+                "engine": engine,
+                "candidates": [[marco_id, score] for marco_id, score in cand],
+            }) + "\n")
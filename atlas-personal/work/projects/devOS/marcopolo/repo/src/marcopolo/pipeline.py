@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+import json
+import os
+from typing import Dict, List, Optional, Tuple
+
+from .cache import TfidfCache
+from .extract import Span, Unit, extract_polo_units, iter_marco_spans, write_spans_jsonl, write_units_jsonl
+from .match import edges_from_candidates, match_units_to_spans, write_candidates_jsonl, write_edges_jsonl
+from .util import airlock_lines, airlock_text, repair_punct
+from .verify import compute_report
+
+def _write_json(path: str, obj: dict) -> None:
+    with open(path, "w", encoding="utf-8", newline="\n") as f:
+        f.write(json.dumps(obj, indent=2) + "\n")
+
+def load_marco_spans(path: str, repair_common_punct: bool = False) -> Tuple[Optional[List[Span]], dict]:
+    """Airlock and segment a MARCO file line by line (two passes, bounded memory).
+
+    Returns (None, report) when admission fails; the report matches airlock_text
+    on the whole file.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        rep = airlock_lines(f, repair_common_punct=repair_common_punct)
+    if not rep["ascii_ok"]:
+        return None, rep
+    with open(path, "r", encoding="utf-8") as f:
+        lines = (repair_punct(ln) for ln in f) if rep["repaired"] else f
+        return list(iter_marco_spans(lines)), rep
+
+def _read_jsonl(path: str) -> List[dict]:
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(ln) for ln in f if ln.strip()]
+
+def previous_candidates(
+    out_dir: str,
+    spans: List[Span],
+    engine: str,
+    top_k: int,
+) -> Dict[str, List[Tuple[str, float]]]:
+    """Candidates from a previous run in out_dir, keyed by unit fingerprint.
+
+    Empty unless that run saw the same ordered MARCO span fingerprints and used
+    the same engine and top_k; only then are its scores still exact.
+    """
+    try:
+        prev_spans = _read_jsonl(os.path.join(out_dir, "marco_spans.jsonl"))
+        prev_units = _read_jsonl(os.path.join(out_dir, "polo_units.jsonl"))
+        prev_cands = _read_jsonl(os.path.join(out_dir, "trace_candidates.jsonl"))
+    except (OSError, ValueError):
+        return {}
+    # Malformed artifacts (missing keys, wrong shapes) just mean a full run.
+    try:
+        if [o["fingerprint"] for o in prev_spans] != [sp.fingerprint for sp in spans]:
+            return {}
+
+        fp_by_id = {o["id"]: o["fingerprint"] for o in prev_units}
+        want = min(top_k, len(spans))
+        out: Dict[str, List[Tuple[str, float]]] = {}
+        for o in prev_cands:
+            fp = fp_by_id.get(o["polo_id"])
+            if fp is None or o.get("engine") != engine or len(o["candidates"]) != want:
+                continue
+            out[fp] = [(marco_id, float(score)) for marco_id, score in o["candidates"]]
+    except (KeyError, TypeError, ValueError):
+        return {}
+    return out
+
+def _match_incremental(
+    spans: List[Span],
+    units: List[Unit],
+    out_dir: str,
+    match_min: float,
+    top_k: int,
+    engine: str,
+    cache: Optional[TfidfCache],
+    jobs: int = 1,
+) -> Tuple[list, Dict[str, List[Tuple[str, float]]]]:
+    """Rescore only units whose fingerprint has no reusable previous candidates.
+
+    Returns (edges, candidates).
+    """
+    prev = previous_candidates(out_dir, spans, engine, top_k)
+    todo = [u for u in units if u.fingerprint not in prev]
+    _, fresh = match_units_to_spans(
+        spans, todo, match_min=match_min, top_k=top_k, engine=engine, cache=cache, jobs=jobs,
+    )
+    candidates: Dict[str, List[Tuple[str, float]]] = {}
+    for u in units:
+        cand = fresh.get(u.id) or prev.get(u.fingerprint)
+        if cand is not None:
+            candidates[u.id] = cand
+    return edges_from_candidates(spans, units, candidates, match_min), candidates
+
+def verify_pair(
+    marco_path: str,
+    polo_path: str,
+    out_dir: str,
+    cfg: dict,
+    repair_common_punct: bool = False,
+    cache: Optional[TfidfCache] = None,
+    incremental: bool = False,
+) -> Tuple[int, Optional[dict]]:
+    """Verify one MARCO/POLO pair into out_dir. Returns (exit_code, report_obj).
+
+    With incremental=True, candidates from a previous run in out_dir are reused
+    for unchanged units; the written artifacts match a full run.
+    """
+    spans, rep_m = load_marco_spans(marco_path, repair_common_punct=repair_common_punct)
+    with open(polo_path, "r", encoding="utf-8") as f:
+        polo_raw = f.read()
+
+    polo_txt, rep_p = airlock_text(polo_raw, repair_common_punct=repair_common_punct)
+    if spans is None or polo_txt is None:
+        os.makedirs(out_dir, exist_ok=True)
+        _write_json(os.path.join(out_dir, "airlock_report.json"), {"marco": rep_m, "polo": rep_p})
+        return 2, None
+
+    units = extract_polo_units(polo_txt)
+
+    match_min = float(cfg.get("match_min", 0.22))
+    engine = str(cfg.get("match_engine", "sparse"))
+    jobs = int(cfg.get("match_jobs", 1))
+    if incremental:
+        edges, candidates = _match_incremental(
+            spans, units, out_dir, match_min, 5, engine, cache, jobs,
+        )
+    else:
+        edges, candidates = match_units_to_spans(
+            spans, units,
+            match_min=match_min,
+            top_k=5,
+            engine=engine,
+            cache=cache,
+            jobs=jobs,
+        )
+
+    report_obj, report_md = compute_report(spans, units, edges, candidates, cfg)
+
+    os.makedirs(out_dir, exist_ok=True)
+    # Always rewritten: equal fingerprints can still sit at shifted line ranges.
+    write_spans_jsonl(spans, os.path.join(out_dir, "marco_spans.jsonl"))
+    write_units_jsonl(units, os.path.join(out_dir, "polo_units.jsonl"))
+    write_edges_jsonl(edges, os.path.join(out_dir, "trace_edges.jsonl"))
+    write_candidates_jsonl(candidates, engine, os.path.join(out_dir, "trace_candidates.jsonl"))
+    _write_json(os.path.join(out_dir, "verify_report.json"), report_obj)
+    with open(os.path.join(out_dir, "verify_report.md"), "w", encoding="utf-8", newline="\n") as f:
+        f.write(report_md)
+
+    return 0, report_obj
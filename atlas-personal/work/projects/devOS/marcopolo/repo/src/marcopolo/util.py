@@ -1,5 +1,7 @@
 import hashlib
-from typing import Dict, List, Optional, Tuple
+import re
+from itertools import islice
+from typing import Dict, Iterable, List, Optional, Tuple
 
 REPAIR_TABLE: Dict[str, str] = {
     "\u2018": "'",
@@ -19,9 +21,18 @@ def normalize_ascii(s: str) -> str:
     s = "\n".join([ln.rstrip() for ln in s.split("\n")])
     return s
 
+_NON_ASCII_RE = re.compile(r"[^\x00-\x7f]")
+_UNREPAIRABLE_RE = re.compile("[^\\x00-\\x7f" + "".join(map(re.escape, REPAIR_TABLE)) + "]")
+
+def repair_punct(s: str) -> str:
+    # One C-level replace per table entry beats str.translate, which falls back
+    # to a per-character loop when a mapping is longer than one character.
+    for ch, repl in REPAIR_TABLE.items():
+        s = s.replace(ch, repl)
+    return s
+
 def airlock_text(s: str, repair_common_punct: bool = False) -> Tuple[Optional[str], dict]:
-    non_ascii = [(i, ch) for i, ch in enumerate(s) if ord(ch) > 127]
-    if not non_ascii:
+    if s.isascii():
         return s, {"ascii_ok": True, "repaired": False, "non_ascii": []}
 
     if not repair_common_punct:
@@ -29,30 +40,53 @@ def airlock_text(s: str, repair_common_punct: bool = False) -> Tuple[Optional[st
             "ascii_ok": False,
             "repaired": False,
             "non_ascii": [
-                {"pos": i, "char": ch, "codepoint": f"U+{ord(ch):04X}"}
-                for i, ch in non_ascii[:200]
+                {"pos": m.start(), "char": m.group(), "codepoint": f"U+{ord(m.group()):04X}"}
+                for m in islice(_NON_ASCII_RE.finditer(s), 200)
             ],
         }
 
-    out_chars: List[str] = []
-    repairs: List[dict] = []
-    for i, ch in enumerate(s):
-        if ord(ch) <= 127:
-            out_chars.append(ch)
-            continue
-        repl = REPAIR_TABLE.get(ch)
-        if repl is None:
-            return None, {
-                "ascii_ok": False,
-                "repaired": False,
-                "non_ascii": [{"pos": i, "char": ch, "codepoint": f"U+{ord(ch):04X}"}],
-            }
-        out_chars.append(repl)
-        repairs.append({"pos": i, "from": f"U+{ord(ch):04X}", "to": repl})
-
-    return "".join(out_chars), {
+    bad = _UNREPAIRABLE_RE.search(s)
+    if bad is not None:
+        ch = bad.group()
+        return None, {
+            "ascii_ok": False,
+            "repaired": False,
+            "non_ascii": [{"pos": bad.start(), "char": ch, "codepoint": f"U+{ord(ch):04X}"}],
+        }
+
+    hits = [(m.start(), m.group()) for m in _NON_ASCII_RE.finditer(s)]
+    return repair_punct(s), {
         "ascii_ok": True,
         "repaired": True,
-        "repairs": repairs,
-        "non_ascii": [{"pos": i, "codepoint": f"U+{ord(ch):04X}"} for i, ch in non_ascii[:200]],
+        "repairs": [{"pos": i, "from": f"U+{ord(ch):04X}", "to": REPAIR_TABLE[ch]} for i, ch in hits],
+        "non_ascii": [{"pos": i, "codepoint": f"U+{ord(ch):04X}"} for i, ch in hits[:200]],
     }
+
+def airlock_lines(lines: Iterable[str], repair_common_punct: bool = False) -> dict:
+    """airlock_text report for text supplied as consecutive lines (e.g. a file
+    object), without joining them. Positions are offsets into the joined text.
+    Callers repair each line with repair_punct when the report says repaired.
+    """
+    offset = 0
+    seen = False
+    non_ascii: List[dict] = []
+    repairs: List[dict] = []
+    for ln in lines:
+        if not ln.isascii():
+            seen = True
+            fixed, rep = airlock_text(ln, repair_common_punct=repair_common_punct)
+            if fixed is None and repair_common_punct:
+                e = rep["non_ascii"][0]
+                return {"ascii_ok": False, "repaired": False, "non_ascii": [{**e, "pos": e["pos"] + offset}]}
+            non_ascii.extend({**e, "pos": e["pos"] + offset} for e in rep["non_ascii"][:200 - len(non_ascii)])
+            if repair_common_punct:
+                repairs.extend({**e, "pos": e["pos"] + offset} for e in rep["repairs"])
+            elif len(non_ascii) >= 200:
+                break
+        offset += len(ln)
+
+    if not seen:
+        return {"ascii_ok": True, "repaired": False, "non_ascii": []}
+    if not repair_common_punct:
+        return {"ascii_ok": False, "repaired": False, "non_ascii": non_ascii}
+    return {"ascii_ok": True, "repaired": True, "repairs": repairs, "non_ascii": non_ascii}
@@ -1,9 +1,11 @@
 from __future__ import annotations
 
-from typing import Dict, List, Tuple
+from typing import TYPE_CHECKING, Dict, List, Tuple
 
 from .extract import Span, Unit
-from .match import Edge
+
+if TYPE_CHECKING:
+    from .match import Edge
 
 def _label_for(conf: float, bands: List[dict]) -> str:
     for b in bands:
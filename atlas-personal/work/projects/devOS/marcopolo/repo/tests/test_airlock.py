@@ -10,3 +10,32 @@ def test_airlock_repair_punct():
     assert s == "hi--there"
     assert rep["ascii_ok"] is True
     assert rep["repaired"] is True
+
+def test_airlock_strict_report_caps_at_200():
+    s = "a\u2019" * 250
+    fixed, rep = airlock_text(s, repair_common_punct=False)
+    assert fixed is None
+    assert len(rep["non_ascii"]) == 200
+    assert rep["non_ascii"][0] == {"pos": 1, "char": "\u2019", "codepoint": "U+2019"}
+    assert rep["non_ascii"][-1]["pos"] == 399
+
+def test_airlock_repair_reports_every_position():
+    s = "\u201cq\u201d \u00a0x\u2013" * 100
+    fixed, rep = airlock_text(s, repair_common_punct=True)
+    assert fixed == '"q"  x--' * 100
+    assert len(rep["repairs"]) == 400
+    assert rep["repairs"][:2] == [
+        {"pos": 0, "from": "U+201C", "to": '"'},
+        {"pos": 2, "from": "U+201D", "to": '"'},
+    ]
+    assert len(rep["non_ascii"]) == 200
+    assert rep["non_ascii"][3] == {"pos": 6, "codepoint": "U+2013"}
+
+def test_airlock_repair_fails_on_first_unrepairable():
+    fixed, rep = airlock_text("ok\u2014then \u00e9 and \u00fc", repair_common_punct=True)
+    assert fixed is None
+    assert rep == {
+        "ascii_ok": False,
+        "repaired": False,
+        "non_ascii": [{"pos": 8, "char": "\u00e9", "codepoint": "U+00E9"}],
+    }
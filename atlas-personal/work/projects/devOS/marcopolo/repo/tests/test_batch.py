@@ -0,0 +1,49 @@
+import json
+
+import pytest
+
+from marcopolo.batch import discover_pairs, load_manifest, run_batch
+
+MARCO = "1. kernel output format\n2. fork upstream observability\n"
+POLO = "## Thread 1: t\nSRC: kernel output format\nOPEN: fork upstream?\n"
+
+def _write(path, text):
+    path.write_text(text, encoding="utf-8")
+    return str(path)
+
+def test_discover_pairs_matches_suffixes(tmp_path):
+    for name in ("MARCO_001.md", "POLO_001.md", "marco.md", "polo.md", "MARCO_002.md", "notes.md"):
+        _write(tmp_path / name, MARCO)
+    pairs = discover_pairs(str(tmp_path))
+    assert [(p.name, p.polo.rsplit("/", 1)[-1]) for p in pairs] == [
+        ("MARCO_001", "POLO_001.md"),
+        ("marco", "polo.md"),
+    ]
+
+def test_run_batch_writes_per_pair_outputs_and_summary(tmp_path):
+    src = tmp_path / "in"
+    src.mkdir()
+    _write(src / "m1.md", MARCO)
+    _write(src / "p1.md", POLO)
+    _write(src / "bad.md", "caf\u00e9\n")
+    manifest = _write(src / "manifest.jsonl", "\n".join([
+        json.dumps({"name": "one", "marco": "m1.md", "polo": "p1.md"}),
+        json.dumps({"name": "two", "marco": "m1.md", "polo": "bad.md"}),
+        json.dumps({"name": "three", "marco": "m1.md", "polo": "missing.md"}),
+    ]) + "\n")
+
+    out = tmp_path / "out"
+    code = run_batch(load_manifest(manifest), str(out), {}, jobs=2)
+
+    summary = [json.loads(ln) for ln in (out / "batch_summary.jsonl").read_text().splitlines()]
+    assert [r["name"] for r in summary] == ["one", "two", "three"]
+    assert [r["status"] for r in summary] == ["ok", "airlock_failed", "error"]
+    assert (out / "one" / "verify_report.json").exists()
+    assert (out / "two" / "airlock_report.json").exists()
+    assert code == 2
+
+@pytest.mark.parametrize("name", ["../x", "/abs", "a/b", "..", "a\\b"])
+def test_load_manifest_rejects_names_outside_out_root(tmp_path, name):
+    manifest = _write(tmp_path / "manifest.jsonl", json.dumps({"name": name, "marco": "m.md", "polo": "p.md"}) + "\n")
+    with pytest.raises(ValueError, match="manifest name"):
+        load_manifest(manifest)
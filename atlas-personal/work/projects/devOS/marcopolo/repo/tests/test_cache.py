@@ -0,0 +1,49 @@
+import os
+
+from marcopolo.cache import TfidfCache, marco_key
+from marcopolo.extract import extract_marco_spans, extract_polo_units
+from marcopolo.match import match_units_to_spans
+
+MARCO = "1. kernel output format\n2. fork upstream observability\n3. pipeline scale atlas kernel\n"
+POLO = "## Thread 1: t\nSRC: kernel format\nOPEN: upstream fork?\nPROP: scale the pipeline\n"
+
+def test_cache_hit_matches_fresh_fit(tmp_path):
+    spans = extract_marco_spans(MARCO)
+    units = extract_polo_units(POLO)
+    cache = TfidfCache(str(tmp_path), max_entries=2)
+
+    fresh = match_units_to_spans(spans, units)
+    first = match_units_to_spans(spans, units, cache=cache)
+    second = match_units_to_spans(spans, units, cache=cache)
+
+    assert (cache.misses, cache.hits) == (1, 1)
+    assert first[1] == fresh[1] and second[1] == fresh[1]
+    assert [e.score for e in second[0]] == [e.score for e in fresh[0]]
+
+def test_cache_evicts_least_recent(tmp_path):
+    cache = TfidfCache(str(tmp_path), max_entries=2)
+    units = extract_polo_units(POLO)
+    keys = []
+    for i in range(3):
+        spans = extract_marco_spans(MARCO + f"4. extra line {i}\n")
+        keys.append(marco_key(spans))
+        match_units_to_spans(spans, units, cache=cache)
+        os.utime(os.path.join(str(tmp_path), f"{keys[-1]}.npz"), (i, i))
+    match_units_to_spans(extract_marco_spans(MARCO + "4. extra line 0\n"), units, cache=cache)
+    names = sorted(os.listdir(str(tmp_path)))
+    assert len(names) == 2
+    assert f"{keys[1]}.npz" not in names
+
+def test_cache_hit_survives_concurrent_eviction(tmp_path, monkeypatch):
+    spans = extract_marco_spans(MARCO)
+    units = extract_polo_units(POLO)
+    cache = TfidfCache(str(tmp_path))
+    match_units_to_spans(spans, units, cache=cache)
+
+    def evicted(path, *a, **kw):
+        raise FileNotFoundError(path)
+
+    # Another worker evicts the entry between the load and the recency touch.
+    monkeypatch.setattr(os, "utime", evicted)
+    assert cache.get(marco_key(spans)) is not None
+    assert cache.hits == 1
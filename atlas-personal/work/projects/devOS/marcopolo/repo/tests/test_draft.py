@@ -0,0 +1,58 @@
+import random
+import re
+
+from marcopolo.draft import Q_MARKERS, TOPIC_RULES, draft_polo_from_marco
+from marcopolo.extract import Span
+
+def _reference_draft(spans):
+    # Pre-automaton implementation: one substring scan per keyword per span.
+    def contains_any(s, needles):
+        s = s.lower()
+        return any(n in s for n in needles)
+
+    buckets = {title: [] for title, _ in TOPIC_RULES}
+    misc = []
+    for sp in spans:
+        for title, kws in TOPIC_RULES:
+            if contains_any(sp.text, kws):
+                buckets[title].append(sp)
+                break
+        else:
+            misc.append(sp)
+
+    out = []
+    n = 0
+    for title, _ in TOPIC_RULES:
+        if not buckets[title]:
+            continue
+        n += 1
+        out += [f"## Thread {n}: {title}", ""]
+        for sp in buckets[title]:
+            out.append(f"SRC: {sp.text.replace(chr(10), ' ').strip()} [trace:{sp.id}]")
+            if contains_any(sp.text, Q_MARKERS):
+                out.append(f"OPEN: Clarify decision/question implied by: {sp.id} [trace:{sp.id}]")
+            if re.search(r"\b(readme|docs/|src/|\.md|\.py)\b", sp.text.lower()):
+                out.append(f"PROP: Consider routing this to an appropriate doc surface. [trace:{sp.id}]")
+        out.append("")
+    if misc:
+        n += 1
+        out += [f"## Thread {n}: Misc", ""]
+        for sp in misc:
+            out.append(f"SRC: {sp.text.replace(chr(10), ' ').strip()} [trace:{sp.id}]")
+            if contains_any(sp.text, Q_MARKERS):
+                out.append(f"OPEN: Clarify decision/question implied by: {sp.id} [trace:{sp.id}]")
+        out.append("")
+    return "\n".join(out).strip() + "\n"
+
+FRAGMENTS = sorted({kw for _, kws in TOPIC_RULES for kw in kws} | set(Q_MARKERS)) + [
+    "README", "docs/x", "src/a", "notes.md", "run.py", "x.mdx", "Fork", "forkernel",
+    "supporting", "catalog", " ", " ", "\n", "plain", "-", "/", ".",
+]
+
+def test_draft_matches_per_keyword_reference():
+    rnd = random.Random(0)
+    spans = []
+    for i in range(400):
+        text = "".join(rnd.choice(FRAGMENTS) for _ in range(rnd.randint(1, 6))).strip() or "x"
+        spans.append(Span(f"m:{i+1:04d}", "block", i + 1, i + 1, 0, len(text), text, ""))
+    assert draft_polo_from_marco(spans) == _reference_draft(spans)
@@ -0,0 +1,55 @@
+import mmap
+import random
+
+from marcopolo.extract import extract_marco_spans, iter_marco_spans
+from marcopolo.util import airlock_lines, airlock_text
+
+PIECES = [
+    "1. numbered item", "2) another", "- bullet", "* star", "+ plus", "plain block line",
+    "continued text  ", "", "   ", "\t", "tail\t ", "3.not numbered",
+]
+NEWLINES = ["\n", "\r\n", "\r"]
+
+def _text(seed: int) -> str:
+    rnd = random.Random(seed)
+    out = []
+    for _ in range(rnd.randint(0, 40)):
+        out.append(rnd.choice(PIECES))
+        out.append(rnd.choice(NEWLINES))
+    if rnd.random() < 0.5 and out:
+        out.pop()
+    return "".join(out)
+
+def _chunks(s: str, rnd: random.Random):
+    i = 0
+    while i < len(s):
+        j = i + rnd.randint(1, 7)
+        yield s[i:j]
+        i = j
+
+def test_iter_marco_spans_matches_whole_text_on_any_chunking():
+    for seed in range(200):
+        text = _text(seed)
+        expected = extract_marco_spans(text)
+        got = list(iter_marco_spans(_chunks(text, random.Random(seed))))
+        assert got == expected, seed
+
+def test_iter_marco_spans_reads_file_objects_and_mmap(tmp_path):
+    text = _text(3) + "\n\n4. last item\r\n"
+    path = tmp_path / "marco.md"
+    path.write_bytes(text.encode("utf-8"))
+    expected = extract_marco_spans(text)
+
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        assert list(iter_marco_spans(f)) == expected
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        assert list(iter_marco_spans(iter(mm.readline, b""))) == expected
+
+def test_airlock_lines_matches_airlock_text():
+    rnd = random.Random(0)
+    alphabet = ["a", " ", "\n", "\u2019", "\u2014", "\u00a0", "\u00e9"]
+    for _ in range(300):
+        text = "".join(rnd.choice(alphabet) for _ in range(rnd.randint(0, 600)))
+        lines = text.splitlines(keepends=True)
+        for repair in (False, True):
+            assert airlock_lines(lines, repair_common_punct=repair) == airlock_text(text, repair_common_punct=repair)[1]
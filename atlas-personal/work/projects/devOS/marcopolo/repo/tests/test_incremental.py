@@ -0,0 +1,98 @@
+import pytest
+
+import marcopolo.pipeline as pipeline
+from marcopolo.pipeline import verify_pair
+
+MARCO = "\n".join([
+    "1. kernel output format needs a renderer",
+    "2. fork upstream and add observability logs",
+    "3. pipeline scale across sequential turns",
+    "4. output templates for markdown requirements",
+]) + "\n"
+
+POLO_V1 = "\n".join([
+    "## Thread 1: output",
+    "SRC: kernel output format renderer",
+    "OPEN: which markdown templates?",
+    "## Thread 2: scale",
+    "SRC: pipeline scale sequential",
+    "PROP: fork upstream for logs",
+]) + "\n"
+
+POLO_V2 = "\n".join([
+    "## Thread 1: output",
+    "SRC: kernel output format renderer",
+    "SRC: added observability logs line",
+    "OPEN: which markdown templates?",
+    "## Thread 2: scale",
+    "SRC: pipeline scale across turns",
+]) + "\n"
+
+ARTIFACTS = ["polo_units.jsonl", "trace_edges.jsonl", "trace_candidates.jsonl", "verify_report.json", "verify_report.md"]
+
+def _write(path, text):
+    path.write_text(text, encoding="utf-8")
+    return str(path)
+
+@pytest.mark.parametrize("engine", ["sparse", "index"])
+def test_incremental_matches_full_run(tmp_path, engine, monkeypatch):
+    cfg = {"match_engine": engine}
+    marco = _write(tmp_path / "marco.md", MARCO)
+    polo = _write(tmp_path / "polo.md", POLO_V1)
+    inc, full = tmp_path / "inc", tmp_path / "full"
+
+    assert verify_pair(marco, polo, str(inc), cfg)[0] == 0
+    _write(tmp_path / "polo.md", POLO_V2)
+
+    scored = []
+    real = pipeline.match_units_to_spans
+
+    def spy(spans, units, **kw):
+        scored.extend(u.text for u in units)
+        return real(spans, units, **kw)
+
+    monkeypatch.setattr(pipeline, "match_units_to_spans", spy)
+    assert verify_pair(marco, polo, str(inc), cfg, incremental=True)[0] == 0
+    monkeypatch.undo()
+
+    assert verify_pair(marco, polo, str(full), cfg)[0] == 0
+    assert scored == ["added observability logs line", "pipeline scale across turns"]
+    for name in ARTIFACTS + ["marco_spans.jsonl"]:
+        assert (inc / name).read_text() == (full / name).read_text(), name
+
+def test_incremental_rescores_everything_when_marco_changes(tmp_path):
+    marco = _write(tmp_path / "marco.md", MARCO)
+    polo = _write(tmp_path / "polo.md", POLO_V1)
+    inc, full = tmp_path / "inc", tmp_path / "full"
+
+    verify_pair(marco, polo, str(inc), {})
+    _write(tmp_path / "marco.md", MARCO + "5. a brand new kernel item\n")
+    verify_pair(marco, polo, str(inc), {}, incremental=True)
+    verify_pair(marco, polo, str(full), {})
+    for name in ARTIFACTS + ["marco_spans.jsonl"]:
+        assert (inc / name).read_text() == (full / name).read_text(), name
+
+def test_incremental_rewrites_spans_shifted_by_blank_lines(tmp_path):
+    marco = _write(tmp_path / "marco.md", MARCO)
+    polo = _write(tmp_path / "polo.md", POLO_V1)
+    inc, full = tmp_path / "inc", tmp_path / "full"
+
+    verify_pair(marco, polo, str(inc), {})
+    # Same span fingerprints, different line ranges.
+    _write(tmp_path / "marco.md", "\n\n" + MARCO)
+    verify_pair(marco, polo, str(inc), {}, incremental=True)
+    verify_pair(marco, polo, str(full), {})
+    for name in ARTIFACTS + ["marco_spans.jsonl"]:
+        assert (inc / name).read_text() == (full / name).read_text(), name
+
+def test_incremental_falls_back_on_malformed_candidates(tmp_path):
+    marco = _write(tmp_path / "marco.md", MARCO)
+    polo = _write(tmp_path / "polo.md", POLO_V1)
+    inc, full = tmp_path / "inc", tmp_path / "full"
+
+    verify_pair(marco, polo, str(inc), {})
+    (inc / "trace_candidates.jsonl").write_text('{"engine": "sparse"}\n', encoding="utf-8")
+    assert verify_pair(marco, polo, str(inc), {}, incremental=True)[0] == 0
+    verify_pair(marco, polo, str(full), {})
+    for name in ARTIFACTS + ["marco_spans.jsonl"]:
+        assert (inc / name).read_text() == (full / name).read_text(), name
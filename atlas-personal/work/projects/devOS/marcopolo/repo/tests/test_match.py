@@ -0,0 +1,87 @@
+import random
+
+import pytest
+
+from marcopolo.extract import extract_marco_spans, extract_polo_units
+from marcopolo.match import match_units_to_spans
+
+WORDS = [
+    "kernel", "pipeline", "output", "format", "model", "context", "atlas",
+    "fork", "upstream", "template", "scale", "thread", "operator", "signal",
+    "trace", "span", "unit", "drafting", "verify", "airlock",
+]
+
+def _corpus(seed: int, n_spans: int, n_units: int):
+    rnd = random.Random(seed)
+    marco = "\n".join(
+        f"{i+1}. " + " ".join(rnd.choice(WORDS) for _ in range(rnd.randint(2, 8)))
+        for i in range(n_spans)
+    )
+    polo = ["## Thread 1: mixed"]
+    for _ in range(n_units):
+        tag = rnd.choice(["SRC", "OPEN", "PROP"])
+        polo.append(f"{tag}: " + " ".join(rnd.choice(WORDS) for _ in range(rnd.randint(1, 5))))
+    return extract_marco_spans(marco), extract_polo_units("\n".join(polo))
+
+def _as_tuples(edges):
+    return [(e.polo_id, e.marco_id, e.rel, e.score, e.rationale) for e in edges]
+
+def test_sparse_engine_matches_dense():
+    for seed in range(5):
+        spans, units = _corpus(seed, n_spans=60, n_units=40)
+        for top_k in (1, 5, 100):
+            e_d, c_d = match_units_to_spans(spans, units, top_k=top_k, engine="dense")
+            e_s, c_s = match_units_to_spans(spans, units, top_k=top_k, engine="sparse")
+            assert _as_tuples(e_s) == _as_tuples(e_d)
+            assert c_s == c_d
+
+def test_sparse_engine_pads_with_zero_scores():
+    spans, units = _corpus(7, n_spans=10, n_units=3)
+    units[0].text = "nothing in common here"
+    _, cand = match_units_to_spans(spans, units, top_k=5, engine="sparse")
+    assert [s for _, s in cand[units[0].id]] == [0.0] * 5
+    assert [sid for sid, _ in cand[units[0].id]] == [sp.id for sp in spans[:5]]
+
+def test_index_engine_scores_are_tfidf_cosines():
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.metrics.pairwise import cosine_similarity
+
+    from marcopolo.match import _informative
+
+    spans, units = _corpus(11, n_spans=50, n_units=30)
+    _, cand = match_units_to_spans(spans, units, top_k=3, engine="index")
+
+    vec = TfidfVectorizer(tokenizer=_informative, lowercase=False, token_pattern=None)
+    X = vec.fit_transform([sp.text for sp in spans])
+    sims = cosine_similarity(vec.transform([u.text for u in units]), X)
+    pos = {sp.id: i for i, sp in enumerate(spans)}
+    for ui, u in enumerate(units):
+        top = sorted(sims[ui], reverse=True)[:3]
+        assert [s for _, s in cand[u.id]] == pytest.approx(top)
+        for sid, s in cand[u.id]:
+            assert sims[ui][pos[sid]] == pytest.approx(s)
+
+def test_index_engine_report_compatible():
+    from marcopolo.verify import compute_report
+
+    spans, units = _corpus(2, n_spans=20, n_units=10)
+    edges, cand = match_units_to_spans(spans, units, engine="index")
+    report, _ = compute_report(spans, units, edges, cand, {})
+    assert set(cand) == {u.id for u in units}
+    assert 0.0 <= report["confidence"] <= 1.0
+
+def test_index_engine_warns_that_cache_is_unused(tmp_path):
+    from marcopolo.cache import TfidfCache
+
+    spans, units = _corpus(3, n_spans=10, n_units=5)
+    cache = TfidfCache(str(tmp_path))
+    with pytest.warns(UserWarning, match="cache is not used"):
+        match_units_to_spans(spans, units, engine="index", cache=cache)
+    assert not list(tmp_path.iterdir())
+
+def test_parallel_sparse_matches_serial():
+    spans, units = _corpus(5, n_spans=80, n_units=120)
+    serial = match_units_to_spans(spans, units, engine="sparse")
+    parallel = match_units_to_spans(spans, units, engine="sparse", jobs=3)
+    assert _as_tuples(parallel[0]) == _as_tuples(serial[0])
+    assert parallel[1] == serial[1]
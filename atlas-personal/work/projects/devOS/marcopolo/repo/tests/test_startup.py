@@ -0,0 +1,55 @@
+import json
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+HEAVY = ("numpy", "scipy", "sklearn")
+
+MARCO = "1. kernel output format\n2. fork upstream observability\n"
+POLO = "## Thread 1: t\nSRC: kernel output format\nOPEN: fork upstream?\n"
+
+# Runs the CLI in a fresh interpreter and reports which heavy modules it loaded.
+PROBE = (
+    "import json, sys\n"
+    "from marcopolo import cli\n"
+    "sys.argv = ['marcopolo'] + sys.argv[1:]\n"
+    "try:\n"
+    "    cli.main()\n"
+    "except SystemExit:\n"
+    "    pass\n"
+    "print(json.dumps(sorted(m for m in %r if m in sys.modules)))\n" % (HEAVY,)
+)
+
+def _run(argv, cwd):
+    t0 = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-c", PROBE] + argv,
+        cwd=cwd, capture_output=True, text=True, check=True,
+    )
+    elapsed_ms = (time.perf_counter() - t0) * 1000.0
+    return json.loads(proc.stdout.strip().splitlines()[-1]), elapsed_ms
+
+@pytest.fixture
+def pair(tmp_path):
+    (tmp_path / "marco.md").write_text(MARCO, encoding="utf-8")
+    (tmp_path / "polo.md").write_text(POLO, encoding="utf-8")
+    (tmp_path / "cfg.json").write_text(json.dumps({"match_min": 0.22}), encoding="utf-8")
+    return tmp_path
+
+def test_airlock_never_imports_scientific_stack(pair, record_property):
+    loaded, elapsed_ms = _run(["airlock", "marco.md", "polo.md", "--out", "out"], str(pair))
+    record_property("cold_start_ms.airlock", round(elapsed_ms, 1))
+    assert loaded == []
+    assert os.path.exists(pair / "out" / "airlock_report.json")
+
+@pytest.mark.parametrize("argv", [
+    ["verify", "marco.md", "polo.md", "--config", "cfg.json", "--out", "out"],
+    ["draft", "marco.md", "--config", "cfg.json", "--out", "out"],
+])
+def test_cold_start_per_subcommand(pair, record_property, argv):
+    loaded, elapsed_ms = _run(argv, str(pair))
+    record_property(f"cold_start_ms.{argv[0]}", round(elapsed_ms, 1))
+    assert "sklearn" in loaded